@@ -0,0 +1,186 @@
+import os
+import time
+import sqlite3
+import hashlib
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CACHE_DIR = 'Cache'
+
+def cache_key(*parts):
+    # 各部分以 \0 分隔后取 sha256, 避免 ("ab", "c") 与 ("a", "bc") 冲突
+    return hashlib.sha256('\0'.join(str(part) for part in parts).encode('utf-8')).hexdigest()
+
+class KeywordCache:
+    # 关键词提取结果的持久化缓存(SQLite), 键为 提示词 + NLP后端 + 模型名 的哈希
+    # 超过 max_entries 时淘汰最久未使用的条目; ttl 秒数(可选)过期的条目视为未命中
+    def __init__(self, path=os.path.join(DEFAULT_CACHE_DIR, 'keywords.sqlite'), max_entries=10000, ttl=None):
+        self.path = path
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._lock = threading.Lock()
+        # 工作线程共享同一连接, 访问由 _lock 串行化
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        with self._conn:
+            self._conn.execute("""CREATE TABLE IF NOT EXISTS keywords (
+                key TEXT PRIMARY KEY,
+                backend TEXT,
+                model TEXT,
+                keywords TEXT,
+                created REAL,
+                last_used REAL)""")
+            self._conn.execute("CREATE INDEX IF NOT EXISTS keywords_last_used ON keywords (last_used)")
+
+    @classmethod
+    def from_config(cls, config):
+        # config.json 中的 keyword_cache 项, enabled 为 false 时返回 None
+        cache_config = config.get('keyword_cache', {})
+        if not cache_config.get('enabled', True):
+            return None
+        ttl_days = cache_config.get('ttl_days')
+        return cls(cache_config.get('path', os.path.join(DEFAULT_CACHE_DIR, 'keywords.sqlite')),
+                   cache_config.get('max_entries', 10000),
+                   ttl_days * 86400 if ttl_days else None)
+
+    def get(self, prompt, backend, model):
+        key = cache_key(prompt, backend, model)
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute("SELECT keywords, created FROM keywords WHERE key = ?", (key,)).fetchone()
+            if row and self.ttl and now - row[1] > self.ttl:
+                with self._conn:
+                    self._conn.execute("DELETE FROM keywords WHERE key = ?", (key,))
+                row = None
+            if row is None:
+                self.misses += 1
+                logger.debug(f"Keyword cache miss ({backend}/{model})")
+                return None
+            with self._conn:
+                self._conn.execute("UPDATE keywords SET last_used = ? WHERE key = ?", (now, key))
+            self.hits += 1
+            logger.debug(f"Keyword cache hit ({backend}/{model})")
+            return row[0]
+
+    def put(self, prompt, backend, model, keywords):
+        key = cache_key(prompt, backend, model)
+        now = time.time()
+        with self._lock, self._conn:
+            self._conn.execute("INSERT OR REPLACE INTO keywords VALUES (?, ?, ?, ?, ?, ?)",
+                               (key, backend, model, keywords, now, now))
+            self._conn.execute("""DELETE FROM keywords WHERE key IN (
+                SELECT key FROM keywords ORDER BY last_used DESC LIMIT -1 OFFSET ?)""", (self.max_entries,))
+
+    def __len__(self):
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM keywords").fetchone()[0]
+
+    def log_stats(self):
+        logger.info(f"Keyword cache: {self.hits} hits, {self.misses} misses, {len(self)} entries")
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+class ImageCache:
+    # 内容寻址的图片缓存: 图片编码数据按 sha256 只保存一份(blobs/<哈希>),
+    # 索引把 提供方 + 模型/工作流哈希 + 关键词 + 尺寸 的键映射到图片哈希; 总大小超过 max_bytes 时按LRU淘汰
+    def __init__(self, directory=os.path.join(DEFAULT_CACHE_DIR, 'images'), max_bytes=1024 * 1024 * 1024):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        os.makedirs(os.path.join(directory, 'blobs'), exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(os.path.join(directory, 'index.sqlite'), check_same_thread=False)
+        with self._conn:
+            self._conn.execute("CREATE TABLE IF NOT EXISTS blobs (hash TEXT PRIMARY KEY, size INTEGER, last_used REAL)")
+            self._conn.execute("CREATE TABLE IF NOT EXISTS entries (key TEXT PRIMARY KEY, hash TEXT)")
+            self._conn.execute("CREATE INDEX IF NOT EXISTS entries_hash ON entries (hash)")
+
+    @classmethod
+    def from_config(cls, config):
+        # config.json 中的 image_cache 项, enabled 为 false 时返回 None
+        cache_config = config.get('image_cache', {})
+        if not cache_config.get('enabled', True):
+            return None
+        return cls(cache_config.get('path', os.path.join(DEFAULT_CACHE_DIR, 'images')),
+                   int(cache_config.get('max_mb', 1024) * 1024 * 1024))
+
+    def _blob_path(self, blob_hash):
+        return os.path.join(self.directory, 'blobs', blob_hash)
+
+    def get(self, key):
+        with self._lock:
+            row = self._conn.execute("SELECT hash FROM entries WHERE key = ?", (key,)).fetchone()
+            data = None
+            if row:
+                try:
+                    with open(self._blob_path(row[0]), 'rb') as f:
+                        data = f.read()
+                except OSError:
+                    # 文件被手动删除: 清理索引
+                    with self._conn:
+                        self._conn.execute("DELETE FROM entries WHERE hash = ?", (row[0],))
+                        self._conn.execute("DELETE FROM blobs WHERE hash = ?", (row[0],))
+            if data is None:
+                self.misses += 1
+                logger.debug("Image cache miss")
+                return None
+            with self._conn:
+                self._conn.execute("UPDATE blobs SET last_used = ? WHERE hash = ?", (time.time(), row[0]))
+            self.hits += 1
+            logger.debug(f"Image cache hit: {row[0][:12]}")
+            return data
+
+    def put(self, key, data):
+        blob_hash = hashlib.sha256(data).hexdigest()
+        blob_path = self._blob_path(blob_hash)
+        with self._lock:
+            if not os.path.exists(blob_path):
+                # 先写临时文件再改名, 中途失败不会留下不完整的图片
+                temp_path = f"{blob_path}.{threading.get_ident()}.tmp"
+                with open(temp_path, 'wb') as f:
+                    f.write(data)
+                os.replace(temp_path, blob_path)
+            with self._conn:
+                self._conn.execute("INSERT OR REPLACE INTO blobs VALUES (?, ?, ?)", (blob_hash, len(data), time.time()))
+                self._conn.execute("INSERT OR REPLACE INTO entries VALUES (?, ?)", (key, blob_hash))
+            self._evict()
+        return blob_hash
+
+    def _evict(self):
+        # 至少保留最近使用的一张图片
+        total = self.total_bytes()
+        if total <= self.max_bytes:
+            return
+        rows = self._conn.execute("SELECT hash, size FROM blobs ORDER BY last_used").fetchall()
+        for blob_hash, size in rows[:-1]:
+            if total <= self.max_bytes:
+                break
+            with self._conn:
+                self._conn.execute("DELETE FROM entries WHERE hash = ?", (blob_hash,))
+                self._conn.execute("DELETE FROM blobs WHERE hash = ?", (blob_hash,))
+            try:
+                os.remove(self._blob_path(blob_hash))
+            except OSError:
+                pass
+            total -= size
+            logger.debug(f"Image evicted from cache: {blob_hash[:12]}")
+
+    def total_bytes(self):
+        return self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM blobs").fetchone()[0]
+
+    def log_stats(self):
+        with self._lock:
+            total = self.total_bytes()
+        logger.info(f"Image cache: {self.hits} hits, {self.misses} misses, {total / 2**20:.1f} MB")
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
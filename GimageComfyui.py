@@ -0,0 +1,225 @@
+import json
+import time
+import uuid
+import logging
+import threading
+from GimageHttp import HttpClient
+
+try:
+    import websocket  # websocket-client, 未安装时退回轮询
+except ImportError:
+    websocket = None
+
+logger = logging.getLogger(__name__)
+
+class ComfyuiError(Exception):
+    pass
+
+def apply_keywords(workflow, keywords):
+    # 更新工作流中的关键词
+    for node in workflow.values():
+        if node['class_type'] == 'CLIPTextEncode':
+            if node['inputs'].get('text') == '[KEYWORDS]':
+                node['inputs']['text'] = keywords
+            elif '[KEYWORDS]' in node['inputs'].get('text', ''):
+                node['inputs']['text'] = node['inputs']['text'].replace('[KEYWORDS]', keywords)
+    return workflow
+
+def first_image(entry):
+    # 从 /history 的结果中取第一个输出图像的信息(filename, type, subfolder)
+    output_images = entry.get('outputs')
+    if not output_images:
+        raise ComfyuiError("No image data in Comfyui response")
+    image_data = next(iter(output_images.values()))
+    if not image_data.get('images'):
+        raise ComfyuiError(f"No 'images' list in image data: {image_data}")
+    image = image_data['images'][0]
+    if 'filename' not in image or 'type' not in image:
+        raise ComfyuiError(f"Missing 'filename' or 'type' in image data: {image}")
+    return image
+
+class ComfyuiClient:
+    # 通过 websocket 的 executing/execution_success 消息得知任务完成, 图像生成完成后立即取回结果;
+    # websocket 不可用或断开时退回轮询 /history, 轮询间隔从 min_poll_interval 开始逐步加倍到 max_poll_interval
+    # 有 websocket 时轮询仍以同样的退避间隔进行, 作为漏收消息时的保底
+    def __init__(self, base_url="http://127.0.0.1:8188", client_id="ppt_image_generator", use_websocket=True,
+                 min_poll_interval=0.2, max_poll_interval=5.0, http=None):
+        self.base_url = base_url.rstrip('/')
+        # ComfyUI 按 clientId 推送消息, 加上随机后缀避免多个客户端互相覆盖
+        self.client_id = f"{client_id}_{uuid.uuid4().hex[:8]}"
+        self.use_websocket = use_websocket and websocket is not None
+        self.min_poll_interval = min_poll_interval
+        self.max_poll_interval = max_poll_interval
+        self.http = http or HttpClient()
+        self._ws = None
+        self._listening = False
+        self._waiting = set()  # 已提交、尚未返回结果的任务; 只记录这些任务的完成通知
+        self._finished = set()
+        self._cond = threading.Condition()
+
+    @classmethod
+    def from_config(cls, comfyui_config, http=None):
+        return cls(comfyui_config.get('base_url', "http://127.0.0.1:8188"),
+                   comfyui_config.get('client_id', "ppt_image_generator"),
+                   comfyui_config.get('websocket', True),
+                   comfyui_config.get('min_poll_interval', 0.2),
+                   comfyui_config.get('max_poll_interval', 5.0),
+                   http=http)
+
+    # ------------------------------------------------------------ websocket
+
+    def connect(self):
+        # 必须在提交任务之前连接, 否则可能错过很快完成的任务的消息
+        with self._cond:
+            if self._listening or not self.use_websocket:
+                return self._listening
+            ws_url = 'ws' + self.base_url[len('http'):] + f"/ws?clientId={self.client_id}"
+            try:
+                self._ws = websocket.create_connection(ws_url, timeout=self.http.timeout[0])
+                self._ws.settimeout(None)
+            except Exception as e:
+                logger.warning(f"Comfyui websocket unavailable, falling back to polling: {e}")
+                self.use_websocket = False
+                return False
+            self._listening = True
+        threading.Thread(target=self._listen, name='comfyui-ws', daemon=True).start()
+        logger.info(f"Comfyui websocket connected: {ws_url}")
+        return True
+
+    def _listen(self):
+        ws = self._ws
+        try:
+            while True:
+                message = ws.recv()
+                if not isinstance(message, str):
+                    continue  # 二进制消息为预览图
+                message = json.loads(message)
+                data = message.get('data') or {}
+                prompt_id = data.get('prompt_id')
+                finished = (message.get('type') == 'executing' and data.get('node') is None) or \
+                    message.get('type') in ('execution_success', 'execution_error', 'execution_interrupted')
+                if prompt_id and finished:
+                    logger.debug(f"Comfyui prompt finished: {prompt_id} ({message['type']})")
+                    with self._cond:
+                        if prompt_id in self._waiting:
+                            self._finished.add(prompt_id)
+                            self._cond.notify_all()
+        except Exception as e:
+            if self.use_websocket:  # close() 主动关闭时不再提示
+                logger.warning(f"Comfyui websocket closed, falling back to polling: {e}")
+        finally:
+            ws.shutdown()
+            with self._cond:
+                self._listening = False
+                self._ws = None
+                self._cond.notify_all()
+
+    def close(self):
+        with self._cond:
+            ws = self._ws
+            self.use_websocket = False
+        if ws is not None:
+            ws.abort()  # 中断监听线程中的 recv, 由监听线程关闭连接
+
+    # ------------------------------------------------------------ HTTP
+
+    def submit(self, workflow):
+        self.connect()
+        response = self.http.post(f"{self.base_url}/prompt", json={"prompt": workflow, "client_id": self.client_id})
+        response.raise_for_status()
+        prompt_id = response.json()['prompt_id']
+        with self._cond:
+            self._waiting.add(prompt_id)
+        logger.info(f"Comfyui workflow submitted with ID: {prompt_id}")
+        return prompt_id
+
+    def history(self, prompt_id):
+        # 任务完成之前 /history/{prompt_id} 返回空对象
+        response = self.http.get(f"{self.base_url}/history/{prompt_id}")
+        response.raise_for_status()
+        return response.json().get(prompt_id)
+
+    def wait(self, prompt_id, timeout=600):
+        # 等待任务完成并返回其 history 记录; 出错时抛出 ComfyuiError, 超时抛出 TimeoutError
+        for _, result in self.iter_completed([prompt_id], timeout):
+            if isinstance(result, Exception):
+                raise result
+            return result
+
+    def iter_completed(self, prompt_ids, timeout=600):
+        # 按完成顺序逐个返回 (prompt_id, history记录或异常), 出错的任务返回 ComfyuiError;
+        # 连续 timeout 秒没有任何任务完成时, 其余任务都以 TimeoutError 返回
+        pending = list(prompt_ids)
+        with self._cond:
+            self._waiting.update(pending)
+        deadline = time.monotonic() + timeout
+        interval = self.min_poll_interval
+        polls = 0
+        try:
+            while pending:
+                with self._cond:
+                    notified = [prompt_id for prompt_id in pending if prompt_id in self._finished]
+                # 收到通知时只查询已完成的任务; 否则查询所有未完成的任务, 队列中靠后的任务
+                # (例如其他客户端插队或前面的任务仍在执行时)完成后也能立即返回
+                completed = []
+                for prompt_id in notified or list(pending):
+                    entry = self.history(prompt_id)
+                    polls += 1
+                    if entry is not None:
+                        completed.append((prompt_id, entry))
+                for prompt_id, entry in completed:
+                    pending.remove(prompt_id)
+                    with self._cond:
+                        self._waiting.discard(prompt_id)
+                        self._finished.discard(prompt_id)
+                    logger.debug(f"Comfyui prompt {prompt_id} completed ({polls} history requests so far)")
+                    status = entry.get('status') or {}
+                    if 'error' in entry or status.get('status_str') == 'error':
+                        yield prompt_id, ComfyuiError(f"Error in Comfyui image generation: {entry.get('error') or status.get('messages')}")
+                    else:
+                        yield prompt_id, entry
+                if completed:
+                    # 有任务完成: 立即检查下一个任务, 重新开始计时与退避
+                    deadline = time.monotonic() + timeout
+                    interval = self.min_poll_interval
+                    continue
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    timed_out, pending = pending, []
+                    with self._cond:
+                        self._waiting.difference_update(timed_out)
+                        self._finished.difference_update(timed_out)
+                    for prompt_id in timed_out:
+                        yield prompt_id, TimeoutError(f"Timed out waiting for Comfyui prompt {prompt_id}")
+                    return
+                with self._cond:
+                    if self._listening:
+                        self._cond.wait_for(lambda: any(prompt_id in self._finished for prompt_id in pending) or not self._listening,
+                                            timeout=min(interval, remaining))
+                        woken = True
+                    else:
+                        woken = False
+                if not woken:
+                    time.sleep(min(interval, remaining))
+                interval = min(interval * 2, self.max_poll_interval)
+        finally:
+            # 调用方提前停止迭代时, 不再等待的任务同样移除, 之后到达的通知也不再记录, 集合不会一直增长
+            with self._cond:
+                self._waiting.difference_update(pending)
+                self._finished.difference_update(pending)
+
+    def fetch_image(self, image):
+        params = {'filename': image['filename'], 'type': image['type']}
+        if image.get('subfolder'):
+            params['subfolder'] = image['subfolder']
+        response = self.http.get(f"{self.base_url}/view", params=params)
+        response.raise_for_status()
+        return response.content
+
+    def generate(self, workflow, timeout=600):
+        # 提交工作流, 等待完成并返回第一张输出图像的编码数据
+        prompt_id = self.submit(workflow)
+        entry = self.wait(prompt_id, timeout)
+        data = self.fetch_image(first_image(entry))
+        logger.info("Image successfully retrieved from Comfyui")
+        return data
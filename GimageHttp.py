@@ -0,0 +1,87 @@
+import time
+import logging
+import threading
+from urllib.parse import urlsplit
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+logger = logging.getLogger(__name__)
+
+# 视为暂时性错误、需要重试的状态码
+RETRY_STATUS = (429, 500, 502, 503, 504)
+
+def host_key(url):
+    parts = urlsplit(url)
+    return f"{parts.hostname}:{parts.port or (443 if parts.scheme == 'https' else 80)}"
+
+class HttpClient(requests.Session):
+    # 所有图片提供方共用的 HTTP 会话: 按主机复用长连接, 默认设置连接/读取超时,
+    # 连接失败与暂时性错误按指数退避重试(POST 只在请求发出之前的连接错误时重试, 避免重复提交)
+    def __init__(self, connect_timeout=5, read_timeout=120, retries=3, backoff_factor=0.5, pool_maxsize=10):
+        super().__init__()
+        retry = Retry(total=retries, backoff_factor=backoff_factor, status_forcelist=RETRY_STATUS,
+                      raise_on_status=False)
+        adapter = HTTPAdapter(pool_connections=pool_maxsize, pool_maxsize=pool_maxsize, max_retries=retry)
+        self.mount('http://', adapter)
+        self.mount('https://', adapter)
+        self.timeout = (connect_timeout, read_timeout)
+        self._adapter = adapter
+        self._latency = {}  # 主机 -> [请求数, 总耗时, 最长耗时, 失败数]
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_config(cls, config):
+        http_config = config.get('http', {})
+        return cls(http_config.get('connect_timeout', 5),
+                   http_config.get('read_timeout', 120),
+                   http_config.get('retries', 3),
+                   http_config.get('backoff_factor', 0.5),
+                   http_config.get('pool_maxsize', 10))
+
+    def request(self, method, url, **kwargs):
+        kwargs.setdefault('timeout', self.timeout)
+        start = time.perf_counter()
+        failed = True
+        try:
+            response = super().request(method, url, **kwargs)
+            failed = False
+            return response
+        finally:
+            self._record(host_key(url), time.perf_counter() - start, failed)
+
+    def _record(self, host, elapsed, failed):
+        with self._lock:
+            stats = self._latency.setdefault(host, [0, 0.0, 0.0, 0])
+            stats[0] += 1
+            stats[1] += elapsed
+            stats[2] = max(stats[2], elapsed)
+            stats[3] += failed
+
+    def stats(self):
+        # 每个主机的请求数、新建连接数(连接复用率)与延迟, 可用于基准测试
+        connections = {}
+        for key in list(self._adapter.poolmanager.pools.keys()):
+            pool = self._adapter.poolmanager.pools.get(key)
+            if pool is not None:
+                host = f"{pool.host}:{pool.port}"
+                connections[host] = connections.get(host, 0) + pool.num_connections
+        result = {}
+        with self._lock:
+            for host, (count, total, longest, failed) in self._latency.items():
+                opened = connections.get(host, 0)
+                result[host] = {
+                    'requests': count,
+                    'failed': failed,
+                    'connections': opened,
+                    'reuse_ratio': 1 - opened / count if count else 0.0,
+                    'mean_latency': total / count if count else 0.0,
+                    'max_latency': longest,
+                }
+        return result
+
+    def log_stats(self):
+        for host, stats in self.stats().items():
+            logger.info(f"HTTP {host}: {stats['requests']} requests over {stats['connections']} connections "
+                        f"({stats['reuse_ratio']:.0%} reused), mean {stats['mean_latency'] * 1000:.0f} ms, "
+                        f"max {stats['max_latency'] * 1000:.0f} ms, {stats['failed']} failed")
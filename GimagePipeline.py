@@ -0,0 +1,789 @@
+import os
+import sys
+import json
+import time
+import random
+import hashlib
+import argparse
+import datetime
+import logging
+import threading
+from io import BytesIO
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor, Future, as_completed
+import requests
+from PIL import Image
+from pptx import Presentation
+from pptx.enum.shapes import MSO_SHAPE_TYPE
+from GpptCore import PlaceholderIndex
+from GimageCache import KeywordCache, ImageCache, cache_key
+from GimageHttp import HttpClient
+from GimageComfyui import ComfyuiClient, ComfyuiError, apply_keywords, first_image
+from pptInputs import parse_pages, collect_ppt_files
+
+try:
+    import openai  # 只有 ChatGPT 与 DALL-E 需要
+except ImportError:
+    openai = None
+
+logger = logging.getLogger(__name__)
+
+LOG_FORMAT = '%(asctime)s - %(processName)s - %(levelname)s - %(message)s'
+NLP_METHODS = ('Ollama', 'ChatGPT')
+GENERATION_METHODS = ('Comfyui生成', 'DALL-E', 'Pixabay', 'Unsplash')
+
+class InvalidPageError(ValueError):
+    pass
+
+def load_config(config_file='config.json'):
+    try:
+        with open(config_file, 'r') as f:
+            return json.load(f)
+    except FileNotFoundError:
+        logger.error("Configuration file not found. Using default settings.")
+        return {}
+    except json.JSONDecodeError:
+        logger.error("Invalid JSON in configuration file. Using default settings.")
+        return {}
+
+def open_image_bytes(data):
+    # 保留下载得到的原始编码数据, 图片缓存可直接保存而无需重新编码
+    image = Image.open(BytesIO(data))
+    image.encoded_bytes = data
+    return image
+
+def encode_image(image):
+    data = getattr(image, 'encoded_bytes', None)
+    if data is None:
+        buffer = BytesIO()
+        image.save(buffer, format='PNG')
+        data = buffer.getvalue()
+    return data
+
+EMU_PER_INCH = 914400
+
+def render_size(width_emu, height_emu, dpi):
+    # 占位符在目标DPI下的像素尺寸
+    return (max(1, round(width_emu * dpi / EMU_PER_INCH)), max(1, round(height_emu * dpi / EMU_PER_INCH)))
+
+def has_alpha(image):
+    # 只有确实存在透明像素时才需要保留 alpha 通道
+    if image.mode == 'P' and 'transparency' in image.info:
+        image = image.convert('RGBA')
+    if image.mode not in ('RGBA', 'LA', 'PA'):
+        return False
+    return image.getchannel('A').getextrema()[0] < 255
+
+def encode_for_slide(image, jpeg_quality=90):
+    # 在内存中编码待插入的图片: 照片类(无透明)用 JPEG, 需要透明时才用 PNG
+    buffer = BytesIO()
+    if has_alpha(image):
+        image.save(buffer, format='PNG')
+        image_format = 'PNG'
+    else:
+        if image.mode not in ('RGB', 'L'):
+            image = image.convert('RGB')
+        image.save(buffer, format='JPEG', quality=jpeg_quality, optimize=True)
+        image_format = 'JPEG'
+    buffer.seek(0)
+    return buffer, image_format
+
+class ImageJob:
+    # 一个图片占位符的处理任务, state 为 pending / succeeded / failed
+    def __init__(self, slide_number, slide, shape, content):
+        self.slide_number = slide_number
+        self.slide = slide
+        self.shape = shape
+        self.content = content
+        self.label = f"slide {slide_number} / {shape.name}"
+        self.state = 'pending'
+        self.error = None
+        self.attempts = 0
+
+
+class ImagePipeline:
+    # 不依赖界面的图片生成流水线: 读取PPT, 为图片占位符提取关键词、生成或下载图片并插入, 保存为新文件
+    # Gimage 窗口、命令行与服务端进程池都使用这个类
+    def __init__(self, config=None, nlp_method='Ollama', generation_method='Comfyui生成', max_workers=None):
+        self.config = load_config() if config is None else config
+        self.nlp_method = nlp_method
+        self.generation_method = generation_method
+        self.max_workers = max(1, int(max_workers or self.config.get('pipeline', {}).get('max_workers', 4)))
+        self.http = HttpClient.from_config(self.config)  # 所有提供方共用连接池
+        self.keywordCache = KeywordCache.from_config(self.config)
+        self.imageCache = ImageCache.from_config(self.config)
+        self._comfyui = None
+        self._comfyuiLock = threading.Lock()
+        self._workflow = None  # (路径, 修改时间, 大小, 内容, sha256)
+        self._workflowLock = threading.Lock()
+
+    def process(self, pptFile, pages=None, output_dir='Outfile', output_file=None):
+        # pages 为页码列表(从1开始), None 表示全部幻灯片; 页码无效时抛出 InvalidPageError
+        # 返回 {'input', 'output', 'placeholders', 'failed': [{'placeholder', 'error'}], 'seconds'}
+        start = time.perf_counter()
+        logger.info(f"Processing PPT file: {pptFile}")
+        prs = Presentation(pptFile)
+        slides = list(prs.slides)
+        if pages is None:
+            logger.info("Processing all slides")
+            jobs = self.processSlides(slides)
+        else:
+            invalid = [page for page in pages if not 1 <= page <= len(slides)]
+            if invalid:
+                raise InvalidPageError(f"Invalid page number: {', '.join(map(str, invalid))}")
+            logger.info(f"Processing slides: {pages}")
+            jobs = []
+            for page in pages:
+                jobs.extend(self.collectImageJobs(slides[page - 1], page))  # 调整为0基索引
+            self.runImageJobs(jobs)
+
+        # 只重试失败的占位符, 每轮之间的等待时间按指数增长
+        retry_config = self.config.get('retry', {})
+        max_attempts = retry_config.get('max_attempts', 3)
+        backoff = retry_config.get('backoff', 2.0)
+        for attempt in range(2, max_attempts + 1):
+            failed = [job for job in jobs if job.state == 'failed']
+            if not failed:
+                break
+            delay = backoff * 2 ** (attempt - 2)
+            logger.info(f"Retrying {len(failed)} failed placeholders in {delay:.1f}s (attempt {attempt}/{max_attempts})")
+            time.sleep(delay)
+            self.runImageJobs(failed)
+        failed = self.logJobSummary(jobs)
+
+        output_path = output_file or self.outputPath(pptFile, output_dir)
+        os.makedirs(os.path.dirname(os.path.abspath(output_path)), exist_ok=True)
+        # 保存修改后的PPT
+        logger.info(f"Saving updated PPT as: {output_path}")
+        prs.save(output_path)
+        return {
+            'input': pptFile,
+            'output': output_path,
+            'placeholders': len(jobs),
+            'failed': [{'placeholder': job.label, 'error': job.error} for job in failed],
+            'seconds': time.perf_counter() - start,
+        }
+
+    def outputPath(self, pptFile, output_dir):
+        # 生成带有随机时间后缀的文件名
+        timestamp = datetime.datetime.now().strftime("%Y%m%d%H%M%S")
+        random_suffix = str(random.randint(1000, 9999))
+        output_filename = f'updated_{os.path.splitext(os.path.basename(pptFile))[0]}_{timestamp}_{random_suffix}.pptx'
+        return os.path.join(output_dir, output_filename)
+
+    def processSlide(self, slide, slide_number=1):
+        return self.processSlides([slide], slide_number)
+
+    def collectImageJobs(self, slide, slide_number):
+        # 在主线程读取文档: 找出幻灯片中的图片占位符及其对应的文本内容
+        logger.info(f"Processing slide with layout: {slide.slide_layout.name}")
+        jobs = []
+        shapes_to_process = list(slide.shapes)  # 创建一个副本
+        shape_index = PlaceholderIndex(shapes_to_process)  # 文本形状按名称只索引一次
+        for shape in shapes_to_process:
+            logger.debug(f"Examining shape: {shape.name}, Type: {shape.shape_type}")
+            if shape.shape_type == MSO_SHAPE_TYPE.PICTURE or shape.name.startswith(('image', 'subimage')):
+                logger.info(f"Found image shape: {shape.name}")
+                content = self.findContentForImage(slide, shape, shape_index)
+                if content:
+                    logger.info(f"Content found for image: {content[:250]}...")  # 只显示前500个字符
+                    jobs.append(ImageJob(slide_number, slide, shape, content))
+                else:
+                    logger.warning(f"No content found for image: {shape.name}")
+        return jobs
+
+    def processSlides(self, slides, first_slide_number=1):
+        jobs = []
+        for slide_number, slide in enumerate(slides, first_slide_number):
+            logger.info(f"Collecting image placeholders on slide {slide_number}")
+            jobs.extend(self.collectImageJobs(slide, slide_number))
+        self.runImageJobs(jobs)
+        return jobs
+
+    def runImageJobs(self, jobs):
+        # 并发流水线: 所有占位符的关键词提取与图片生成/下载在线程池中同时进行(并发数受 max_workers 限制),
+        # 修改文档(插入图片)只在当前线程按占位符顺序执行, 保证文档不会被并发修改
+        if not jobs:
+            return
+        generationMethod = self.generation_method
+        max_workers = self.max_workers
+        logger.info(f"Processing {len(jobs)} image placeholders with up to {max_workers} concurrent workers")
+        for job in jobs:
+            job.state = 'pending'
+            job.attempts += 1
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            if generationMethod == 'Comfyui生成':
+                futures = self.enqueueComfyui(jobs, self.nlp_method, executor)
+            else:
+                futures = [executor.submit(self.prepareImage, job.content, self.nlp_method, generationMethod) for job in jobs]
+            for job, future in zip(jobs, futures):
+                try:
+                    image = future.result()
+                    logger.info("Image generated successfully")
+                    self.insertImage(job.slide, job.shape, image)
+                except Exception as e:
+                    logger.error(f"Error processing image for {job.label}: {e}")
+                    job.state, job.error = 'failed', str(e) or type(e).__name__
+                else:
+                    job.state, job.error = 'succeeded', None
+
+    def logJobSummary(self, jobs):
+        failed = [job for job in jobs if job.state == 'failed']
+        logger.info(f"Image placeholders: {len(jobs) - len(failed)} succeeded, {len(failed)} failed")
+        for job in failed:
+            logger.warning(f"Failed after {job.attempts} attempt(s): {job.label}: {job.error}")
+        if self.keywordCache is not None:
+            self.keywordCache.log_stats()
+        if self.imageCache is not None:
+            self.imageCache.log_stats()
+        self.http.log_stats()
+        return failed
+
+    def prepareImage(self, content, nlp_method, generationMethod):
+        # 在工作线程中运行, 不访问文档
+        keywords = self.extractKeywords(content, nlp_method)
+        logger.info(f"Extracted keywords: {keywords}")
+        if not keywords:
+            raise RuntimeError(f"Keyword extraction with {nlp_method} failed")
+        if self.imageCache is None:
+            return self.generateImageOrFail(keywords, generationMethod)
+
+        # 相同提供方、模型/工作流、关键词与尺寸的图片直接从本地缓存读取
+        key = self.imageCacheKey(keywords, generationMethod)
+        data = self.imageCache.get(key)
+        if data:
+            logger.info(f"Using cached image for keywords: {keywords}")
+            return open_image_bytes(data)
+        image = self.generateImageOrFail(keywords, generationMethod)
+        self.imageCache.put(key, encode_image(image))
+        return image
+
+    def generateImageOrFail(self, keywords, generationMethod):
+        # 各提供方失败时记录日志并返回 None, 这里转换为异常以便记录失败原因
+        image = self.generateImage(keywords, generationMethod)
+        if not image:
+            raise RuntimeError(f"{generationMethod} returned no image")
+        return image
+
+    def imageCacheKey(self, keywords, method):
+        # 缓存的是裁剪前的原始图片, 同一张图片可以用于任意尺寸的占位符; 尺寸指向提供方请求的输出尺寸
+        model, size = '', ''
+        if method == 'Comfyui生成':
+            try:
+                model = self.comfyuiWorkflowFile()[1]  # 工作流中包含模型与输出尺寸
+            except OSError:
+                pass
+        elif method == 'DALL-E':
+            model, size = 'dall-e', "1024x1024"
+        elif method == 'Pixabay':
+            model = 'photo'
+        return cache_key(method, model, keywords, size)
+
+    def findContentForImage(self, slide, imageShape, shape_index=None):
+        image_name = imageShape.name
+        content = ""
+        logger.info(f"Finding content for image: {image_name}")
+
+        if image_name.startswith('image'):
+            number = image_name[5:]
+            content_name = f'content{number}'
+            logger.debug(f"Looking for content shape: {content_name}")
+            content = self.findShapeTextByName(slide, content_name, shape_index)
+        
+        elif image_name.startswith('subimage'):
+            number = image_name[8:]
+            subtitle_name = f'subtitle{number}'
+            subcontent_name = f'subcontent{number}'
+            logger.debug(f"Looking for subtitle shape: {subtitle_name}")
+            logger.debug(f"Looking for subcontent shape: {subcontent_name}")
+            subtitle = self.findShapeTextByName(slide, subtitle_name, shape_index)
+            subcontent = self.findShapeTextByName(slide, subcontent_name, shape_index)
+            content = f"{subtitle} {subcontent}".strip()
+
+        # 如果没有找到对应的内容，尝试从其他占位符获取
+        if not content:
+            logger.warning("No specific content found, trying to find generic content")
+            content = self.findGenericContent(slide)
+
+        if content:
+            logger.info(f"Content found: {content[:50]}...")  # 只显示前50个字符
+        else:
+            logger.warning("No content found, using default")
+            content = "Generic image"
+
+        return content
+
+    def findShapeTextByName(self, slide, name, shape_index=None):
+        if shape_index is None:
+            shape_index = PlaceholderIndex(slide.shapes)
+        for shape in shape_index.by_name.get(name, []):
+            if hasattr(shape, 'text'):
+                logger.debug(f"Found shape with name: {name}")
+                return shape.text
+        logger.debug(f"Shape not found: {name}")
+        return ""
+
+    def findGenericContent(self, slide):
+        content = ""
+        for shape in slide.shapes:
+            if hasattr(shape, 'text') and ('content' in shape.name.lower() or 'title' in shape.name.lower()):
+                logger.debug(f"Found generic content in shape: {shape.name}")
+                content += shape.text + " "
+        return content.strip()
+
+    def extractKeywords(self, text, nlp_method=None):
+        logger.info("Extracting keywords")
+        if nlp_method is None:
+            nlp_method = self.nlp_method
+        
+        prompt = f"""
+        Analyze the following text and extract 4 key concepts that would be most suitable for generating an image. 
+        The concepts should capture the essence of the text, even if not directly mentioned. 
+        If there is no prompt, please reply in English.
+        Provide the 4 keywords or short phrases thinking in the following direction:
+
+        1. Scene: [Overall scene or setting]
+        2. Style: [Visual style or artistic approach]
+        3. Subject: [Main subject or focus]
+        4. Mood: [Emotional tone or atmosphere]
+        
+        Provide only the 4 keywords or short phrases, separated by commas, without any additional explanation:
+
+        Text: {text}
+        """
+
+        # 相同的提示词、后端与模型直接使用缓存结果, 不再调用模型
+        model = self.nlpModel(nlp_method)
+        if self.keywordCache is not None:
+            keywords = self.keywordCache.get(prompt, nlp_method, model)
+            if keywords:
+                logger.info(f"Using cached keywords: {keywords}")
+                return keywords
+
+        keywords = None
+        if nlp_method == 'Ollama':
+            keywords = self.extractKeywordsOllama(prompt)
+        elif nlp_method == 'ChatGPT':
+            keywords = self.extractKeywordsChatGPT(prompt)
+        if keywords and self.keywordCache is not None:
+            self.keywordCache.put(prompt, nlp_method, model, keywords)
+        return keywords
+
+    def nlpModel(self, nlp_method):
+        nlp_config = self.config.get('nlp', {})
+        if nlp_method == 'Ollama':
+            return nlp_config.get('ollama', {}).get('model', "llama3.1")
+        elif nlp_method == 'ChatGPT':
+            return nlp_config.get('chatgpt', {}).get('model', 'gpt-3.5-turbo')
+        
+    def extractKeywordsOllama(self, prompt):
+        logger.info("Extracting keywords using Ollama API")
+        ollama_config = self.config.get('nlp', {}).get('ollama', {})
+        ollama_url = ollama_config.get('url', "http://localhost:11434/api/generate")
+        
+        data = {
+            "model": ollama_config.get('model', "llama3.1"),
+            "prompt": prompt,
+            "stream": False
+        }
+        
+        try:
+            response = self.http.post(ollama_url, json=data)
+            response.raise_for_status()
+            result = response.json()
+            keywords = result['response'].strip()
+            logger.info(f"Extracted keywords: {keywords}")
+            return keywords
+        except requests.RequestException as e:
+            logger.error(f"Error in Ollama API call: {e}")
+            return ""
+
+    def extractKeywordsChatGPT(self, prompt):
+        logger.info("Extracting keywords using ChatGPT API")
+        if openai is None:
+            logger.error("The openai package is not installed")
+            return ""
+        chatgpt_config = self.config.get('nlp', {}).get('chatgpt', {})
+        openai.api_key = chatgpt_config.get('api_key', '')
+        model = chatgpt_config.get('model', 'gpt-3.5-turbo')  # 从配置文件中获取模型，默认为 'gpt-3.5-turbo'
+
+        try:
+            response = openai.ChatCompletion.create(
+                model=model,  # 使用从配置文件中读取的模型
+                messages=[
+                    {"role": "system", "content": "You are a helpful assistant that extracts keywords from text."},
+                    {"role": "user", "content": f"Please extract key words from the following text: {prompt}"}
+                ]
+            )
+            keywords = response.choices[0].message['content'].strip()
+            logger.info(f"Extracted keywords: {keywords}")
+            return keywords
+        except openai.error.OpenAIError as e:
+            logger.error(f"Error in ChatGPT API call: {e}")
+            return ""
+
+    def generateImage(self, keywords, method=None):
+        method = method or self.generation_method
+        logger.info(f"Generating image using method: {method}")
+        if method == 'Comfyui生成':
+            return self.generateImageComfyui(keywords)
+        elif method == 'DALL-E':
+            return self.generateImageDALLE(keywords)
+        elif method == 'Pixabay':
+            return self.searchImagePixabay(keywords)
+        elif method == 'Unsplash':
+            return self.searchImageUnsplash(keywords)
+
+    def comfyuiClient(self):
+        # 所有工作线程共享一个客户端(一个 websocket 连接)
+        with self._comfyuiLock:
+            if self._comfyui is None:
+                comfyui_config = self.config.get('image_generation', {}).get('comfyui', {})
+                self._comfyui = ComfyuiClient.from_config(comfyui_config, self.http)
+            return self._comfyui
+
+    def comfyuiWorkflowFile(self):
+        # 返回工作流文件的 (内容, sha256), 按修改时间与大小缓存, 每个占位符不再重新读取和计算哈希
+        comfyui_config = self.config.get('image_generation', {}).get('comfyui', {})
+        path = comfyui_config.get('workflow_path', './Input/workflow.json')
+        stat = os.stat(path)
+        with self._workflowLock:
+            cached = self._workflow
+        if cached is not None and cached[:3] == (path, stat.st_mtime_ns, stat.st_size):
+            return cached[3:]
+        with open(path, 'rb') as file:
+            data = file.read()
+        digest = hashlib.sha256(data).hexdigest()
+        with self._workflowLock:
+            self._workflow = (path, stat.st_mtime_ns, stat.st_size, data, digest)
+        return data, digest
+
+    def loadComfyuiWorkflow(self, keywords):
+        # 每次从缓存的内容重新解析, apply_keywords 修改的是新的字典
+        try:
+            workflow = json.loads(self.comfyuiWorkflowFile()[0])
+        except FileNotFoundError:
+            logger.error("Comfyui workflow file not found")
+            return None
+        except json.JSONDecodeError:
+            logger.error("Invalid JSON in Comfyui workflow file")
+            return None
+        return apply_keywords(workflow, keywords)
+
+    def enqueueComfyui(self, jobs, nlp_method, executor):
+        # Comfyui 批量模式: 所有占位符的关键词在线程池中并发提取, 每得到一组关键词就立即提交到 Comfyui 队列,
+        # 队列中始终有待执行的任务, GPU 不会空闲; 返回与 jobs 一一对应的 Future, 图像按完成顺序填入
+        keyword_futures = [executor.submit(self.extractKeywords, job.content, nlp_method) for job in jobs]
+        results = [Future() for _ in jobs]
+        labels = [job.label for job in jobs]
+        threading.Thread(target=self.runComfyuiQueue, args=(labels, keyword_futures, results),
+                         name='comfyui-queue', daemon=True).start()
+        return results
+
+    def runComfyuiQueue(self, labels, keyword_futures, results):
+        # 后台线程的入口: 出现任何错误(包括创建客户端失败)时, 尚未完成的 Future 都设为失败, 主线程不会一直等待
+        error = None
+        try:
+            self.collectComfyuiResults(labels, keyword_futures, results)
+        except Exception as e:
+            logger.error(f"Error in Comfyui queue: {e}")
+            error = e
+        finally:
+            for result in results:
+                if not result.done():
+                    result.set_exception(error or RuntimeError("Comfyui queue stopped before the image was generated"))
+
+    def collectComfyuiResults(self, labels, keyword_futures, results):
+        comfyui_config = self.config.get('image_generation', {}).get('comfyui', {})
+        client = self.comfyuiClient()
+        submitted = {}  # prompt_id -> (序号, 关键词)
+        # 按关键词提取完成的顺序提交, 慢的提取不会挡住后面已经得到关键词的占位符
+        indexes = {keyword_future: index for index, keyword_future in enumerate(keyword_futures)}
+        for keyword_future in as_completed(indexes):
+            index = indexes[keyword_future]
+            try:
+                keywords = keyword_future.result()
+                logger.info(f"Extracted keywords: {keywords}")
+                if not keywords:
+                    raise RuntimeError("Keyword extraction failed")
+                if self.imageCache is not None:
+                    data = self.imageCache.get(self.imageCacheKey(keywords, 'Comfyui生成'))
+                    if data:
+                        logger.info(f"Using cached image for {labels[index]}")
+                        results[index].set_result(open_image_bytes(data))
+                        continue
+                workflow = self.loadComfyuiWorkflow(keywords)
+                if workflow is None:
+                    raise RuntimeError("Comfyui workflow could not be loaded")
+                prompt_id = client.submit(workflow)
+                submitted[prompt_id] = (index, keywords)
+                logger.info(f"Queued Comfyui prompt {prompt_id} for {labels[index]}")
+            except Exception as e:
+                results[index].set_exception(e)
+
+        logger.info(f"Waiting for {len(submitted)} Comfyui prompts")
+        try:
+            for prompt_id, entry in client.iter_completed(list(submitted), comfyui_config.get('timeout', 600)):
+                index, keywords = submitted.pop(prompt_id)
+                try:
+                    if isinstance(entry, Exception):
+                        raise entry
+                    image = open_image_bytes(client.fetch_image(first_image(entry)))
+                    logger.info(f"Image successfully retrieved from Comfyui for {labels[index]}")
+                    if self.imageCache is not None:
+                        self.imageCache.put(self.imageCacheKey(keywords, 'Comfyui生成'), image.encoded_bytes)
+                    results[index].set_result(image)
+                except Exception as e:
+                    results[index].set_exception(e)
+        except Exception as e:
+            logger.error(f"Error in Comfyui API call: {e}")
+            for index, _ in submitted.values():
+                results[index].set_exception(e)
+
+    def generateImageComfyui(self, keywords):
+        logger.info(f"Generating image with Comfyui using keywords: {keywords}")
+        comfyui_config = self.config.get('image_generation', {}).get('comfyui', {})
+        workflow = self.loadComfyuiWorkflow(keywords)
+        if workflow is None:
+            return None
+
+        try:
+            # 提交工作流, 完成后(websocket通知或轮询)立即下载图像
+            data = self.comfyuiClient().generate(workflow, comfyui_config.get('timeout', 600))
+            return open_image_bytes(data)
+        except requests.RequestException as e:
+            logger.error(f"Error in Comfyui API call: {e}")
+            return None
+        except ComfyuiError as e:
+            logger.error(str(e))
+            return None
+        except TimeoutError:
+            logger.warning("Timed out waiting for Comfyui image generation")
+            return None
+        except Exception as e:
+            logger.error(f"Unexpected error in generateImageComfyui: {e}")
+            return None
+
+    def generateImageDALLE(self, keywords):
+        logger.info(f"Generating image with DALL-E using keywords: {keywords}")
+        if openai is None:
+            logger.error("The openai package is not installed")
+            return None
+        dalle_config = self.config.get('image_generation', {}).get('dalle', {})
+        openai.api_key = dalle_config.get('api_key', '')
+
+        try:
+            response = openai.Image.create(
+                prompt=keywords,
+                n=1,
+                size="1024x1024"
+            )
+            image_url = response['data'][0]['url']
+            image_response = self.http.get(image_url)
+            image_response.raise_for_status()
+            image = open_image_bytes(image_response.content)
+            logger.info("Image generated successfully with DALL-E")
+            return image
+        except (openai.error.OpenAIError, requests.RequestException) as e:
+            logger.error(f"Error generating image with DALL-E: {e}")
+            return None
+
+    def searchImagePixabay(self, keywords):
+        logger.info(f"Original keywords: {keywords}")
+        
+        # 提取所有类型的关键词，每类取前三个词
+        extracted_keywords = []
+        for line in keywords.split('\n'):
+            parts = line.split(':', 1)
+            if len(parts) == 2:
+                keyword = parts[1].strip().rstrip(',')
+                keyword_parts = keyword.split()[:2]
+                extracted_keywords.extend(keyword_parts)
+        
+        # 将提取的关键词组合成一个搜索字符串
+        search_keywords = ' '.join(extracted_keywords)
+        logger.info(f"Extracted keywords for Pixabay search: {search_keywords}")
+
+        pixabay_config = self.config.get('pixabay', {})
+        api_key = pixabay_config.get('api_key', '')
+
+        logger.debug(f"Pixabay API key: {api_key[:5]}...{api_key[-5:] if len(api_key) > 10 else ''}")
+
+        url = "https://pixabay.com/api/"
+
+        params = {
+            "key": api_key,
+            "q": search_keywords,
+            "image_type": "photo",
+            "per_page": 20,  # 增加返回的图片数量
+            "order": "random"  # 使用随机排序
+        }
+
+        try:
+            response = self.http.get(url, params=params)
+            response.raise_for_status()
+            data = response.json()
+            if data["hits"]:
+                # 随机选择一张图片
+                image_url = random.choice(data["hits"])["largeImageURL"]
+                image_response = self.http.get(image_url)
+                image_response.raise_for_status()
+                image = open_image_bytes(image_response.content)
+                logger.info(f"Image found successfully on Pixabay for keywords: {search_keywords}")
+                return image
+            else:
+                logger.warning(f"No images found on Pixabay for keywords: {search_keywords}")
+                return None
+        except requests.RequestException as e:
+            logger.error(f"Error searching image on Pixabay: {e}")
+            return None
+    
+    def searchImageUnsplash(self, keywords):
+        logger.info(f"Searching image on Unsplash using keywords: {keywords}")
+        unsplash_config = self.config.get('image_generation', {}).get('unsplash', {})
+        access_key = unsplash_config.get('access_key', '')
+        url = "https://api.unsplash.com/search/photos"
+
+        headers = {
+            "Authorization": f"Client-ID {access_key}"
+        }
+        params = {
+            "query": keywords,
+            "per_page": 1
+        }
+
+        try:
+            response = self.http.get(url, headers=headers, params=params)
+            response.raise_for_status()
+            data = response.json()
+            if data["results"]:
+                image_url = data["results"][0]["urls"]["regular"]
+                image_response = self.http.get(image_url)
+                image_response.raise_for_status()
+                image = open_image_bytes(image_response.content)
+                logger.info("Image found successfully on Unsplash")
+                return image
+            else:
+                logger.warning("No images found on Unsplash")
+                return None
+        except requests.RequestException as e:
+            logger.error(f"Error searching image on Unsplash: {e}")
+            return None
+
+    def insertImage(self, slide, shape, image):
+        logger.info(f"Inserting new image for shape: {shape.name}")
+        # 调整图片大小和裁剪
+        placeholder_ratio = shape.width / shape.height
+        image_ratio = image.width / image.height
+        
+        if image_ratio > placeholder_ratio:
+            new_width = int(image.height * placeholder_ratio)
+            left_margin = (image.width - new_width) / 2
+            image = image.crop((left_margin, 0, left_margin + new_width, image.height))
+        else:
+            new_height = int(image.width / placeholder_ratio)
+            top_margin = (image.height - new_height) / 2
+            image = image.crop((0, top_margin, image.width, top_margin + new_height))
+        
+        # 按占位符的实际尺寸与目标DPI缩小图片(shape.width/height 为EMU, 914400 EMU = 1 英寸), 只缩小不放大
+        target_size = render_size(shape.width, shape.height, self.config.get('insert', {}).get('target_dpi', 150))
+        original_size = image.size
+        image.thumbnail(target_size, Image.LANCZOS)
+        logger.debug(f"Image resampled from {original_size} to {image.size} for {target_size} at target DPI")
+        
+        # 在内存中编码, 不经过临时文件
+        image_stream, image_format = encode_for_slide(image, self.config.get('insert', {}).get('jpeg_quality', 90))
+        logger.debug(f"Image encoded in memory as {image_format}: {image_stream.getbuffer().nbytes} bytes")
+        
+        # 插入图片
+        left = shape.left
+        top = shape.top
+        width = shape.width
+        height = shape.height
+        new_picture = slide.shapes.add_picture(image_stream, left, top, width, height)
+        new_picture.name = shape.name  # 保持原有图片占位符的名字
+        logger.info(f"New image inserted into slide with name: {new_picture.name}")
+        
+        # 将新插入的图片移动到最底层
+        slide.shapes._spTree.remove(new_picture._element)
+        slide.shapes._spTree.insert(2, new_picture._element)
+        logger.info("New image moved to the bottom layer")
+        
+        # 删除原来的形状
+        sp = shape._element
+        sp.getparent().remove(sp)
+        logger.info("Original shape removed")
+
+# ---------------------------------------------------------------- 命令行与进程池
+
+# 每个工作进程只创建一次流水线(连接池、缓存与 Comfyui 连接在同一进程的文件之间复用)
+_worker_pipeline = None
+
+def _init_worker(config, nlp_method, generation_method, max_workers, log_level=None):
+    global _worker_pipeline
+    if log_level:
+        logging.basicConfig(level=log_level, format=LOG_FORMAT)
+    _worker_pipeline = ImagePipeline(config, nlp_method, generation_method, max_workers)
+
+def process_deck(pptFile, pages=None, output_dir='Outfile'):
+    # 在工作进程中处理单个文件, 返回 (状态, 结果, 错误信息)
+    try:
+        return 'OK', _worker_pipeline.process(pptFile, pages, output_dir), None
+    except Exception as e:
+        return 'FAILED', None, f"{type(e).__name__}: {e}"
+
+def run_batch(ppt_files, config, nlp_method, generation_method, pages=None, output_dir='Outfile',
+              max_workers=None, processes=1, log_level=None):
+    results = []
+    start = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=processes, initializer=_init_worker,
+                             initargs=(config, nlp_method, generation_method, max_workers, log_level)) as executor:
+        futures = {executor.submit(process_deck, ppt_file, pages, output_dir): ppt_file for ppt_file in ppt_files}
+        for future in as_completed(futures):
+            ppt_file = futures[future]
+            status, result, error = future.result()
+            if status == 'OK':
+                print(f"[OK] {ppt_file} -> {result['output']} ({result['placeholders'] - len(result['failed'])}/"
+                      f"{result['placeholders']} images, {result['seconds']:.2f}s)")
+                for failure in result['failed']:
+                    print(f"    failed {failure['placeholder']}: {failure['error']}")
+            else:
+                print(f"[FAILED] {ppt_file}: {error}")
+            results.append((ppt_file, status, result, error))
+    total_time = time.perf_counter() - start
+    succeeded = sum(1 for result in results if result[1] == 'OK')
+    print(f"\nProcessed {succeeded}/{len(results)} decks in {total_time:.2f}s")
+    return results
+
+def main(argv=None):
+    providers = {'comfyui': 'Comfyui生成', 'dalle': 'DALL-E', 'pixabay': 'Pixabay', 'unsplash': 'Unsplash'}
+    nlp_methods = {'ollama': 'Ollama', 'chatgpt': 'ChatGPT'}
+    parser = argparse.ArgumentParser(description="为PPT中的图片占位符生成图片 (无界面)")
+    parser.add_argument('inputs', nargs='+', help="PPTX文件、目录或通配符")
+    parser.add_argument('-p', '--pages', help="页码范围, 例如 '1-3,5', 默认为全部幻灯片")
+    parser.add_argument('--nlp', choices=sorted(nlp_methods), default='ollama', help="关键词提取模型")
+    parser.add_argument('--provider', choices=sorted(providers), default='comfyui', help="图像生成方式")
+    parser.add_argument('-w', '--workers', type=int, help="每个文件的并发数, 默认使用 config.json 中的 pipeline.max_workers")
+    parser.add_argument('-j', '--processes', type=int, default=1, help="同时处理的文件数(进程数)")
+    parser.add_argument('-o', '--output-dir', default='Outfile', help="文件保存路径")
+    parser.add_argument('-c', '--config', default='config.json', help="配置文件")
+    parser.add_argument('--log-level', choices=['DEBUG', 'INFO', 'WARNING', 'ERROR'], default='INFO', help="日志级别")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=args.log_level, format=LOG_FORMAT)
+    ppt_files = collect_ppt_files(args.inputs)
+    missing = [ppt_file for ppt_file in ppt_files if not os.path.exists(ppt_file)]
+    if not ppt_files or missing:
+        print(f"PPT file not found: {', '.join(missing)}" if missing else "No PPT files found")
+        return 2
+    try:
+        pages = parse_pages(args.pages) if args.pages else None
+    except ValueError:
+        print(f"Invalid page range: {args.pages}")
+        return 2
+
+    results = run_batch(ppt_files, load_config(args.config), nlp_methods[args.nlp], providers[args.provider], pages,
+                        args.output_dir, args.workers, args.processes, args.log_level)
+    return 0 if all(status == 'OK' and not result['failed'] for _, status, result, _ in results) else 1
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,150 @@
+import os
+import sys
+import glob
+import time
+import argparse
+import logging
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from GpptCore import iter_markdown, create_pptx
+from GpptIncremental import build_incremental, discard_manifest, find_base_file
+from GpptTiming import PipelineTimer, write_timing_json, write_chrome_trace
+from GpptTemplate import TemplateCache
+from GpptSave import DEFAULT_COMPRESS_LEVEL
+from GpptValidate import validate_markdown, print_report
+
+LOG_FORMAT = '%(asctime)s - %(processName)s - %(levelname)s - %(message)s'
+
+# 每个工作进程只解析一次模板, 之后每个文件都从内存快照打开
+_worker_cache = TemplateCache(max_entries=1)
+
+def _init_worker(template_file, log_level=None):
+    if log_level:
+        logging.basicConfig(level=log_level, format=LOG_FORMAT)
+    _worker_cache.snapshot(template_file)
+
+def convert_markdown(markdown_file, template_file, output_file, incremental=False, compress_level=DEFAULT_COMPRESS_LEVEL,
+                     base=None):
+    # 在工作进程中转换单个Markdown文件, 返回 (状态, 幻灯片数, 耗时, 错误信息, 计时数据)
+    # base 为增量生成的基础文件或 Gimage 输出目录(见 GpptIncremental.find_base_file)
+    start = time.perf_counter()
+    timer = PipelineTimer(markdown_file)
+    try:
+        if incremental:
+            slide_count, _ = build_incremental(iter_markdown(markdown_file), template_file, output_file,
+                                               base_file=find_base_file(output_file, base), timer=timer,
+                                               template_cache=_worker_cache, compress_level=compress_level)
+        else:
+            slide_count = create_pptx(iter_markdown(markdown_file), template_file, output_file,
+                                      timer=timer, template_cache=_worker_cache, compress_level=compress_level)
+            discard_manifest(output_file)
+        return 'OK', slide_count, time.perf_counter() - start, None, timer.to_dict()
+    except Exception as e:
+        return 'FAILED', 0, time.perf_counter() - start, f"{type(e).__name__}: {e}", timer.to_dict()
+
+def collect_markdown_files(inputs):
+    # 输入可以是目录、通配符或单个文件
+    files = []
+    for item in inputs:
+        if os.path.isdir(item):
+            matches = sorted(glob.glob(os.path.join(item, '*.md')))
+        elif glob.has_magic(item):
+            matches = sorted(glob.glob(item, recursive=True))
+        else:
+            matches = [item]
+        for path in matches:
+            if path not in files:
+                files.append(path)
+    return files
+
+def plan_outputs(markdown_files, output_dir):
+    # 输出文件名沿用Markdown文件名, 重名时添加序号
+    outputs = []
+    used = set()
+    for markdown_file in markdown_files:
+        stem = os.path.splitext(os.path.basename(markdown_file))[0]
+        output_filename = f"{stem}.pptx"
+        counter = 1
+        while output_filename in used:
+            output_filename = f"{stem}_{counter}.pptx"
+            counter += 1
+        used.add(output_filename)
+        outputs.append(os.path.join(output_dir, output_filename))
+    return outputs
+
+def run_batch(markdown_files, template_file, output_dir, workers=None, incremental=False, log_level=None,
+              compress_level=DEFAULT_COMPRESS_LEVEL, base=None):
+    os.makedirs(output_dir, exist_ok=True)
+    outputs = plan_outputs(markdown_files, output_dir)
+    results = []
+    start = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(template_file, log_level)) as executor:
+        futures = {executor.submit(convert_markdown, markdown_file, template_file, output_file, incremental, compress_level, base): (markdown_file, output_file)
+                   for markdown_file, output_file in zip(markdown_files, outputs)}
+        for future in as_completed(futures):
+            markdown_file, output_file = futures[future]
+            status, slide_count, elapsed, error, timing = future.result()
+            if status == 'OK':
+                print(f"[OK] {markdown_file} -> {output_file} ({slide_count} slides, {elapsed:.2f}s)")
+            else:
+                print(f"[FAILED] {markdown_file}: {error}")
+            results.append((markdown_file, output_file, status, slide_count, elapsed, error, timing))
+    total_time = time.perf_counter() - start
+    succeeded = sum(1 for result in results if result[2] == 'OK')
+    throughput = succeeded / total_time if total_time > 0 else 0.0
+    print(f"\nConverted {succeeded}/{len(results)} decks in {total_time:.2f}s ({throughput:.2f} decks/sec)")
+    return results
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="批量将Markdown文件转换为PPTX (无界面)")
+    parser.add_argument('inputs', nargs='+', help="Markdown文件、目录或通配符, 例如 'reports/*.md'")
+    parser.add_argument('-t', '--template', default='Model_PPT/Model.pptx', help="PPT参考模板")
+    parser.add_argument('-o', '--output-dir', default='Outfile', help="文件保存路径")
+    parser.add_argument('-j', '--workers', type=int, default=None, help="并行进程数, 默认为CPU核心数")
+    parser.add_argument('-i', '--incremental', action='store_true', help="增量生成: 只重新生成内容变化的幻灯片")
+    parser.add_argument('--base', help="增量生成的基础文件; 为目录时使用其中最新的 Gimage 输出 updated_<文件名>_*.pptx, "
+                                       "已填充图片的幻灯片在内容未变时保留")
+    parser.add_argument('--compress-level', type=int, choices=range(10), default=DEFAULT_COMPRESS_LEVEL, metavar='0-9',
+                        help="新生成部件的压缩级别, 0为不压缩; 模板中未修改的部件直接复制, 不受影响")
+    parser.add_argument('--check', action='store_true', help="只按模板检查Markdown (布局与占位符是否匹配), 不生成PPT")
+    parser.add_argument('-v', '--verbose', action='store_const', const='DEBUG', dest='log_level', help="输出每个文件的解析与生成细节, 等同于 --log-level DEBUG")
+    parser.add_argument('--log-level', choices=['DEBUG', 'INFO', 'WARNING', 'ERROR'], help="日志级别, 默认不输出日志")
+    parser.add_argument('--timing-json', help="将每个文件各阶段与每页幻灯片的耗时写入JSON文件")
+    parser.add_argument('--trace', help="将耗时写入 Chrome Trace 文件 (chrome://tracing 或 Perfetto 打开)")
+    args = parser.parse_args(argv)
+
+    if not os.path.exists(args.template):
+        print(f"Template file not found: {args.template}")
+        return 2
+    markdown_files = collect_markdown_files(args.inputs)
+    if not markdown_files:
+        print("No markdown files found")
+        return 2
+
+    if args.base and not args.incremental:
+        print("--base requires -i/--incremental")
+        return 2
+    if args.base and not os.path.exists(args.base):
+        print(f"Base file not found: {args.base}")
+        return 2
+    if args.base and os.path.isfile(args.base) and len(markdown_files) > 1:
+        print("--base FILE can only be used with a single markdown file, use a directory for batches")
+        return 2
+
+    if args.log_level:
+        logging.basicConfig(level=args.log_level, format=LOG_FORMAT)
+    if args.check:
+        reports = [validate_markdown(markdown_file, args.template) for markdown_file in markdown_files]
+        for report in reports:
+            print_report(report)
+        return 1 if any(report['errors'] for report in reports) else 0
+    results = run_batch(markdown_files, args.template, args.output_dir, args.workers, args.incremental, args.log_level,
+                        args.compress_level, args.base)
+    timings = [result[6] for result in results]
+    if args.timing_json:
+        write_timing_json(args.timing_json, timings)
+    if args.trace:
+        write_chrome_trace(args.trace, timings)
+    return 0 if all(result[2] == 'OK' for result in results) else 1
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,290 @@
+import os
+import sys
+import copy
+import json
+import time
+import random
+import argparse
+import tempfile
+import statistics
+import multiprocessing
+from queue import Empty
+from pptx import Presentation
+from pptx.opc.constants import RELATIONSHIP_TYPE as RT
+from pptx.oxml.ns import qn
+from pptx.parts.slide import SlideLayoutPart
+from GpptCore import iter_markdown, create_pptx
+from GpptTiming import PipelineTimer
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+BASELINE_DIR = '.benchmarks'
+DEFAULT_SIZES = (10, 100, 1000, 10000)
+R_NAMESPACE = 'http://schemas.openxmlformats.org/officeDocument/2006/relationships'
+
+# ---------------------------------------------------------------- 合成数据
+
+WORDS = ('人工智能', '数据', '模型', '平台', '增长', '市场', '客户', '效率', '创新', '安全',
+         'AI', 'cloud', 'pipeline', 'report', 'strategy', 'quarter', 'revenue', 'latency')
+
+def _sentence(rng, words=12):
+    return ' '.join(rng.choice(WORDS) for _ in range(words))
+
+def generate_markdown(slide_count, max_subtitles=8, seed=0):
+    # 按README中的标题规则生成Markdown: 封面(三个四级标题)、章节、内容页(0~max_subtitles个小标题)、过渡页
+    rng = random.Random(seed)
+    lines = [f"# {_sentence(rng, 4)}", f"#### {_sentence(rng, 3)}", "#### 提报者：bench", "#### 2024年8月3日", ""]
+    generated = 2  # 封面与目录页
+    while generated < slide_count:
+        roll = rng.random()
+        if roll < 0.1:
+            lines += [f"## {_sentence(rng, 3)}", _sentence(rng), ""]
+        elif roll < 0.15:
+            lines += ["---", _sentence(rng, 6), ""]
+        else:
+            lines += [f"### {_sentence(rng, 4)}", _sentence(rng, 20)]
+            for subtitle in range(rng.randint(0, max_subtitles)):
+                lines.append(f"#### {_sentence(rng, 3)}")
+                lines.append(_sentence(rng))
+                if rng.random() < 0.5:
+                    lines += [f"- {_sentence(rng, 5)}" for _ in range(rng.randint(1, 4))]
+            lines.append("")
+        generated += 1
+    return '\n'.join(lines) + '\n'
+
+def clone_layout(source_layout, name):
+    # 复制一个布局部件(含关系)并注册到其所属母版
+    source_part = source_layout.part
+    package = source_part.package
+    partname = package.next_partname('/ppt/slideLayouts/slideLayout%d.xml')
+    element = copy.deepcopy(source_layout._element)
+    layout_part = SlideLayoutPart(partname, source_part.content_type, package, element)
+
+    rId_map = {}
+    for rId, rel in source_part.rels.items():
+        if rel.is_external:
+            rId_map[rId] = layout_part.relate_to(rel.target_ref, rel.reltype, is_external=True)
+        else:
+            rId_map[rId] = layout_part.relate_to(rel.target_part, rel.reltype)
+    for node in element.iter():
+        for attr, value in node.attrib.items():
+            if attr.startswith('{%s}' % R_NAMESPACE) and value in rId_map:
+                node.set(attr, rId_map[value])
+
+    layout = layout_part.slide_layout
+    layout.name = name
+    master = source_layout.slide_master
+    master_rId = master.part.relate_to(layout_part, RT.SLIDE_LAYOUT)
+    layout_id = _next_layout_id(master.part.package)
+    sld_layout_id = master._element.get_or_add_sldLayoutIdLst()._add_sldLayoutId()
+    sld_layout_id.set('id', str(layout_id))
+    sld_layout_id.set(qn('r:id'), master_rId)
+    return layout
+
+def _next_layout_id(package):
+    # 母版与布局的ID共用同一编号空间, 必须不小于 2147483648
+    prs = package.presentation_part.presentation
+    ids = [2147483647]
+    for master in prs.slide_masters:
+        ids += [int(entry.get('id')) for entry in master._element.iter(qn('p:sldLayoutId'))]
+    ids += [int(entry.get('id')) for entry in prs.part._element.iter(qn('p:sldMasterId'))]
+    return max(ids) + 1
+
+def generate_template(output_file, base_template='Model_PPT/Model.pptx', layouts_per_count=20, max_subtitles=8):
+    # 以现有模板的内容页布局为蓝本, 为每种小标题数量生成大量 substance_XX_YYY 布局
+    prs = Presentation(base_template)
+    sources = {}
+    for layout in prs.slide_layouts:
+        parts = layout.name.lower().split('_')
+        if len(parts) == 3 and parts[0] == 'substance' and parts[1].isdigit():
+            sources.setdefault(int(parts[1]), layout)
+    for count in range(max_subtitles + 1):
+        source = sources.get(count) or sources[min(sources, key=lambda c: abs(c - count))]
+        for number in range(1, layouts_per_count + 1):
+            clone_layout(source, f"substance_{count:02d}_{900 + number:03d}")
+    prs.save(output_file)
+    return output_file
+
+# ---------------------------------------------------------------- 测量
+
+def _peak_rss_bytes():
+    # Linux 优先读取 VmHWM: ru_maxrss 会继承 fork 时父进程的峰值, 不能反映子进程本身
+    try:
+        with open('/proc/self/status', 'r') as f:
+            for line in f:
+                if line.startswith('VmHWM:'):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    if resource is None:
+        try:
+            import psutil
+        except ImportError:
+            return None
+        return psutil.Process().memory_info().peak_wset
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == 'darwin' else peak * 1024
+
+def _run_case(markdown_file, template_file, output_file, queue):
+    # 在独立进程中运行, 保证峰值内存只属于当前用例; 出错时也要放入结果, 否则 measure 会一直等待
+    try:
+        timer = PipelineTimer(os.path.basename(markdown_file))
+        start = time.perf_counter()
+        slide_count = create_pptx(iter_markdown(markdown_file), template_file, output_file, timer=timer)
+        elapsed = time.perf_counter() - start
+        queue.put({
+            'slides': slide_count,
+            'seconds': elapsed,
+            'stages': timer.stage_totals(),
+            'peak_rss': _peak_rss_bytes(),
+            'output_size': os.path.getsize(output_file),
+        })
+    except Exception as e:
+        queue.put({'error': f"{type(e).__name__}: {e}"})
+
+def measure(markdown_file, template_file, output_file):
+    # 返回一次运行的结果; 失败时返回 {'error': 错误信息}
+    context = multiprocessing.get_context('spawn')
+    queue = context.Queue()
+    process = context.Process(target=_run_case, args=(markdown_file, template_file, output_file, queue))
+    process.start()
+    while True:
+        try:
+            result = queue.get(timeout=1)
+            break
+        except Empty:
+            if not process.is_alive():
+                # 进程没有放入结果就退出了(例如被系统杀死), 再等一次已写入管道的结果
+                try:
+                    result = queue.get(timeout=1)
+                except Empty:
+                    result = {'error': f"Benchmark process exited with code {process.exitcode}"}
+                break
+    process.join()
+    return result
+
+def run_benchmarks(sizes, templates, rounds=1, max_subtitles=8, work_dir=None):
+    results = {}
+    work_dir = work_dir or tempfile.mkdtemp(prefix='gppt_bench_')
+    for template_name, template_file in templates.items():
+        for size in sizes:
+            markdown_file = os.path.join(work_dir, f"bench_{size}.md")
+            if not os.path.exists(markdown_file):
+                with open(markdown_file, 'w', encoding='utf-8') as f:
+                    f.write(generate_markdown(size, max_subtitles))
+            output_file = os.path.join(work_dir, f"bench_{template_name}_{size}.pptx")
+            case = f"{template_name}-{size}"
+            runs = []
+            for _ in range(rounds):
+                run = measure(markdown_file, template_file, output_file)
+                if 'error' in run:
+                    break
+                runs.append(run)
+            if 'error' in run:
+                results[case] = {'error': run['error']}
+                print(f"{case:<22}FAILED: {run['error']}")
+                continue
+            seconds = statistics.median(run['seconds'] for run in runs)
+            slides = runs[0]['slides']
+            parse_seconds = statistics.median(run['stages'].get('parse', 0.0) for run in runs)
+            results[case] = {
+                'slides': slides,
+                'seconds': seconds,
+                'slides_per_sec': slides / seconds if seconds else 0.0,
+                'parse_slides_per_sec': slides / parse_seconds if parse_seconds else 0.0,
+                'stages': runs[0]['stages'],
+                'peak_rss': max((run['peak_rss'] or 0) for run in runs) or None,
+                'output_size': runs[0]['output_size'],
+            }
+            print(format_row(case, results[case]))
+    return results
+
+# ---------------------------------------------------------------- 报告与基线
+
+HEADER = f"{'case':<22}{'slides':>8}{'seconds':>10}{'slides/s':>11}{'parse/s':>12}{'peak RSS MB':>13}{'output MB':>11}"
+
+def format_row(case, result):
+    rss = f"{result['peak_rss'] / 2**20:.1f}" if result['peak_rss'] else '-'
+    return (f"{case:<22}{result['slides']:>8}{result['seconds']:>10.3f}{result['slides_per_sec']:>11.1f}"
+            f"{result['parse_slides_per_sec']:>12.0f}{rss:>13}{result['output_size'] / 2**20:>11.2f}")
+
+def baseline_path(name):
+    return os.path.join(BASELINE_DIR, f"{name}.json")
+
+def save_baseline(name, results):
+    os.makedirs(BASELINE_DIR, exist_ok=True)
+    with open(baseline_path(name), 'w', encoding='utf-8') as f:
+        json.dump({'created': time.strftime('%Y-%m-%d %H:%M:%S'), 'results': results}, f, indent=2)
+
+def compare_with_baseline(name, results, threshold):
+    # 吞吐量下降或内存/输出大小增加超过阈值即视为回归
+    with open(baseline_path(name), 'r', encoding='utf-8') as f:
+        baseline = json.load(f)['results']
+    regressions = []
+    print(f"\nComparison with baseline '{name}' (threshold {threshold:.0%}):")
+    for case, result in results.items():
+        old = baseline.get(case)
+        if 'error' in result:
+            print(f"  {case:<22} failed")
+            continue
+        if not old or 'error' in old:
+            print(f"  {case:<22} no baseline")
+            continue
+        checks = [('slides/s', old['slides_per_sec'], result['slides_per_sec'], 1, True),
+                  ('peak RSS MB', old['peak_rss'], result['peak_rss'], 2**20, False),
+                  ('output MB', old['output_size'], result['output_size'], 2**20, False)]
+        for metric, before, after, unit, higher_is_better in checks:
+            if not before or not after:
+                continue
+            change = (after - before) / before
+            regressed = change < -threshold if higher_is_better else change > threshold
+            marker = 'REGRESSION' if regressed else 'ok'
+            print(f"  {case:<22} {metric:<12} {before / unit:>10.2f} -> {after / unit:>10.2f} ({change:+.1%}) {marker}")
+            if regressed:
+                regressions.append((case, metric, change))
+    return regressions
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Gppt 性能基准测试: 合成Markdown与模板, 统计吞吐量、峰值内存与输出大小")
+    parser.add_argument('--sizes', type=int, nargs='+', default=list(DEFAULT_SIZES), help="幻灯片数量")
+    parser.add_argument('--max-subtitles', type=int, default=8, help="内容页最多的小标题数量")
+    parser.add_argument('--template', default='Model_PPT/Model.pptx', help="基准模板")
+    parser.add_argument('--layouts-per-count', type=int, default=20,
+                        help="合成模板中每种小标题数量的布局数, 0 表示不测试合成模板")
+    parser.add_argument('--rounds', type=int, default=1, help="每个用例运行次数(取中位数)")
+    parser.add_argument('--work-dir', help="保存合成文件与输出的目录, 默认使用临时目录")
+    parser.add_argument('--save', metavar='NAME', help=f"将结果保存为基线 {BASELINE_DIR}/NAME.json")
+    parser.add_argument('--compare', metavar='NAME', help="与已保存的基线比较")
+    parser.add_argument('--threshold', type=float, default=0.1, help="回归阈值, 默认 0.1 (10%%)")
+    args = parser.parse_args(argv)
+
+    work_dir = args.work_dir or tempfile.mkdtemp(prefix='gppt_bench_')
+    os.makedirs(work_dir, exist_ok=True)
+    templates = {'model': args.template}
+    if args.layouts_per_count > 0:
+        synthetic = os.path.join(work_dir, f"synthetic_{args.layouts_per_count}.pptx")
+        if not os.path.exists(synthetic):
+            generate_template(synthetic, args.template, args.layouts_per_count, args.max_subtitles)
+        templates['synthetic'] = synthetic
+
+    print(HEADER)
+    results = run_benchmarks(args.sizes, templates, args.rounds, args.max_subtitles, work_dir)
+    failed = [case for case, result in results.items() if 'error' in result]
+    if args.save:
+        save_baseline(args.save, results)
+        print(f"\nBaseline saved to {baseline_path(args.save)}")
+    if args.compare:
+        regressions = compare_with_baseline(args.compare, results, args.threshold)
+        if regressions:
+            print(f"\n{len(regressions)} regression(s) found")
+            return 1
+    if failed:
+        print(f"\n{len(failed)} case(s) failed: {', '.join(failed)}")
+        return 1
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,394 @@
+import os
+import re
+import random
+import logging
+from io import BytesIO
+from pptx import Presentation
+from pptx.util import Pt
+from pptx.enum.text import PP_ALIGN
+from GpptTiming import NULL_TIMER
+from GpptSave import PackageBaseline, save_presentation, DEFAULT_COMPRESS_LEVEL
+
+# 默认不输出任何日志, 由调用方配置日志级别
+logger = logging.getLogger(__name__)
+logger.addHandler(logging.NullHandler())
+
+LIST_ITEM_PREFIXES = ('- ', '* ', '+ ', '1. ', '2. ', '3. ')
+
+def process_content_line(line):
+    # 检测列表项
+    if line.lstrip().startswith(LIST_ITEM_PREFIXES):
+        # 如果是标准列表项,只缩进四个空格
+        return '    ' + line.lstrip()
+    elif line.startswith('\t'):  # 检测 TAB 缩进
+        # 如果是 TAB 缩进的列表项,替换 TAB 为四个空格
+        return '    ' + line.lstrip('\t')
+    return line
+
+def _finish_slide(slide):
+    # 内容块在解析时以行列表累积, 输出时才拼接
+    return {'type': slide['type'], 'title': slide['title'],
+            'content': [(content_type, '\n'.join(block)) for content_type, block in slide['content']]}
+
+def _iter_slides(lines):
+    current_slide = {'type': None, 'title': None, 'content': []}  # 当前处理的幻灯片, 内容为 [类型, 行列表]
+    subtitle_count = 0  # 四级标题计数
+    content_count = 0  # 内容计数
+    subcontent_count = 0  # 子内容计数
+    last_content_type = None  # 上一个内容的类型
+
+    for line in lines:
+        line = line.rstrip('\n')
+        if line.startswith('# '):  # 一级标题:封面
+            if current_slide['type']:
+                yield _finish_slide(current_slide)
+            current_slide = {'type': 'cover', 'title': line[2:], 'content': []}
+            subtitle_count = content_count = subcontent_count = 0
+            last_content_type = None
+        elif line.startswith('## '):  # 二级标题:章节
+            if current_slide['type']:
+                yield _finish_slide(current_slide)
+            current_slide = {'type': 'chapter', 'title': line[3:], 'content': []}
+            subtitle_count = content_count = subcontent_count = 0
+            last_content_type = None
+        elif line.startswith('### '):  # 三级标题:主要内容
+            if current_slide['type']:
+                yield _finish_slide(current_slide)
+            current_slide = {'type': 'substance', 'title': line[4:], 'content': []}
+            subtitle_count = content_count = subcontent_count = 0
+            last_content_type = None
+        elif line.startswith('#### '):  # 四级标题:子标题
+            subtitle_count += 1
+            current_slide['content'].append((f'subtitle{subtitle_count:02d}', [line[5:]]))
+            subcontent_count = 0
+            last_content_type = 'subtitle'
+        elif line.strip() == '---':  # 分隔线:翻译幻灯片
+            if current_slide['type']:
+                yield _finish_slide(current_slide)
+            current_slide = {'type': 'translate', 'title': None, 'content': []}
+            subtitle_count = content_count = subcontent_count = 0
+            last_content_type = None
+        elif line.strip():  # 非空行:内容
+            if current_slide['type'] in ['substance', 'chapter']:
+                if last_content_type == 'subtitle' or subcontent_count > 0:
+                    subcontent_count += 1
+                    if subcontent_count == 1:
+                        current_slide['content'].append((f'subcontent{subtitle_count:02d}', [process_content_line(line)]))
+                    else:
+                        current_slide['content'][-1][1].append(process_content_line(line))
+                else:
+                    content_count += 1
+                    if content_count == 1 or last_content_type != 'content':
+                        current_slide['content'].append((f'content{content_count:02d}', [process_content_line(line)]))
+                    else:
+                        current_slide['content'][-1][1].append(process_content_line(line))
+            else:
+                content_count += 1
+                current_slide['content'].append((f'content{content_count:02d}', [process_content_line(line)]))
+            last_content_type = 'content'
+
+    # 添加最后一个幻灯片
+    if current_slide['type']:
+        yield _finish_slide(current_slide)
+
+def _scan_toc(lines):
+    # 只扫描标题行, 得到目录页(没有封面时返回None)
+    has_cover = False
+    chapters = []
+    for line in lines:
+        if line.startswith('# '):
+            has_cover = True
+        elif line.startswith('## '):
+            chapters.append(line[3:].rstrip('\n'))
+    return _toc_slide(chapters) if has_cover else None
+
+def _toc_slide(chapters):
+    return {'type': 'toc', 'title': '目录', 'content': [('content01', '\n'.join(chapters))]}
+
+def iter_markdown(source):
+    # 流式解析Markdown, 逐页生成幻灯片; source 可以是文件路径或已打开的文本文件
+    if isinstance(source, (str, os.PathLike)):
+        with open(source, 'r', encoding='utf-8') as file:
+            yield from iter_markdown(file)
+        return
+
+    if source.seekable():
+        # 目录页位于第一页之后, 需要提前知道全部章节: 先扫描一遍标题行再回到起点
+        start = source.tell()
+        toc_slide = _scan_toc(source)
+        source.seek(start)
+        slides = _iter_slides(source)
+        for slide_index, slide in enumerate(slides):
+            yield slide
+            if slide_index == 0 and toc_slide:
+                yield toc_slide
+        return
+
+    # 不可回退的输入流: 第一页之后的幻灯片需缓存到末尾才能确定目录
+    slides = _iter_slides(source)
+    first_slide = next(slides, None)
+    if first_slide is None:
+        return
+    yield first_slide
+    remaining = list(slides)
+    if first_slide['type'] == 'cover' or any(slide['type'] == 'cover' for slide in remaining):
+        yield _toc_slide([slide['title'] for slide in [first_slide] + remaining if slide['type'] == 'chapter'])
+    yield from remaining
+
+def parse_markdown(file_path):
+    slides = list(iter_markdown(file_path))
+
+    # 记录检测内容
+    if logger.isEnabledFor(logging.DEBUG):
+        for i, slide in enumerate(slides):
+            contents = ''.join(f"\n    - [{content_type}] {text}" for content_type, text in slide['content'])
+            logger.debug(f"幻灯片 {i+1}: 类型: {slide['type']}, 标题: {slide['title']}, 内容:{contents}")
+    
+    return slides
+
+# 模板布局名称中可识别的幻灯片类型
+SLIDE_TYPES = ('cover', 'toc', 'chapter', 'substance', 'translate')
+SUBSTANCE_LAYOUT_PATTERN = re.compile(r'substance_(\d+)')
+
+class LayoutIndex:
+    # 模板布局索引: 每个Presentation只构建一次, 按幻灯片类型与小标题数量直接查找候选布局
+    def __init__(self, slide_layouts):
+        self.layouts = list(slide_layouts)
+        self._by_type = {}  # 幻灯片类型 -> 布局列表
+        self._by_substance_digits = {}  # 'substance_' 之后的数字前缀 -> 布局列表
+        self._fallback = {}  # 非标准类型的查找结果缓存
+        for layout in self.layouts:
+            name = layout.name.lower()
+            for slide_type in SLIDE_TYPES:
+                if slide_type in name:
+                    self._by_type.setdefault(slide_type, []).append(layout)
+            # 与 "substance_{n:02d}" 子串匹配等价: 记录每个数字串长度不小于2的所有前缀
+            prefixes = set()
+            for digits in SUBSTANCE_LAYOUT_PATTERN.findall(name):
+                prefixes.update(digits[:end] for end in range(2, len(digits) + 1))
+            for prefix in prefixes:
+                self._by_substance_digits.setdefault(prefix, []).append(layout)
+
+    def candidates(self, slide_type, subtitle_count=0):
+        slide_type = slide_type.lower()
+        if slide_type == 'substance':
+            return self._by_substance_digits.get(f"{subtitle_count:02d}", [])
+        if slide_type in SLIDE_TYPES:
+            return self._by_type.get(slide_type, [])
+        if slide_type not in self._fallback:
+            self._fallback[slide_type] = [layout for layout in self.layouts if slide_type in layout.name.lower()]
+        return self._fallback[slide_type]
+
+    def supported(self):
+        # 返回模板支持的幻灯片类型: 内容页对应支持的小标题数量列表, 其他类型为None
+        supported = {slide_type: None for slide_type in SLIDE_TYPES if self._by_type.get(slide_type)}
+        if 'substance' in supported:
+            supported['substance'] = sorted(int(digits) for digits in self._by_substance_digits
+                                            if f"{int(digits):02d}" == digits)
+        return supported
+
+def build_layout_index(prs):
+    return LayoutIndex(prs.slide_layouts)
+
+def substance_subtitle_count(slide):
+    return sum(1 for content_type, _ in slide['content'] if content_type.lower().startswith('subtitle'))
+
+PLACEHOLDER_KEY_PATTERN = re.compile(r'(\w+)(\d+)')
+
+class PlaceholderIndex:
+    # 占位符名称索引: 每页幻灯片在 rename_placeholders 之后构建一次
+    # 精确名称 -> 形状列表, 小写名称 -> 形状, 小写名称前缀(基本类型) -> 按页面顺序排列的形状列表
+    def __init__(self, shapes):
+        self.by_name = {}
+        self.by_lower_name = {}
+        self.by_prefix = {}
+        for shape in shapes:
+            self.by_name.setdefault(shape.name, []).append(shape)
+            name = shape.name.lower()
+            self.by_lower_name.setdefault(name, shape)
+            for end in range(1, len(name) + 1):
+                self.by_prefix.setdefault(name[:end], []).append(shape)
+
+    def get(self, name):
+        # 区分大小写的精确匹配, 返回第一个同名形状
+        shapes = self.by_name.get(name)
+        return shapes[0] if shapes else None
+
+    def find(self, content_type):
+        # 对于标题，直接查找 'Title' 占位符
+        if content_type.lower() == 'title':
+            return self.by_lower_name.get('title')
+
+        # 提取内容类型和序号
+        match = PLACEHOLDER_KEY_PATTERN.match(content_type)
+        if not match:
+            return None
+        # 先查找完全匹配的占位符，没有时再查找基本类型匹配的
+        shape = self.by_lower_name.get(content_type.lower())
+        if shape is None:
+            base_matches = self.by_prefix.get(match.group(1).lower())
+            shape = base_matches[0] if base_matches else None
+        return shape
+
+def rename_placeholders(slide, master_slide):
+    master_placeholders = {}
+    for master_placeholder in master_slide.placeholders:
+        master_placeholders.setdefault(master_placeholder.placeholder_format.idx, master_placeholder)
+    for shape in slide.placeholders:
+        if hasattr(shape, 'placeholder_format'):
+            master_placeholder = master_placeholders.get(shape.placeholder_format.idx)
+            if master_placeholder:
+                shape.name = master_placeholder.name
+
+def select_layout(prs, layout_index, slide, slide_index):
+    slide_type = slide['type']
+    logger.debug(f"Processing slide {slide_index}, type: {slide_type}")
+    
+    if slide_type.lower() == 'substance':
+        subtitle_count = substance_subtitle_count(slide)
+        pattern = f"substance_{subtitle_count:02d}"
+        logger.debug(f"Substance slide detected. Subtitle count: {subtitle_count}, searching for layout with pattern: {pattern}")
+        matching_layouts = layout_index.candidates(slide_type, subtitle_count)
+    else:
+        logger.debug(f"Non-substance slide. Searching for layout with type: {slide_type}")
+        matching_layouts = layout_index.candidates(slide_type)
+    
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug(f"Found {len(matching_layouts)} matching layouts: {', '.join(layout.name for layout in matching_layouts)}")
+    
+    if matching_layouts:
+        slide_layout = random.choice(matching_layouts)
+        logger.debug(f"Selected layout: {slide_layout.name}")
+    else:
+        slide_layout = prs.slide_layouts[0]  # 使用默认布局
+        logger.warning(f"No layout found for slide {slide_index} type '{slide_type}'. Using default layout: {slide_layout.name}")
+    return slide_layout
+
+def add_slide(prs, slide, slide_layout, slide_index):
+    new_slide = prs.slides.add_slide(slide_layout)
+    rename_placeholders(new_slide, slide_layout)  # 重命名占位符
+    placeholder_index = PlaceholderIndex(new_slide.placeholders)
+    
+    if logger.isEnabledFor(logging.DEBUG):
+        placeholders = ', '.join(f"{shape.name} (index: {shape.placeholder_format.idx})" for shape in new_slide.placeholders)
+        logger.debug(f"Slide {slide_index} ({slide['type']}) placeholders after renaming: {placeholders}")
+    
+    # 设置标题
+    if slide['title']:
+        title_placeholder = placeholder_index.find('title')
+        if title_placeholder:
+            original_font = title_placeholder.text_frame.paragraphs[0].font
+            original_size = original_font.size
+            original_name = original_font.name
+            original_color = original_font.color.rgb if hasattr(original_font.color, 'rgb') else None
+            original_bold = original_font.bold
+            original_italic = original_font.italic
+
+            title_placeholder.text = slide['title']
+            
+            # 重新应用原有的字体设置
+            new_font = title_placeholder.text_frame.paragraphs[0].font
+            new_font.size = original_size
+            new_font.name = original_name
+            if original_color:
+                new_font.color.rgb = original_color
+            new_font.bold = original_bold
+            new_font.italic = original_italic
+
+            logger.debug(f"Title set: {slide['title']}")
+        else:
+            logger.warning(f"No title placeholder found on slide {slide_index}")
+    
+    # 处理内容
+    for content_type, text in slide['content']:
+        placeholder = placeholder_index.find(content_type)
+        if placeholder:
+            tf = placeholder.text_frame
+            if tf.paragraphs:
+                original_paragraph = tf.paragraphs[0]
+                original_font = original_paragraph.font
+                original_size = original_font.size
+                original_name = original_font.name
+                original_color = original_font.color.rgb if hasattr(original_font.color, 'rgb') else None
+                original_bold = original_font.bold
+                original_italic = original_font.italic
+                original_alignment = original_paragraph.alignment
+
+                p = original_paragraph
+                p.text = text
+            else:
+                p = tf.add_paragraph()
+                p.text = text
+                original_size = Pt(18)  # 默认大小
+                original_name = 'Calibri'  # 默认字体
+                original_color = None
+                original_bold = None
+                original_italic = None
+                original_alignment = PP_ALIGN.LEFT
+
+            # 重新应用原有的字体和段落设置
+            new_font = p.font
+            new_font.size = original_size
+            new_font.name = original_name
+            if original_color:
+                new_font.color.rgb = original_color
+            if original_bold is not None:
+                new_font.bold = original_bold
+            if original_italic is not None:
+                new_font.italic = original_italic
+            p.alignment = original_alignment
+
+            logger.debug(f"Content replaced in {content_type}: {text[:30]}...")
+        else:
+            logger.warning(f"No placeholder found for {content_type} on slide {slide_index}")
+    return new_slide
+
+def load_template(template_file, template_cache=None):
+    # template_cache 为 GpptTemplate.TemplateCache 时从内存快照打开, 避免每次重新读取与解压模板
+    if template_cache is not None and isinstance(template_file, (str, os.PathLike)):
+        return template_cache.open(template_file)
+    return Presentation(template_file)
+
+def open_template(template_file, template_cache=None):
+    # 返回 (Presentation, GpptSave.PackageBaseline), 保存时模板中未修改的部件直接复制压缩数据
+    if template_cache is not None and isinstance(template_file, (str, os.PathLike)):
+        snapshot = template_cache.snapshot(template_file)
+        prs = snapshot.open()
+        return prs, snapshot.baseline_for(prs)
+    if isinstance(template_file, (str, os.PathLike)):
+        with open(template_file, 'rb') as f:
+            data = f.read()
+    else:
+        data = template_file.read()
+    prs = Presentation(BytesIO(data))
+    return prs, PackageBaseline(data, prs.part.package)
+
+def create_pptx(slides, template_file, output_file, timer=NULL_TIMER, template_cache=None,
+                compress_level=DEFAULT_COMPRESS_LEVEL):
+    # slides 可以是列表, 也可以是 iter_markdown 返回的生成器(逐页消费, 不需要先生成完整列表)
+    # timer 为 GpptTiming.PipelineTimer 时记录各阶段与每页幻灯片的耗时
+    # compress_level 为新生成部件的压缩级别(0~9), 模板中未修改的部件不重新压缩
+    with timer.stage('template load'):
+        prs, baseline = open_template(template_file, template_cache)
+        layout_index = build_layout_index(prs)
+    
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug(f"Available layouts in the template: {', '.join(layout.name for layout in prs.slide_layouts)}")
+    
+    for slide_index, slide in enumerate(timer.timed_iter('parse', slides), 1):
+        with timer.stage('layout match', slide_index):
+            slide_layout = select_layout(prs, layout_index, slide, slide_index)
+        with timer.stage('placeholder fill', slide_index):
+            add_slide(prs, slide, slide_layout, slide_index)
+    
+    with timer.stage('save'):
+        # 模板中已有的部件只有 presentation 部件(幻灯片列表与关系)被修改
+        save_presentation(prs, output_file, baseline, compress_level, dirty={prs.part})
+    logger.info(f"Presentation saved as {output_file}")
+    return len(prs.slides)
+
+def find_placeholder(slide, content_type, placeholder_index=None):
+    # 未提供索引时临时构建; 批量查找时应复用同一个 PlaceholderIndex
+    if placeholder_index is None:
+        placeholder_index = PlaceholderIndex(slide.placeholders)
+    return placeholder_index.find(content_type)
@@ -0,0 +1,164 @@
+import os
+import glob
+import json
+import hashlib
+import logging
+from io import BytesIO
+from pptx import Presentation
+from GpptCore import build_layout_index, select_layout, add_slide, open_template
+from GpptSave import PackageBaseline, save_presentation, DEFAULT_COMPRESS_LEVEL
+from GpptTiming import NULL_TIMER
+from pptMetadata import IMAGE_PREFIXES
+
+logger = logging.getLogger(__name__)
+logger.addHandler(logging.NullHandler())
+
+MANIFEST_VERSION = 2
+
+def manifest_path_for(output_file):
+    # 清单文件与输出文件放在一起, 例如 Outfile/report.pptx -> Outfile/report.manifest.json
+    return os.path.splitext(output_file)[0] + '.manifest.json'
+
+def discard_manifest(output_file):
+    # 非增量生成覆盖输出文件时删除旧清单, 避免下次增量生成时按旧清单复用幻灯片
+    try:
+        os.remove(manifest_path_for(output_file))
+    except FileNotFoundError:
+        pass
+
+def find_base_file(output_file, base):
+    # base 为文件时直接使用; 为目录时使用其中最新的 Gimage 输出 updated_<文件名>_*.pptx, 没有时返回 None
+    if base is None or not os.path.isdir(base):
+        return base
+    stem = os.path.splitext(os.path.basename(output_file))[0]
+    matches = glob.glob(os.path.join(glob.escape(base), f"updated_{glob.escape(stem)}_*.pptx"))
+    return max(matches, key=os.path.getmtime) if matches else None
+
+def file_hash(path):
+    digest = hashlib.sha1()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def content_fingerprint(slide):
+    # 幻灯片内容指纹: 类型、标题与全部内容
+    payload = json.dumps([slide['type'], slide['title'], slide['content']], ensure_ascii=False)
+    return hashlib.sha1(payload.encode('utf-8')).hexdigest()
+
+def slide_fingerprint(content, layout_name):
+    # 完整指纹: 内容指纹加上所选布局
+    return hashlib.sha1(f"{content}\0{layout_name}".encode('utf-8')).hexdigest()
+
+def slide_text_digest(slide):
+    # 幻灯片上文字的摘要, 用于确认演示文稿中的幻灯片仍是清单记录的那一页;
+    # 不含图片与 image/subimage 占位符, Gimage 填充图片后摘要不变
+    texts = [f"{shape.name}\0{shape.text_frame.text}" for shape in slide.shapes
+             if shape.has_text_frame and not shape.name.startswith(IMAGE_PREFIXES)]
+    return hashlib.sha1('\n'.join(texts).encode('utf-8')).hexdigest()
+
+def manifest_matches(manifest, prs):
+    # 清单中的每页幻灯片都必须仍在演示文稿中且文字未变; 输出文件被非增量生成或其他工具覆盖后不再匹配
+    slides = {slide.slide_id: slide for slide in prs.slides}
+    for entry in manifest['slides']:
+        slide = slides.get(entry['slide_id'])
+        if slide is None or slide_text_digest(slide) != entry['digest']:
+            return False
+    return True
+
+def load_manifest(manifest_file):
+    try:
+        with open(manifest_file, 'r', encoding='utf-8') as f:
+            manifest = json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return None
+    if manifest.get('version') != MANIFEST_VERSION:
+        return None
+    return manifest
+
+def save_manifest(manifest_file, manifest):
+    with open(manifest_file, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=2)
+
+def build_incremental(slides, template_file, output_file, base_file=None, template_hash=None, timer=NULL_TIMER,
+                      template_cache=None, compress_level=DEFAULT_COMPRESS_LEVEL):
+    # 增量生成: 只重新生成内容发生变化的幻灯片, 其余幻灯片原样保留
+    # base_file 为已有的演示文稿(默认为 output_file 本身), 可以是经过 Gimage 填充图片后的文件,
+    # 只要内容未变, 已填充图片的幻灯片就会被保留; 模板发生变化或没有清单时退化为完整生成
+    # 返回 (幻灯片总数, 重新生成的幻灯片数)
+    manifest_file = manifest_path_for(output_file)
+    base_file = base_file or output_file
+    if template_hash is None:
+        template_hash = template_cache.snapshot(template_file).content_hash if template_cache else file_hash(template_file)
+
+    manifest = load_manifest(manifest_file)
+    with timer.stage('template load'):
+        prs = None
+        if manifest is not None and manifest['template_hash'] == template_hash and os.path.exists(base_file):
+            # 保留的幻灯片(包括 Gimage 插入的图片)保存时直接复制压缩数据
+            with open(base_file, 'rb') as f:
+                data = f.read()
+            prs = Presentation(BytesIO(data))
+            # 必须在访问 prs.slides 之前创建: 顺序被调整过的幻灯片此时会被重命名
+            baseline = PackageBaseline(data, prs.part.package)
+            if not manifest_matches(manifest, prs):
+                logger.warning(f"{base_file} no longer matches {manifest_file}, building all slides")
+                prs = None
+        if prs is None:
+            logger.info(f"No usable manifest for {output_file}, building all slides")
+            manifest = {'slides': []}
+            prs, baseline = open_template(template_file, template_cache)
+        layout_index = build_layout_index(prs)
+    sld_id_lst = prs.slides._sldIdLst
+
+    # 旧清单中的幻灯片按内容指纹分组以便复用(支持插入、删除与移动)
+    reusable = {}
+    for entry in manifest['slides']:
+        reusable.setdefault(entry['content'], []).append(entry)
+    managed_ids = {entry['slide_id'] for entry in manifest['slides']}
+
+    entries = []
+    rebuilt = 0
+    for slide_index, slide in enumerate(timer.timed_iter('parse', slides), 1):
+        content = content_fingerprint(slide)
+        candidates = reusable.get(content)
+        if candidates:
+            entry = candidates.pop(0)
+        else:
+            with timer.stage('layout match', slide_index):
+                slide_layout = select_layout(prs, layout_index, slide, slide_index)
+            with timer.stage('placeholder fill', slide_index):
+                new_slide = add_slide(prs, slide, slide_layout, slide_index)
+            entry = {'slide_id': new_slide.slide_id, 'layout': slide_layout.name, 'content': content,
+                     'digest': slide_text_digest(new_slide)}
+            rebuilt += 1
+        entry['fingerprint'] = slide_fingerprint(content, entry['layout'])
+        entries.append(entry)
+
+    # 删除不再需要的旧幻灯片
+    keep_ids = {entry['slide_id'] for entry in entries}
+    for sld_id in list(sld_id_lst):
+        if sld_id.id in managed_ids and sld_id.id not in keep_ids:
+            rId = sld_id.rId
+            sld_id_lst.remove(sld_id)
+            prs.part.drop_rel(rId)
+
+    # 按新的顺序排列: 模板自带的幻灯片在前, 生成的幻灯片按Markdown顺序在后
+    sld_ids = {sld_id.id: sld_id for sld_id in sld_id_lst}
+    ordered = [sld_id for sld_id in sld_id_lst if sld_id.id not in keep_ids]
+    ordered += [sld_ids[entry['slide_id']] for entry in entries]
+    for sld_id in ordered:
+        sld_id_lst.remove(sld_id)
+        sld_id_lst.append(sld_id)
+
+    with timer.stage('save'):
+        # 保留的幻灯片只读取文本, 已有部件中只有 presentation 部件被修改
+        save_presentation(prs, output_file, baseline, compress_level, dirty={prs.part})
+    save_manifest(manifest_file, {
+        'version': MANIFEST_VERSION,
+        'template': os.path.abspath(template_file) if isinstance(template_file, str) else None,
+        'template_hash': template_hash,
+        'slides': entries,
+    })
+    logger.info(f"Incremental build saved as {output_file}: {rebuilt} of {len(entries)} slides rebuilt")
+    return len(prs.slides), rebuilt
@@ -0,0 +1,236 @@
+import time
+import zlib
+import struct
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from lxml import etree
+from pptx.opc.constants import CONTENT_TYPE as CT
+from pptx.opc.package import XmlPart
+from pptx.opc.packuri import CONTENT_TYPES_URI, PACKAGE_URI
+from pptx.opc.spec import default_content_types
+
+logger = logging.getLogger(__name__)
+logger.addHandler(logging.NullHandler())
+
+DEFAULT_COMPRESS_LEVEL = 6
+# 超过该大小的新部件(通常是图片)分块后在线程池中并行压缩
+PARALLEL_THRESHOLD = 1024 * 1024
+CHUNK_SIZE = 1024 * 1024
+ZIP_STORED = 0
+ZIP_DEFLATED = 8
+ZIP32_LIMIT = 0xFFFFFFFF
+CT_NAMESPACE = 'http://schemas.openxmlformats.org/package/2006/content-types'
+RELS_NAMESPACE = 'http://schemas.openxmlformats.org/package/2006/relationships'
+
+def read_raw_entries(data):
+    # 解析ZIP中央目录, 返回 {成员名: (压缩方式, CRC, 压缩后大小, 原始大小, 压缩后的数据)},
+    # 压缩后的数据为 data 的 memoryview 切片, 不复制也不解压
+    view = memoryview(data)
+    end = data.rfind(b'PK\x05\x06')
+    if end < 0:
+        raise ValueError("Not a zip file")
+    count, _, offset = struct.unpack('<HLL', data[end + 10:end + 20])
+    entries = {}
+    for _ in range(count):
+        (method, crc, compress_size, file_size, name_length, extra_length, comment_length,
+         header_offset) = struct.unpack('<10xH4xLLLHHH8xL', data[offset:offset + 46])
+        name = data[offset + 46:offset + 46 + name_length].decode('utf-8')
+        offset += 46 + name_length + extra_length + comment_length
+        local_name_length, local_extra_length = struct.unpack('<HH', data[header_offset + 26:header_offset + 30])
+        start = header_offset + 30 + local_name_length + local_extra_length
+        entries[name] = (method, crc, compress_size, file_size, view[start:start + compress_size])
+    return entries
+
+def content_types_xml(parts):
+    # 与 python-pptx 保存时相同的 [Content_Types].xml: 扩展名与内容类型是标准组合时写 Default, 否则写 Override
+    defaults = {'rels': CT.OPC_RELATIONSHIPS, 'xml': CT.XML}
+    overrides = {}
+    for part in parts:
+        ext = part.partname.ext.lower()
+        if (ext, part.content_type) in default_content_types:
+            defaults[ext] = part.content_type
+        else:
+            overrides[str(part.partname)] = part.content_type
+    root = etree.Element(f"{{{CT_NAMESPACE}}}Types", nsmap={None: CT_NAMESPACE})
+    for ext, content_type in sorted(defaults.items()):
+        etree.SubElement(root, f"{{{CT_NAMESPACE}}}Default", Extension=ext, ContentType=content_type)
+    for partname, content_type in sorted(overrides.items()):
+        etree.SubElement(root, f"{{{CT_NAMESPACE}}}Override", PartName=partname, ContentType=content_type)
+    return etree.tostring(root, xml_declaration=True, encoding='UTF-8', standalone=True)
+
+def inflate(entry):
+    method, _, _, _, data = entry
+    return zlib.decompress(data, -15) if method == ZIP_DEFLATED else bytes(data)
+
+class PackageBaseline:
+    # 打开的文件(模板或已有的演示文稿)在修改之前的状态: ZIP中每个成员压缩后的原始数据, 以及打开时每个部件名对应的部件对象;
+    # 必须在修改 package 或访问 prs.slides(会按顺序重命名幻灯片部件)之前创建. 保存时不在 dirty 中、部件名未变的部件直接复制压缩数据, 不序列化也不重新压缩
+    def __init__(self, data, package, entries=None):
+        # entries 为同一文件已解析的 read_raw_entries 结果(模板快照只解析一次)
+        self.entries = entries if entries is not None else read_raw_entries(data)
+        self.parts = {}
+        self.blobs = {}  # 二进制部件 -> 打开时的 bytes, 部件内容被替换时不再是同一对象
+        for part in package.iter_parts():
+            self.parts[part.partname.membername] = part
+            if not isinstance(part, XmlPart):
+                self.blobs[part.partname.membername] = part.blob
+        # 包关系(_rels/.rels)的目标部件; 包关系不会被 python-pptx 公开修改, 保存时直接复制, 只检查目标是否仍然存在
+        self.package_targets = []
+        rels = self.entries.get(PACKAGE_URI.rels_uri.membername)
+        if rels is not None:
+            for rel in etree.fromstring(inflate(rels)).iterfind(f"{{{RELS_NAMESPACE}}}Relationship"):
+                if rel.get('TargetMode') != 'External':
+                    self.package_targets.append(rel.get('Target').lstrip('/'))
+
+    def same_part(self, part):
+        # 部件在打开时就以同一名称存在(未被重命名, 也不是新建的部件)
+        return self.parts.get(part.partname.membername) is part
+
+    def raw_part(self, part, dirty):
+        name = part.partname.membername
+        if not self.same_part(part) or name not in self.entries:
+            return None
+        if isinstance(part, XmlPart):
+            clean = dirty is not None and part not in dirty
+        else:
+            clean = self.blobs.get(name) is part.blob
+        return self.entries[name] if clean else None
+
+    def raw_rels(self, part, dirty):
+        # 关系文件中的目标是相对路径: 部件本身未修改, 且所有目标部件都没有被重命名时才能直接复制
+        name = part.partname.rels_uri.membername
+        if name not in self.entries or self.raw_part(part, dirty) is None:
+            return None
+        for rel in part.rels.values():
+            if not rel.is_external and not self.same_part(rel.target_part):
+                return None
+        return self.entries[name]
+
+    def package_rels(self, parts):
+        # 包关系仍然有效时返回原始压缩数据: 原来的目标部件都在, 且没有只能从包关系到达的新部件
+        entry = self.entries.get(PACKAGE_URI.rels_uri.membername)
+        if entry is None:
+            return None
+        targets = {self.parts.get(name) for name in self.package_targets}
+        if None in targets or not targets <= set(parts):
+            return None
+        for part in parts:
+            for rel in part.rels.values():
+                if not rel.is_external:
+                    targets.add(rel.target_part)
+        return entry if all(part in targets for part in parts) else None
+
+def deflate_chunk(chunk, level, last):
+    # 每块独立压缩, 非最后一块以 Z_SYNC_FLUSH 结束(字节对齐且不是最后一个块), 拼接后仍是合法的 deflate 流
+    compressor = zlib.compressobj(level, zlib.DEFLATED, -15)
+    return compressor.compress(chunk) + compressor.flush(zlib.Z_FINISH if last else zlib.Z_SYNC_FLUSH)
+
+class ZipWriter:
+    # 只写入的ZIP文件, 可直接写入已压缩的数据; 不支持 ZIP64, 超过4GB时抛出 ValueError
+    def __init__(self, file):
+        self.file = file
+        self.offset = 0
+        self.central = []
+        local = time.localtime()
+        self.dos_time = (local.tm_hour << 11) | (local.tm_min << 5) | (local.tm_sec // 2)
+        self.dos_date = ((local.tm_year - 1980) << 9) | (local.tm_mon << 5) | local.tm_mday
+
+    def write_raw(self, name, method, crc, compress_size, file_size, data):
+        if max(compress_size, file_size, self.offset) >= ZIP32_LIMIT or len(self.central) >= 0xFFFF:
+            raise ValueError("Package too large for ZIP32")
+        encoded = name.encode('utf-8')
+        flags = 0x800 if not name.isascii() else 0
+        header = struct.pack('<4sHHHHHLLLHH', b'PK\x03\x04', 20, flags, method, self.dos_time, self.dos_date,
+                             crc, compress_size, file_size, len(encoded), 0)
+        self.file.write(header)
+        self.file.write(encoded)
+        self.file.write(data)
+        self.central.append(struct.pack('<4sHHHHHHLLLHHHHHLL', b'PK\x01\x02', 20, 20, flags, method, self.dos_time,
+                                        self.dos_date, crc, compress_size, file_size, len(encoded), 0, 0, 0, 0, 0,
+                                        self.offset) + encoded)
+        self.offset += len(header) + len(encoded) + len(data)
+
+    def close(self):
+        start = self.offset
+        for record in self.central:
+            self.file.write(record)
+            self.offset += len(record)
+        if self.offset >= ZIP32_LIMIT:
+            raise ValueError("Package too large for ZIP32")
+        self.file.write(struct.pack('<4sHHHHLLH', b'PK\x05\x06', 0, 0, len(self.central), len(self.central),
+                                    self.offset - start, start, 0))
+
+def write_members(f, members, compress_level, stats):
+    writer = ZipWriter(f)
+    for name, blob, entry, chunks in members:
+        if entry is not None:
+            writer.write_raw(name, *entry)
+            stats['copied'] += 1
+            stats['bytes_copied'] += entry[3]
+            continue
+        if not compress_level:
+            method, data = ZIP_STORED, blob
+        elif chunks is not None:
+            method, data = ZIP_DEFLATED, b''.join(chunk.result() for chunk in chunks)
+        else:
+            method, data = ZIP_DEFLATED, deflate_chunk(blob, compress_level, True)
+        writer.write_raw(name, method, zlib.crc32(blob), len(data), len(blob), data)
+        stats['compressed'] += 1
+        stats['bytes_compressed'] += len(blob)
+    writer.close()
+
+def save_presentation(prs, output_file, baseline=None, compress_level=DEFAULT_COMPRESS_LEVEL, max_workers=None,
+                      parallel_threshold=PARALLEL_THRESHOLD, dirty=None):
+    # 代替 prs.save(): baseline 为 PackageBaseline 时, 未修改的成员(母版、布局、主题、模板图片等)直接复制压缩数据,
+    # 只序列化新建或修改过的部件; dirty 为打开之后修改过XML或关系的已有部件(例如 presentation 部件),
+    # 为 None 时视为所有XML部件都已修改. 其余成员按 compress_level(0为不压缩, 1~9) 压缩,
+    # 超过 parallel_threshold 的成员分块并行压缩. 没有 baseline 或包关系已变化时使用 python-pptx 保存
+    # 返回 {'copied', 'compressed', 'bytes_copied', 'bytes_compressed'}
+    stats = {'copied': 0, 'compressed': 0, 'bytes_copied': 0, 'bytes_compressed': 0}
+    parts = list(prs.part.package.iter_parts())
+    package_rels = baseline.package_rels(parts) if baseline is not None else None
+    if package_rels is None:
+        if baseline is not None:
+            logger.warning("Package relationships changed, falling back to python-pptx save")
+        prs.save(output_file)
+        return stats
+
+    # 与 python-pptx 的 PackageWriter 相同的成员顺序: 内容类型、包关系, 然后每个部件及其关系
+    # 每项为 (成员名, 原始压缩数据或None, 取得内容的函数)
+    members = [(CONTENT_TYPES_URI.membername, None, lambda: content_types_xml(parts)),
+               (PACKAGE_URI.rels_uri.membername, package_rels, None)]
+    for part in parts:
+        members.append((part.partname.membername, baseline.raw_part(part, dirty), lambda part=part: part.blob))
+        if len(part.rels):
+            members.append((part.partname.rels_uri.membername, baseline.raw_rels(part, dirty),
+                            lambda part=part: part.rels.xml))
+
+    prepared = []
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        # 先提交所有大成员的压缩任务, 再按顺序写入, 小成员在写入时直接压缩
+        for name, entry, content in members:
+            blob = content() if entry is None else None
+            chunks = None
+            if entry is None and compress_level and len(blob) > parallel_threshold:
+                view = memoryview(blob)
+                starts = range(0, len(blob), CHUNK_SIZE)
+                chunks = [executor.submit(deflate_chunk, view[start:start + CHUNK_SIZE], compress_level,
+                                          start + CHUNK_SIZE >= len(blob)) for start in starts]
+            prepared.append((name, blob, entry, chunks))
+
+        try:
+            if hasattr(output_file, 'write'):
+                write_members(output_file, prepared, compress_level, stats)
+            else:
+                with open(output_file, 'wb') as f:
+                    write_members(f, prepared, compress_level, stats)
+        except ValueError as e:
+            logger.warning(f"{e}, falling back to python-pptx save")
+            if hasattr(output_file, 'write'):
+                output_file.seek(0)
+                output_file.truncate()
+            prs.save(output_file)
+            return stats
+    logger.debug(f"Saved {output_file}: {stats['copied']} members copied ({stats['bytes_copied'] / 2**20:.1f} MB), "
+                 f"{stats['compressed']} compressed ({stats['bytes_compressed'] / 2**20:.1f} MB)")
+    return stats
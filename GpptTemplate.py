@@ -0,0 +1,115 @@
+import os
+import copy
+import hashlib
+import logging
+import threading
+from io import BytesIO
+from collections import OrderedDict
+from pptx.oxml import parse_xml
+from pptx.package import Package
+from pptx.opc.package import XmlPart
+from pptx.opc.packuri import PACKAGE_URI
+from GpptSave import PackageBaseline, read_raw_entries
+
+logger = logging.getLogger(__name__)
+logger.addHandler(logging.NullHandler())
+
+class TemplateSnapshot:
+    # 模板的内存快照: 模板只解析一次, 保留每个部件的XML元素、二进制内容与关系
+    # open() 时复制XML元素(比重新解析快), 图片等媒体直接共享不可变的 bytes, 不再读取磁盘、解压或解析XML
+    # raw_entries 为每个成员的原始压缩数据(只解析一次), baseline_for() 将其与打开的副本的部件对应,
+    # 保存时未修改的母版、布局与图片直接复制(GpptSave.save_presentation)
+    def __init__(self, path, content_hash, size, package, data=None):
+        self.path = path
+        self.content_hash = content_hash
+        self.size = size
+        self.raw_entries = read_raw_entries(data) if data is not None else None
+        self._package_rels = parse_xml(package._rels.xml)
+        self._parts = []
+        for part in package.iter_parts():
+            payload = part._element if isinstance(part, XmlPart) else part.blob
+            self._parts.append((type(part), part.partname, part.content_type, payload, parse_xml(part.rels.xml)))
+
+    @classmethod
+    def from_bytes(cls, path, data, content_hash=None):
+        content_hash = content_hash or hashlib.sha1(data).hexdigest()
+        return cls(path, content_hash, len(data), Package.open(BytesIO(data)), data)
+
+    def open(self):
+        # 返回一个独立的 Presentation, 对它的修改不会影响快照
+        package = Package(self.path)
+        parts = {}
+        for part_cls, partname, content_type, payload, _ in self._parts:
+            if issubclass(part_cls, XmlPart):
+                parts[partname] = part_cls(partname, content_type, package, copy.deepcopy(payload))
+            else:
+                parts[partname] = part_cls.load(partname, content_type, package, payload)
+        for _, partname, _, _, xml_rels in self._parts:
+            parts[partname].load_rels_from_xml(xml_rels, parts)
+        package._rels.load_from_xml(PACKAGE_URI, self._package_rels, parts)
+        return package.main_document_part.presentation
+
+    def baseline_for(self, prs):
+        # open() 返回的副本在修改之前的 PackageBaseline; 每个副本的部件对象不同, 不能共用
+        if self.raw_entries is None:
+            return None
+        return PackageBaseline(None, prs.part.package, self.raw_entries)
+
+class TemplateCache:
+    # 按路径、修改时间与内容哈希缓存模板快照, 超过数量或总大小上限时按LRU淘汰
+    def __init__(self, max_entries=4, max_bytes=1024 * 1024 * 1024):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._snapshots = OrderedDict()  # 内容哈希 -> TemplateSnapshot
+        self._paths = {}  # 绝对路径 -> (mtime_ns, 文件大小, 内容哈希)
+        self._lock = threading.Lock()
+
+    def snapshot(self, template_file):
+        path = os.path.abspath(template_file)
+        stat = os.stat(path)
+        with self._lock:
+            known = self._paths.get(path)
+            if known and known[:2] == (stat.st_mtime_ns, stat.st_size) and known[2] in self._snapshots:
+                self._snapshots.move_to_end(known[2])
+                self.hits += 1
+                return self._snapshots[known[2]]
+
+        # 文件未缓存或已修改: 读取并计算内容哈希, 内容未变(例如只是被touch)时仍复用原快照
+        with open(path, 'rb') as f:
+            data = f.read()
+        content_hash = hashlib.sha1(data).hexdigest()
+        with self._lock:
+            self._paths[path] = (stat.st_mtime_ns, stat.st_size, content_hash)
+            if content_hash in self._snapshots:
+                self._snapshots.move_to_end(content_hash)
+                self.hits += 1
+                return self._snapshots[content_hash]
+
+        snapshot = TemplateSnapshot.from_bytes(path, data, content_hash)
+        with self._lock:
+            self.misses += 1
+            self._snapshots[content_hash] = snapshot
+            self._snapshots.move_to_end(content_hash)
+            self._evict()
+        logger.info(f"Template cached: {path} ({snapshot.size / 2**20:.1f} MB)")
+        return snapshot
+
+    def open(self, template_file):
+        return self.snapshot(template_file).open()
+
+    def _evict(self):
+        # 至少保留最近使用的一个快照
+        while len(self._snapshots) > 1 and (len(self._snapshots) > self.max_entries or self.total_bytes() > self.max_bytes):
+            content_hash, snapshot = self._snapshots.popitem(last=False)
+            self._paths = {path: known for path, known in self._paths.items() if known[2] != content_hash}
+            logger.info(f"Template evicted from cache: {snapshot.path}")
+
+    def total_bytes(self):
+        return sum(snapshot.size for snapshot in self._snapshots.values())
+
+    def clear(self):
+        with self._lock:
+            self._snapshots.clear()
+            self._paths.clear()
@@ -0,0 +1,110 @@
+import os
+import json
+import time
+from contextlib import contextmanager, nullcontext
+
+class PipelineTimer:
+    # 记录流水线各阶段(parse, template load, layout match, placeholder fill, save)以及每页幻灯片的耗时
+    def __init__(self, name='gppt'):
+        self.name = name
+        self.events = []  # 每个事件: {'stage', 'slide', 'start', 'duration'}, 时间单位为秒
+        self._origin = time.perf_counter()
+        self._wall_origin = time.time()
+
+    @contextmanager
+    def stage(self, stage, slide=None):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self._record(stage, slide, start, time.perf_counter())
+
+    def timed_iter(self, stage, iterable):
+        # 逐项计时的迭代器, 用于流式解析等每次 next() 都在做实际工作的场景
+        iterator = iter(iterable)
+        index = 1
+        while True:
+            start = time.perf_counter()
+            try:
+                item = next(iterator)
+            except StopIteration:
+                self._record(stage, None, start, time.perf_counter())
+                return
+            self._record(stage, index, start, time.perf_counter())
+            yield item
+            index += 1
+
+    def _record(self, stage, slide, start, end):
+        self.events.append({'stage': stage, 'slide': slide, 'start': start - self._origin, 'duration': end - start})
+
+    def stage_totals(self):
+        totals = {}
+        for event in self.events:
+            totals[event['stage']] = totals.get(event['stage'], 0.0) + event['duration']
+        return totals
+
+    def slide_totals(self):
+        slides = {}
+        for event in self.events:
+            if event['slide'] is not None:
+                stages = slides.setdefault(event['slide'], {})
+                stages[event['stage']] = stages.get(event['stage'], 0.0) + event['duration']
+        return slides
+
+    def to_dict(self):
+        return {
+            'name': self.name,
+            'wall_start': self._wall_origin,
+            'total': sum(self.stage_totals().values()),
+            'stages': self.stage_totals(),
+            'slides': {str(slide): stages for slide, stages in sorted(self.slide_totals().items())},
+            'events': self.events,
+        }
+
+    def write_json(self, path):
+        write_timing_json(path, [self.to_dict()])
+
+    def write_chrome_trace(self, path):
+        write_chrome_trace(path, [self.to_dict()])
+
+class _NullTimer:
+    # 未开启计时时使用, 不产生任何开销
+    def stage(self, stage, slide=None):
+        return nullcontext()
+
+    def timed_iter(self, stage, iterable):
+        return iterable
+
+NULL_TIMER = _NullTimer()
+
+def write_timing_json(path, timings):
+    # timings 为 PipelineTimer.to_dict() 的列表, 批量生成时每个文件一项
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(timings, f, ensure_ascii=False, indent=2)
+
+def chrome_trace_events(timing, pid=None, tid=0):
+    # 转换为 Chrome Trace Event 格式(chrome://tracing 或 Perfetto 可直接打开)
+    pid = os.getpid() if pid is None else pid
+    events = [{'name': 'process_name', 'ph': 'M', 'pid': pid, 'tid': tid, 'args': {'name': timing['name']}}]
+    for event in timing['events']:
+        trace_event = {
+            'name': event['stage'],
+            'cat': 'gppt',
+            'ph': 'X',
+            'ts': (timing['wall_start'] + event['start']) * 1e6,
+            'dur': event['duration'] * 1e6,
+            'pid': pid,
+            'tid': tid,
+        }
+        if event['slide'] is not None:
+            trace_event['args'] = {'slide': event['slide']}
+        events.append(trace_event)
+    return events
+
+def write_chrome_trace(path, timings):
+    # 每个文件占用一条独立的轨道
+    events = []
+    for pid, timing in enumerate(timings, 1):
+        events.extend(chrome_trace_events(timing, pid=pid))
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump({'traceEvents': events, 'displayTimeUnit': 'ms'}, f)
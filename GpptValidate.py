@@ -0,0 +1,254 @@
+import os
+import sys
+import json
+import time
+import argparse
+import logging
+import zipfile
+import threading
+from types import SimpleNamespace
+from lxml import etree
+from pptMetadata import NS, R_ID, read_rels, main_document_partname
+from GpptCore import SLIDE_TYPES, LayoutIndex, PlaceholderIndex, iter_markdown, substance_subtitle_count
+from GpptIncremental import file_hash
+
+# 生成前的快速检查: 从模板中提取各布局的名称、对应的幻灯片类型、小标题数量与占位符名称(能力清单),
+# 按模板内容哈希缓存为JSON; 之后只用清单按 create_pptx 相同的规则检查Markdown, 不创建也不保存PPT
+
+logger = logging.getLogger(__name__)
+logger.addHandler(logging.NullHandler())
+
+LOG_FORMAT = '%(asctime)s - %(levelname)s - %(message)s'
+CAPABILITIES_VERSION = 2
+# 与 GimageCache 的缓存在同一个 Cache 目录下; 不导入 GimageCache, 避免检查时加载 PIL
+DEFAULT_CAPABILITIES_DIR = os.path.join('Cache', 'templates')
+# python-pptx 新建幻灯片时不从布局复制的占位符类型(日期、页脚、页码)
+LATENT_PLACEHOLDER_TYPES = ('dt', 'ftr', 'sldNum')
+
+# 进程内缓存: 模板路径 -> (修改时间, 大小, 清单), 文件未变时不再计算哈希
+_loaded = {}
+_loaded_lock = threading.Lock()
+
+def read_layouts(zf):
+    # 按 prs.slide_layouts 的顺序(第一个母版的 sldLayoutIdLst)返回 [(布局名称, 新幻灯片的占位符名称)];
+    # 占位符名称为 rename_placeholders 之后的名称: 按 idx 取布局中第一个同 idx 占位符的名称,
+    # 顺序与 slide.placeholders 相同(按 idx 排序)
+    presentation = main_document_partname(zf)
+    master_id = etree.fromstring(zf.read(presentation)).find('p:sldMasterIdLst/p:sldMasterId', NS)
+    if master_id is None:
+        return []
+    master = read_rels(zf, presentation)[master_id.get(R_ID)][1]
+    master_rels = read_rels(zf, master)
+    layouts = []
+    for sld_layout_id in etree.fromstring(zf.read(master)).iterfind('p:sldLayoutIdLst/p:sldLayoutId', NS):
+        root = etree.fromstring(zf.read(master_rels[sld_layout_id.get(R_ID)][1]))
+        c_sld = root.find('p:cSld', NS)
+        names_by_idx = {}
+        cloned = []
+        for shape in c_sld.find('p:spTree', NS):
+            ph = shape.find('*/p:nvPr/p:ph', NS)
+            if ph is None:
+                continue
+            idx = int(ph.get('idx', 0))
+            names_by_idx.setdefault(idx, shape.find('*/p:cNvPr', NS).get('name', ''))
+            if ph.get('type') not in LATENT_PLACEHOLDER_TYPES:
+                cloned.append(idx)
+        layouts.append((c_sld.get('name', ''), [names_by_idx[idx] for idx in sorted(cloned)]))
+    return layouts
+
+def analyze_template(template_file, template_hash=None):
+    # 返回能力清单 {'version', 'template_hash', 'layouts': [{'name', 'slide_types', 'subtitle_counts', 'placeholders'}],
+    # 'supported'}; supported 与 LayoutIndex.supported() 相同
+    with zipfile.ZipFile(template_file) as zf:
+        layouts = [SimpleNamespace(name=name, placeholders=placeholders) for name, placeholders in read_layouts(zf)]
+    layout_index = LayoutIndex(layouts)
+    supported = layout_index.supported()
+    entries = []
+    for layout in layouts:
+        subtitle_counts = [count for count in supported.get('substance') or []
+                           if layout in layout_index.candidates('substance', count)]
+        # 内容页布局按小标题数量匹配, 任一数量匹配即支持内容页
+        slide_types = [slide_type for slide_type in SLIDE_TYPES
+                       if layout in layout_index.candidates(slide_type) or (slide_type == 'substance' and subtitle_counts)]
+        entries.append({
+            'name': layout.name,
+            'slide_types': slide_types,
+            'subtitle_counts': subtitle_counts,
+            'placeholders': layout.placeholders,
+        })
+    return {
+        'version': CAPABILITIES_VERSION,
+        'template_hash': template_hash or file_hash(template_file),
+        'layouts': entries,
+        'supported': supported,
+    }
+
+def load_capabilities(template_file, cache_dir=DEFAULT_CAPABILITIES_DIR):
+    # 读取模板的能力清单: 先查进程内缓存, 再查 cache_dir/<模板sha1>.json, 都没有时分析模板并写入缓存;
+    # cache_dir 为 None 时不使用磁盘缓存
+    stat = os.stat(template_file)
+    path = os.path.abspath(template_file)
+    with _loaded_lock:
+        loaded = _loaded.get(path)
+    if loaded is not None and loaded[:2] == (stat.st_mtime_ns, stat.st_size):
+        return loaded[2]
+
+    template_hash = file_hash(template_file)
+    capabilities = None
+    cache_file = os.path.join(cache_dir, f"{template_hash}.json") if cache_dir else None
+    if cache_file:
+        try:
+            with open(cache_file, 'r', encoding='utf-8') as f:
+                capabilities = json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            capabilities = None
+        if capabilities is not None and capabilities.get('version') != CAPABILITIES_VERSION:
+            capabilities = None
+    if capabilities is None:
+        capabilities = analyze_template(template_file, template_hash)
+        logger.info(f"Analyzed template {template_file}: {len(capabilities['layouts'])} layouts")
+        if cache_file:
+            os.makedirs(cache_dir, exist_ok=True)
+            temp_file = f"{cache_file}.tmp{os.getpid()}"
+            with open(temp_file, 'w', encoding='utf-8') as f:
+                json.dump(capabilities, f, ensure_ascii=False, indent=2)
+            os.replace(temp_file, cache_file)
+    with _loaded_lock:
+        _loaded[path] = (stat.st_mtime_ns, stat.st_size, capabilities)
+    return capabilities
+
+def layout_problems(slide, layout):
+    # 用 layout 生成该页时会出现的问题: 缺少标题占位符、内容找不到占位符、多个内容写入同一个占位符
+    problems = []
+    if slide['title'] and layout.placeholder_index.find('title') is None:
+        problems.append("No title placeholder")
+    used = {}
+    for content_type, _ in slide['content']:
+        shape = layout.placeholder_index.find(content_type)
+        if shape is None:
+            problems.append(f"No placeholder for {content_type}")
+        elif id(shape) in used:
+            problems.append(f"{content_type} overwrites {used[id(shape)]} in placeholder {shape.name}")
+        else:
+            used[id(shape)] = content_type
+    return problems
+
+def describe_slide(slide):
+    if slide['type'] == 'substance':
+        return f"substance slide with {substance_subtitle_count(slide)} subtitles"
+    return f"{slide['type']} slide"
+
+def validate_slides(slides, capabilities):
+    # 按 select_layout / add_slide 的规则检查每页幻灯片, 返回问题列表 [{'slide', 'type', 'title', 'level', 'message'}];
+    # 所有候选布局都有的问题为 error, 只有部分候选布局(随机选中时)才有的问题为 warning
+    layouts = [SimpleNamespace(name=entry['name'], placeholder_index=PlaceholderIndex(
+                   [SimpleNamespace(name=name) for name in entry['placeholders']]))
+               for entry in capabilities['layouts']]
+    layout_index = LayoutIndex(layouts)
+    supported = capabilities['supported']
+    issues = []
+    for slide_index, slide in enumerate(slides, 1):
+        def report(level, message):
+            issues.append({'slide': slide_index, 'type': slide['type'], 'title': slide['title'],
+                           'level': level, 'message': message})
+
+        if slide['type'].lower() == 'substance':
+            candidates = layout_index.candidates('substance', substance_subtitle_count(slide))
+        else:
+            candidates = layout_index.candidates(slide['type'])
+        if not candidates:
+            if not layouts:
+                report('error', "Template has no slide layouts")
+                continue
+            candidates = layouts[:1]
+            if slide['type'].lower() == 'substance' and supported.get('substance'):
+                hint = f" (template supports {', '.join(str(count) for count in supported['substance'])} subtitles)"
+            else:
+                hint = ''
+            report('error', f"No layout for {describe_slide(slide)}, falls back to '{candidates[0].name}'{hint}")
+
+        affected = {}
+        for layout in candidates:
+            for problem in layout_problems(slide, layout):
+                affected.setdefault(problem, []).append(layout.name)
+        for problem, names in affected.items():
+            if len(names) == len(candidates):
+                report('error', problem if len(candidates) == 1 else f"{problem} in any of {len(candidates)} layouts")
+            else:
+                report('warning', f"{problem} in layouts {', '.join(names)}")
+    return issues
+
+def validate_markdown(markdown_file, template_file, cache_dir=DEFAULT_CAPABILITIES_DIR):
+    # 返回 {'markdown', 'template', 'slides', 'errors', 'warnings', 'issues', 'seconds'}
+    start = time.perf_counter()
+    capabilities = load_capabilities(template_file, cache_dir)
+    slides = list(iter_markdown(markdown_file))
+    issues = validate_slides(slides, capabilities)
+    return {
+        'markdown': markdown_file,
+        'template': template_file,
+        'slides': len(slides),
+        'errors': sum(1 for issue in issues if issue['level'] == 'error'),
+        'warnings': sum(1 for issue in issues if issue['level'] == 'warning'),
+        'issues': issues,
+        'seconds': time.perf_counter() - start,
+    }
+
+def print_report(report):
+    if report['issues']:
+        status = 'FAILED' if report['errors'] else 'WARN'
+        print(f"[{status}] {report['markdown']}: {report['slides']} slides, {report['errors']} errors, "
+              f"{report['warnings']} warnings ({report['seconds'] * 1000:.1f} ms)")
+    else:
+        print(f"[OK] {report['markdown']}: {report['slides']} slides, no problems ({report['seconds'] * 1000:.1f} ms)")
+    for issue in report['issues']:
+        title = f" \"{issue['title']}\"" if issue['title'] else ''
+        print(f"    slide {issue['slide']} ({issue['type']}{title}): {issue['level'].upper()} {issue['message']}")
+
+def print_capabilities(capabilities):
+    for entry in capabilities['layouts']:
+        types = ', '.join(entry['slide_types']) or '-'
+        if entry['subtitle_counts']:
+            types += f" ({', '.join(str(count) for count in entry['subtitle_counts'])} subtitles)"
+        print(f"{entry['name']}: {types}")
+        print(f"    placeholders: {', '.join(entry['placeholders']) or '-'}")
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="生成前检查Markdown与模板是否匹配, 不创建PPT")
+    parser.add_argument('inputs', nargs='*', help="Markdown文件")
+    parser.add_argument('-t', '--template', default='Model_PPT/Model.pptx', help="PPT参考模板")
+    parser.add_argument('--cache-dir', default=DEFAULT_CAPABILITIES_DIR, help="模板能力清单的缓存目录")
+    parser.add_argument('--show-template', action='store_true', help="列出模板各布局支持的幻灯片类型与占位符")
+    parser.add_argument('--strict', action='store_true', help="有 warning 时也返回非0")
+    parser.add_argument('--json', help="将检查结果写入JSON文件")
+    parser.add_argument('--log-level', choices=['DEBUG', 'INFO', 'WARNING', 'ERROR'], help="日志级别, 默认不输出日志")
+    args = parser.parse_args(argv)
+
+    if args.log_level:
+        logging.basicConfig(level=args.log_level, format=LOG_FORMAT)
+    if not os.path.exists(args.template):
+        print(f"Template file not found: {args.template}")
+        return 2
+    if args.show_template:
+        print_capabilities(load_capabilities(args.template, args.cache_dir))
+    missing = [path for path in args.inputs if not os.path.exists(path)]
+    if missing:
+        print(f"File not found: {', '.join(missing)}")
+        return 2
+    if not args.inputs:
+        if args.show_template:
+            return 0
+        print("No markdown files given")
+        return 2
+
+    reports = [validate_markdown(markdown_file, args.template, args.cache_dir) for markdown_file in args.inputs]
+    for report in reports:
+        print_report(report)
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(reports, f, ensure_ascii=False, indent=2)
+    failed = any(report['errors'] or (args.strict and report['warnings']) for report in reports)
+    return 1 if failed else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
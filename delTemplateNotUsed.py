@@ -1,66 +1,27 @@
 import os
-import win32com.client
-import pythoncom
 import sys
 import tkinter as tk
 from tkinter import ttk, filedialog, messagebox
 from ttkthemes import ThemedTk
 from PIL import Image, ImageTk  # 请确保安装了 Pillow 库
+from pptPrune import prune_unused_layouts
 
 def remove_unused_layouts(ppt_path, output_dir):
-    pythoncom.CoInitialize()
-    powerpoint = None
-    presentation = None
-
+    # 直接修改 PPTX 压缩包中的母版与布局部件 (pptPrune), 不再需要打开 PowerPoint
     try:
-        powerpoint = win32com.client.Dispatch("PowerPoint.Application")
-        powerpoint.Visible = True
-
-        status_text.insert(tk.END, f"正在打开文件: {ppt_path}\n")
-        presentation = powerpoint.Presentations.Open(ppt_path)
-        status_text.insert(tk.END, "文件已成功打开\n")
-
-        status_text.insert(tk.END, "获取使用的布局...\n")
-        used_layouts = set()
-        for slide in presentation.Slides:
-            layout_index = slide.Layout
-            if isinstance(layout_index, int):
-                layout = slide.CustomLayout
-                used_layouts.add(layout.Name)
-            else:
-                used_layouts.add(slide.Layout.Name)
-        status_text.insert(tk.END, f"使用的布局数量: {len(used_layouts)}\n")
-
-        status_text.insert(tk.END, "处理母版和布局...\n")
-        for master in presentation.Designs:
-            status_text.insert(tk.END, f"处理母版: {master.Name}\n")
-            layouts_to_remove = []
-            
-            for layout in master.SlideMaster.CustomLayouts:
-                if layout.Name not in used_layouts:
-                    layouts_to_remove.append(layout)
-            
-            for layout in layouts_to_remove:
-                status_text.insert(tk.END, f"删除未使用的布局: {layout.Name}\n")
-                layout.Delete()
-
-        output_filename = "output_" + os.path.basename(ppt_path)
-        output_path = os.path.join(output_dir, output_filename)
-
-        status_text.insert(tk.END, f"正在保存文件到: {output_path}\n")
-        presentation.SaveAs(output_path)
-        status_text.insert(tk.END, "文件已保存\n")
+        output_path = os.path.join(output_dir, "output_" + os.path.basename(ppt_path))
+        status_text.insert(tk.END, f"正在处理文件: {ppt_path}\n")
+        result = prune_unused_layouts(ppt_path, output_path)
+        for name in result['removed']:
+            status_text.insert(tk.END, f"删除未使用的布局: {name}\n")
+        status_text.insert(tk.END, f"共删除 {len(result['removed'])} 个布局, "
+                                   f"文件减小 {(result['bytes_before'] - result['bytes_after']) / 1024:.0f} KB\n")
+        status_text.insert(tk.END, f"文件已保存到: {output_path} ({result['seconds']:.2f}s)\n")
 
     except Exception as e:
         status_text.insert(tk.END, f"发生错误: {str(e)}\n")
         status_text.insert(tk.END, f"错误类型: {type(e).__name__}\n")
         status_text.insert(tk.END, f"错误发生在: {sys.exc_info()[2].tb_lineno}行\n")
-    finally:
-        if presentation:
-            presentation.Close()
-        if powerpoint:
-            powerpoint.Quit()
-        pythoncom.CoUninitialize()
 
 def select_file():
     file_path = filedialog.askopenfilename(filetypes=[("PowerPoint files", "*.pptx")])
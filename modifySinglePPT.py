@@ -1,49 +1,21 @@
-import win32com.client as win32
-from pptx import Presentation
+from pptMetadata import slide_count
+from pptRelayout import relayout_file
+from pptInputs import parse_pages
+from pptThumbnail import SlideThumbnails
+from GimageCache import ImageCache, DEFAULT_CACHE_DIR
 import tkinter as tk
 from tkinter import filedialog, messagebox
 import tkinter.ttk as ttk
 from ttkthemes import ThemedTk
-import win32gui
 import os
-import tempfile
-import shutil
-import atexit
+import logging
 from PIL import Image, ImageTk
-import pythoncom
 
-class PowerPointHandler:
-    def __init__(self):
-        self.powerpoint = None
-        self.presentation = None
+logger = logging.getLogger(__name__)
 
-    def open_powerpoint(self):
-        if not self.powerpoint:
-            pythoncom.CoInitialize()
-            self.powerpoint = win32.Dispatch("PowerPoint.Application")
-
-    def open_presentation(self, ppt_path):
-        self.open_powerpoint()
-        if self.presentation:
-            self.presentation.Close()
-        self.presentation = self.powerpoint.Presentations.Open(ppt_path, WithWindow=False)
-
-    def close_presentation(self):
-        if self.presentation:
-            self.presentation.Close()
-            self.presentation = None
-
-    def close_powerpoint(self):
-        if self.powerpoint:
-            self.powerpoint.Quit()
-            self.powerpoint = None
-        pythoncom.CoUninitialize()
-
-    def __del__(self):
-        self.close_presentation()
-        self.close_powerpoint()
-
-ppt_handler = PowerPointHandler()
+# 缩略图缓存在 Cache/thumbnails 中, 再次打开同一文件时无需重新渲染
+thumbnail_cache = ImageCache(os.path.join(DEFAULT_CACHE_DIR, 'thumbnails'), 256 * 1024 * 1024)
+thumbnails = None
 
 def select_ppt():
     file_path = filedialog.askopenfilename(filetypes=[("PowerPoint files", "*.pptx")])
@@ -51,13 +23,22 @@ def select_ppt():
         ppt_path_var.set(file_path)
         update_slide_list(file_path)
 
+def select_target_ppt():
+    file_path = filedialog.askopenfilename(filetypes=[("PowerPoint files", "*.pptx")])
+    if file_path:
+        target_ppt_path_var.set(file_path)
+
 def update_slide_list(ppt_path):
+    global thumbnails
     try:
-        prs = Presentation(ppt_path)
         slide_list.delete(0, tk.END)
-        for i, slide in enumerate(prs.slides, start=1):
+        for i in range(1, slide_count(ppt_path) + 1):
             slide_list.insert(tk.END, f"Slide {i}")
-        ppt_handler.open_presentation(ppt_path)
+        # 在后台渲染整个文件的缩略图, 切换预览时直接取用
+        if thumbnails is not None:
+            thumbnails.close()
+        thumbnails = SlideThumbnails(ppt_path, (300, 200), thumbnail_cache)
+        thumbnails.prerender()
     except Exception as e:
         messagebox.showerror("Error", f"无法打开PPT文件: {e}")
 
@@ -68,82 +49,68 @@ def apply_layout():
         messagebox.showwarning("警告", "请选择参考PPT和幻灯片")
         return
     reference_slide_index = selected_indices[0]
-    
-    current_foreground = win32gui.GetForegroundWindow()
-    
-    apply_reference_layout(reference_ppt_path, reference_slide_index)
-    
-    win32gui.SetForegroundWindow(current_foreground)
-
-def apply_reference_layout(reference_ppt_path: str, reference_slide_index: int):
-    temp_ppt_path = None
-    temp_presentation = None
-    try:
-        powerpoint = win32.Dispatch("PowerPoint.Application")
-        current_presentation = powerpoint.ActivePresentation
-        if not current_presentation:
-            messagebox.showerror("错误", "没有打开的PowerPoint演示文稿。")
-            return
-
-        current_slide = powerpoint.ActiveWindow.View.Slide
-        if not current_slide:
-            messagebox.showerror("错误", "没有选中的幻灯片。")
-            return
 
-        print(f"当前选中的幻灯片: 第 {current_slide.SlideIndex} 页")
-
-        temp_dir = tempfile.gettempdir()
-        temp_ppt_path = os.path.join(temp_dir, f"temp_reference_{os.getpid()}.pptx")
-        
-        shutil.copy2(reference_ppt_path, temp_ppt_path)
-        temp_presentation = powerpoint.Presentations.Open(temp_ppt_path)
-        
-        reference_slide = temp_presentation.Slides(reference_slide_index + 1)
-
-        for shape in current_slide.Shapes:
-            try:
-                matching_shape = None
-                for ref_shape in reference_slide.Shapes:
-                    if ref_shape.Name == shape.Name:
-                        matching_shape = ref_shape
-                        break
-
-                if matching_shape:
-                    if shape.HasTextFrame:
-                        matching_shape.TextFrame.TextRange.Text = shape.TextFrame.TextRange.Text
-                else:
-                    shape.Copy()
-                    reference_slide.Shapes.Paste()
-
-            except Exception as e:
-                print(f"处理形状 '{shape.Name}' 时发生错误: {e}")
-
-        reference_slide.Copy()
-        new_slide = current_presentation.Slides.Paste(current_slide.SlideIndex + 1)
-        
-        current_slide.Delete()
+    # 所有情况都直接修改文件(pptRelayout), 不经过 PowerPoint 的复制粘贴;
+    # 未指定目标PPT时使用 PowerPoint 中正在编辑的文件与当前页, 没有时选择目标文件
+    target_ppt_path = target_ppt_path_var.get()
+    target_pages = target_pages_var.get()
+    active = None
+    if not target_ppt_path:
+        active = active_powerpoint_slide()
+        if active is not None:
+            _, target_ppt_path, current_page = active
+            target_pages = str(current_page)
+        else:
+            target_ppt_path = filedialog.askopenfilename(title="选择目标PPT", filetypes=[("PowerPoint files", "*.pptx")])
+            if not target_ppt_path:
+                return
+            target_ppt_path_var.set(target_ppt_path)
+
+    output_path = apply_layout_to_file(reference_ppt_path, reference_slide_index, target_ppt_path, target_pages)
+    if active is not None and output_path:
+        open_in_powerpoint(active[0], output_path, active[2])
+
+def apply_layout_to_file(reference_ppt_path: str, reference_slide_index: int, target_ppt_path: str, target_pages: str):
+    # 返回输出文件路径, 失败时返回 None
+    try:
+        # 目标页面留空时按布局名称匹配整个文件
+        mapping = {page: reference_slide_index + 1 for page in parse_pages(target_pages)} if target_pages.strip() else None
+        output_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), "Outfile")
+        os.makedirs(output_dir, exist_ok=True)
+        output_path = os.path.join(output_dir, "relayout_" + os.path.basename(target_ppt_path))
+        result = relayout_file(target_ppt_path, reference_ppt_path, mapping, output_path)
+        messagebox.showinfo("成功", f"已根据参考PPT更新了目标PPT中的 {result['slides']} 页幻灯片。\n文件保存在: {output_path}")
+        return output_path
+    except Exception as e:
+        messagebox.showerror("错误", f"发生错误: {e}")
+        return None
 
-        powerpoint.ActiveWindow.ViewType = 1
-        powerpoint.ActiveWindow.View.GotoSlide(new_slide.SlideIndex)
-        
-        messagebox.showinfo("成功", f"已成功根据参考PPT的第{reference_slide_index + 1}页更新了当前PPT的选中页面布局。")
+def active_powerpoint_slide():
+    # Windows 上正在运行的 PowerPoint 中当前的文件与页码: 返回 (PowerPoint, 文件路径, 页码);
+    # 没有 pywin32(例如 Linux)、PowerPoint 未运行、没有选中页面或文件从未保存过时返回 None
+    try:
+        import win32com.client as win32
+    except ImportError:
+        return None
+    try:
+        powerpoint = win32.GetActiveObject("PowerPoint.Application")
+        presentation = powerpoint.ActivePresentation
+        slide = powerpoint.ActiveWindow.View.Slide
+        if not presentation.Path:
+            return None
+        presentation.Save()  # 重新排版读取的是磁盘上的文件
+        logger.info(f"Using slide {slide.SlideIndex} of {presentation.FullName} from PowerPoint")
+        return powerpoint, presentation.FullName, slide.SlideIndex
+    except Exception as e:
+        logger.info(f"No active PowerPoint slide: {e}")
+        return None
 
+def open_in_powerpoint(powerpoint, output_path, page):
+    try:
+        powerpoint.Presentations.Open(output_path)
+        powerpoint.ActiveWindow.View.GotoSlide(page)
     except Exception as e:
-        messagebox.showerror("错误", f"发生错误: {e}")
-    
-    finally:
-        if temp_presentation:
-            try:
-                temp_presentation.Close()
-            except:
-                pass
-        
-        if temp_ppt_path and os.path.exists(temp_ppt_path):
-            try:
-                os.remove(temp_ppt_path)
-            except Exception as e:
-                print(f"无法删除临时文件 {temp_ppt_path}: {e}")
-                atexit.register(lambda file=temp_ppt_path: os.remove(file) if os.path.exists(file) else None)
+        logger.warning(f"Could not open {output_path} in PowerPoint: {e}")
 
 def on_slide_select(event):
     selected_indices = slide_list.curselection()
@@ -152,46 +119,26 @@ def on_slide_select(event):
         update_preview(selected_index)
 
 def update_preview(slide_index):
-    ppt_path = ppt_path_var.get()
-    if not ppt_path:
+    if thumbnails is None:
         return
 
     try:
-        if not ppt_handler.presentation:
-            ppt_handler.open_presentation(ppt_path)
-        
-        if not ppt_handler.presentation:
-            raise Exception("无法打开演示文稿")
-
-        slide = ppt_handler.presentation.Slides(slide_index + 1)
-        
-        temp_image_path = os.path.join(tempfile.gettempdir(), f"slide_preview_{os.getpid()}.png")
-        try:
-            slide.Export(temp_image_path, "PNG")
-        except Exception as export_error:
-            print(f"导出幻灯片时出错: {export_error}")
-            messagebox.showerror("预览错误", "无法导出幻灯片进行预览")
-            return
-
-        with Image.open(temp_image_path) as img:
-            img.thumbnail((300, 200))
-            photo = ImageTk.PhotoImage(img)
+        img = thumbnails.get(slide_index)
+        photo = ImageTk.PhotoImage(img)
         
         preview_canvas.delete("all")
         preview_canvas.config(width=photo.width(), height=photo.height())
         preview_canvas.create_image(0, 0, anchor=tk.NW, image=photo)
         preview_canvas.image = photo
-
-        os.remove(temp_image_path)
         
     except Exception as e:
+        logger.exception("Preview failed")
         messagebox.showerror("预览错误", f"无法生成预览: {e}")
-        print(f"预览错误详情: {e}")
 
 # 主窗口设置
 root = ThemedTk(theme="ubuntu")
 root.title("PPT单页布局修改 By 渡客")
-root.geometry("760x500")
+root.geometry("760x620")
 
 icon_path = os.path.join(os.path.dirname(__file__), "Image", "logo.ico")
 if os.path.exists(icon_path):
@@ -218,6 +165,15 @@ slide_list = tk.Listbox(left_frame, width=40, height=10)
 slide_list.pack(pady=5)
 slide_list.bind('<<ListboxSelect>>', on_slide_select)
 
+target_ppt_path_var = tk.StringVar()
+ttk.Label(left_frame, text="目标PPT (留空则使用PowerPoint中的当前页, 没有时选择文件):").pack(pady=5)
+ttk.Entry(left_frame, textvariable=target_ppt_path_var, width=40).pack(side=tk.TOP, pady=5)
+ttk.Button(left_frame, text="浏览", command=select_target_ppt).pack(pady=5)
+
+target_pages_var = tk.StringVar()
+ttk.Label(left_frame, text="目标页面 (如 1-3,5, 留空按布局名称匹配整个文件):").pack(pady=5)
+ttk.Entry(left_frame, textvariable=target_pages_var, width=40).pack(side=tk.TOP, pady=5)
+
 apply_button = ttk.Button(left_frame, text="应用布局", command=apply_layout)
 apply_button.pack(pady=10)
 
@@ -226,8 +182,8 @@ preview_canvas = tk.Canvas(right_frame, width=300, height=200, bg='white')
 preview_canvas.pack(pady=5)
 
 def on_closing():
-    ppt_handler.close_presentation()
-    ppt_handler.close_powerpoint()
+    if thumbnails is not None:
+        thumbnails.close()
     root.destroy()
 
 root.protocol("WM_DELETE_WINDOW", on_closing)
@@ -0,0 +1,223 @@
+import os
+import sys
+import time
+import hashlib
+import argparse
+import logging
+import zipfile
+import posixpath
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from lxml import etree
+from pptMetadata import NS, R_ID, RT_SLIDE_LAYOUT, rels_partname, read_rels, main_document_partname, slide_partnames
+from pptPrune import LOG_FORMAT, CONTENT_TYPES, remove_relationships, remove_overrides, write_package
+from pptInputs import collect_ppt_files
+
+# PPTX 文件瘦身: 从包的根关系出发遍历所有关系, 删除无法到达的部件(反复替换图片留下的旧图片、
+# 未使用的母版等), 合并内容相同的媒体文件, 并删除 XML 中不再引用的图片类关系
+
+logger = logging.getLogger(__name__)
+
+R_NAMESPACE = '{%s}' % NS['r']
+# 只有在部件 XML 中通过 r:embed / r:link / r:id 引用时才有意义的关系, 未被引用时可以删除
+DISPOSABLE_RELTYPES = {
+    'http://schemas.openxmlformats.org/officeDocument/2006/relationships/image',
+    'http://schemas.microsoft.com/office/2007/relationships/hdphoto',
+    'http://schemas.microsoft.com/office/2007/relationships/media',
+    'http://schemas.openxmlformats.org/officeDocument/2006/relationships/video',
+    'http://schemas.openxmlformats.org/officeDocument/2006/relationships/audio',
+    'http://schemas.openxmlformats.org/officeDocument/2006/relationships/hyperlink',
+}
+
+class PackageView:
+    # 读取部件时优先返回已修改的内容, 使 pptMetadata.read_rels 等函数看到修改后的关系
+    def __init__(self, zf):
+        self.zf = zf
+        self.replaced = {}
+        self.names = set(zf.namelist())
+
+    def read(self, name):
+        if name in self.replaced:
+            return self.replaced[name]
+        return self.zf.read(name)
+
+def source_partname(rels_name):
+    # ppt/slides/_rels/slide1.xml.rels -> ppt/slides/slide1.xml, _rels/.rels -> ''
+    directory, filename = posixpath.split(rels_name)
+    return posixpath.join(posixpath.dirname(directory), filename[:-len('.rels')])
+
+def remove_unused_masters(package):
+    # 没有任何幻灯片使用其布局的母版从 presentation.xml 中移除, 至少保留一个母版; 返回移除的母版数
+    presentation = main_document_partname(package)
+    used_layouts = set()
+    for slide in slide_partnames(package):
+        used_layouts.update(target for reltype, target in read_rels(package, slide).values() if reltype == RT_SLIDE_LAYOUT)
+    rels = read_rels(package, presentation)
+    root = etree.fromstring(package.read(presentation))
+    master_ids = root.findall('p:sldMasterIdLst/p:sldMasterId', NS)
+    unused = []
+    for master_id in master_ids:
+        master = rels[master_id.get(R_ID)][1]
+        layouts = {target for reltype, target in read_rels(package, master).values() if reltype == RT_SLIDE_LAYOUT}
+        if not layouts & used_layouts:
+            unused.append(master_id)
+    if len(unused) == len(master_ids):
+        unused = unused[1:]
+    if not unused:
+        return 0
+    for master_id in unused:
+        master_id.getparent().remove(master_id)
+    package.replaced[presentation] = etree.tostring(root, xml_declaration=True, encoding='UTF-8', standalone=True)
+    package.replaced[rels_partname(presentation)] = remove_relationships(
+        package.read(rels_partname(presentation)), {master_id.get(R_ID) for master_id in unused})
+    return len(unused)
+
+def remove_unreferenced_relationships(package):
+    # 部件 XML 中没有引用的图片、媒体与超链接关系(例如被替换掉的图片); 返回删除的关系数
+    removed = 0
+    for rels_name in sorted(name for name in package.names if name.endswith('.rels')):
+        source = source_partname(rels_name)
+        if not source or source not in package.names or not source.endswith('.xml'):
+            continue
+        candidates = {r_id for r_id, (reltype, _) in read_rels(package, source).items() if reltype in DISPOSABLE_RELTYPES}
+        if not candidates:
+            continue
+        referenced = {value for node in etree.fromstring(package.read(source)).iter()
+                      for attribute, value in node.attrib.items() if attribute.startswith(R_NAMESPACE)}
+        unused = candidates - referenced
+        if unused:
+            package.replaced[rels_name] = remove_relationships(package.read(rels_name), unused)
+            removed += len(unused)
+    return removed
+
+def deduplicate_media(package):
+    # 内容与扩展名都相同的二进制部件只保留一份, 关系改为指向保留的部件; 返回被合并的部件数
+    canonical = {}
+    duplicates = {}
+    for name in sorted(package.names):
+        if name.endswith(('.xml', '.rels')) or name.endswith('/'):
+            continue
+        key = (posixpath.splitext(name)[1].lower(), hashlib.sha256(package.read(name)).hexdigest())
+        if key in canonical:
+            duplicates[name] = canonical[key]
+        else:
+            canonical[key] = name
+    if not duplicates:
+        return 0
+    for rels_name in sorted(name for name in package.names if name.endswith('.rels')):
+        base = posixpath.dirname(source_partname(rels_name))
+        root = etree.fromstring(package.read(rels_name))
+        changed = False
+        for rel in root.iterfind('rel:Relationship', NS):
+            if rel.get('TargetMode') == 'External':
+                continue
+            target = rel.get('Target')
+            partname = target.lstrip('/') if target.startswith('/') else posixpath.normpath(posixpath.join(base, target))
+            if partname in duplicates:
+                rel.set('Target', posixpath.relpath(duplicates[partname], base or '.'))
+                changed = True
+        if changed:
+            package.replaced[rels_name] = etree.tostring(root, xml_declaration=True, encoding='UTF-8', standalone=True)
+    return len(duplicates)
+
+def reachable_parts(package):
+    # 从包的根关系(_rels/.rels)出发能到达的所有部件
+    reachable = set()
+    pending = ['']
+    while pending:
+        partname = pending.pop()
+        for _, target in read_rels(package, partname).values():
+            if target in package.names and target not in reachable:
+                reachable.add(target)
+                pending.append(target)
+    return reachable
+
+def compact_package(pptx_file, output_file=None):
+    # output_file 为空时覆盖原文件. 返回 {'input', 'output', 'dropped', 'masters_removed', 'relationships_removed',
+    # 'deduplicated', 'bytes_before', 'bytes_after', 'seconds'}, dropped 为删除的部件名
+    start = time.perf_counter()
+    output_file = output_file or pptx_file
+    bytes_before = os.path.getsize(pptx_file)
+    with zipfile.ZipFile(pptx_file) as zf:
+        package = PackageView(zf)
+        masters_removed = remove_unused_masters(package)
+        relationships_removed = remove_unreferenced_relationships(package)
+        deduplicated = deduplicate_media(package)
+        reachable = reachable_parts(package)
+        dropped = sorted(name for name in package.names
+                         if name != CONTENT_TYPES and not name.endswith('.rels') and not name.endswith('/')
+                         and name not in reachable)
+        dropped_set = set(dropped)
+        # 关系文件随其部件一起删除
+        dropped_set.update(name for name in package.names
+                           if name.endswith('.rels') and source_partname(name) in dropped_set)
+        if dropped_set:
+            package.replaced[CONTENT_TYPES] = remove_overrides(package.read(CONTENT_TYPES), dropped_set)
+        replaced = {name: data for name, data in package.replaced.items() if name not in dropped_set}
+    write_package(pptx_file, output_file, dropped_set, replaced)
+    result = {
+        'input': pptx_file,
+        'output': output_file,
+        'dropped': dropped,
+        'masters_removed': masters_removed,
+        'relationships_removed': relationships_removed,
+        'deduplicated': deduplicated,
+        'bytes_before': bytes_before,
+        'bytes_after': os.path.getsize(output_file),
+        'seconds': time.perf_counter() - start,
+    }
+    logger.info(f"Compacted {pptx_file}: {len(dropped)} parts dropped, {deduplicated} duplicates merged, "
+                f"{masters_removed} masters removed, {bytes_before - result['bytes_after']} bytes saved")
+    return result
+
+def output_path(pptx_file, output_dir):
+    return os.path.join(output_dir, "compact_" + os.path.basename(pptx_file))
+
+def compact_file(pptx_file, output_dir):
+    # 在工作进程中处理单个文件, 返回 (状态, 结果, 错误信息); output_dir 为空时覆盖原文件
+    try:
+        return 'OK', compact_package(pptx_file, output_path(pptx_file, output_dir) if output_dir else None), None
+    except Exception as e:
+        return 'FAILED', None, f"{type(e).__name__}: {e}"
+
+def run_batch(ppt_files, output_dir, workers=None):
+    if output_dir:
+        os.makedirs(output_dir, exist_ok=True)
+    results = []
+    start = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = {executor.submit(compact_file, ppt_file, output_dir): ppt_file for ppt_file in ppt_files}
+        for future in as_completed(futures):
+            ppt_file = futures[future]
+            status, result, error = future.result()
+            if status == 'OK':
+                saved = result['bytes_before'] - result['bytes_after']
+                print(f"[OK] {ppt_file} -> {result['output']} ({len(result['dropped'])} parts dropped, "
+                      f"{result['deduplicated']} duplicates merged, {saved / 1024:.0f} KB saved, {result['seconds']:.2f}s)")
+            else:
+                print(f"[FAILED] {ppt_file}: {error}")
+            results.append((ppt_file, status, result, error))
+    saved = sum(result[2]['bytes_before'] - result[2]['bytes_after'] for result in results if result[1] == 'OK')
+    succeeded = sum(1 for result in results if result[1] == 'OK')
+    print(f"\nCompacted {succeeded}/{len(results)} decks in {time.perf_counter() - start:.2f}s, {saved / 2**20:.2f} MB saved")
+    return results
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="PPTX瘦身: 删除无用的部件与母版, 合并重复的图片")
+    parser.add_argument('inputs', nargs='+', help="PPTX文件、目录或通配符")
+    parser.add_argument('-o', '--output-dir', default='Outfile', help="文件保存路径, 输出文件名为 compact_原文件名")
+    parser.add_argument('--in-place', action='store_true', help="直接覆盖原文件")
+    parser.add_argument('-j', '--workers', type=int, default=None, help="并行进程数, 默认为CPU核心数")
+    parser.add_argument('--log-level', choices=['DEBUG', 'INFO', 'WARNING', 'ERROR'], help="日志级别, 默认不输出日志")
+    args = parser.parse_args(argv)
+
+    ppt_files = collect_ppt_files(args.inputs)
+    if not ppt_files:
+        print("No PPTX files found")
+        return 2
+    if args.log_level:
+        logging.basicConfig(level=args.log_level, format=LOG_FORMAT)
+    results = run_batch(ppt_files, None if args.in_place else args.output_dir, args.workers)
+    return 0 if all(result[1] == 'OK' for result in results) else 1
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,33 @@
+import os
+import glob
+
+# 命令行工具共用的输入解析: 页码范围与PPT文件列表
+
+def parse_pages(text):
+    # "1-3,5" -> [1, 2, 3, 5]
+    pages = []
+    for part in text.split(','):
+        part = part.strip()
+        if not part:
+            continue
+        if '-' in part:
+            first, last = part.split('-', 1)
+            pages.extend(range(int(first), int(last) + 1))
+        else:
+            pages.append(int(part))
+    return sorted(set(pages))
+
+def collect_ppt_files(inputs):
+    # 输入可以是目录、通配符或单个文件
+    files = []
+    for item in inputs:
+        if os.path.isdir(item):
+            matches = sorted(glob.glob(os.path.join(item, '*.pptx')))
+        elif glob.has_magic(item):
+            matches = sorted(glob.glob(item, recursive=True))
+        else:
+            matches = [item]
+        for path in matches:
+            if path not in files:
+                files.append(path)
+    return files
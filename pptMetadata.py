@@ -0,0 +1,100 @@
+import sys
+import json
+import zipfile
+import posixpath
+from lxml import etree
+
+# 直接读取 PPTX 压缩包中的 XML 获取元数据, 不创建 Presentation 对象, 大文件也只需几毫秒
+
+NS = {
+    'p': 'http://schemas.openxmlformats.org/presentationml/2006/main',
+    'r': 'http://schemas.openxmlformats.org/officeDocument/2006/relationships',
+    'rel': 'http://schemas.openxmlformats.org/package/2006/relationships',
+}
+RT_OFFICE_DOCUMENT = 'http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument'
+RT_SLIDE_LAYOUT = 'http://schemas.openxmlformats.org/officeDocument/2006/relationships/slideLayout'
+R_ID = '{%s}id' % NS['r']
+IMAGE_PREFIXES = ('image', 'subimage')
+
+def rels_partname(partname):
+    # ppt/slides/slide1.xml -> ppt/slides/_rels/slide1.xml.rels
+    directory, filename = posixpath.split(partname)
+    return posixpath.join(directory, '_rels', f"{filename}.rels")
+
+def read_rels(zf, partname):
+    # 返回 {rId: (关系类型, 目标部件名)}, 外部链接的目标保持原样
+    try:
+        root = etree.fromstring(zf.read(rels_partname(partname)))
+    except KeyError:
+        return {}
+    base = posixpath.dirname(partname)
+    rels = {}
+    for rel in root.iterfind('rel:Relationship', NS):
+        target = rel.get('Target')
+        if rel.get('TargetMode') != 'External':
+            target = target.lstrip('/') if target.startswith('/') else posixpath.normpath(posixpath.join(base, target))
+        rels[rel.get('Id')] = (rel.get('Type'), target)
+    return rels
+
+def main_document_partname(zf):
+    for reltype, target in read_rels(zf, '').values():
+        if reltype == RT_OFFICE_DOCUMENT:
+            return target
+    return 'ppt/presentation.xml'
+
+def slide_partnames(zf):
+    # 按演示顺序(sldIdLst)返回幻灯片部件名
+    presentation = main_document_partname(zf)
+    rels = read_rels(zf, presentation)
+    root = etree.fromstring(zf.read(presentation))
+    return [rels[sld_id.get(R_ID)][1] for sld_id in root.iterfind('p:sldIdLst/p:sldId', NS)]
+
+def layout_name(zf, partname):
+    root = etree.fromstring(zf.read(partname))
+    c_sld = root.find('p:cSld', NS)
+    return c_sld.get('name', '') if c_sld is not None else ''
+
+def image_placeholder_names(zf, partname):
+    # 与 Gimage 的判断一致: 顶层形状中的图片, 以及名称以 image/subimage 开头的形状
+    root = etree.fromstring(zf.read(partname))
+    names = []
+    sp_tree = root.find('p:cSld/p:spTree', NS)
+    if sp_tree is None:
+        return names
+    for shape in sp_tree:
+        c_nv_pr = shape.find('*/p:cNvPr', NS)
+        if c_nv_pr is None:
+            continue
+        name = c_nv_pr.get('name', '')
+        if etree.QName(shape).localname == 'pic' or name.startswith(IMAGE_PREFIXES):
+            names.append(name)
+    return names
+
+def slide_count(pptx_file):
+    with zipfile.ZipFile(pptx_file) as zf:
+        presentation = main_document_partname(zf)
+        root = etree.fromstring(zf.read(presentation))
+        return len(root.findall('p:sldIdLst/p:sldId', NS))
+
+def read_metadata(pptx_file, slide_details=True):
+    # 返回 {'slide_count', 'slides': [{'number', 'partname', 'layout', 'image_placeholders'}]};
+    # slide_details 为 False 时只读取 presentation.xml 与关系文件
+    with zipfile.ZipFile(pptx_file) as zf:
+        partnames = slide_partnames(zf)
+        slides = []
+        layout_names = {}
+        for number, partname in enumerate(partnames, 1):
+            slide = {'number': number, 'partname': partname}
+            if slide_details:
+                layout = next((target for reltype, target in read_rels(zf, partname).values()
+                               if reltype == RT_SLIDE_LAYOUT), None)
+                if layout is not None and layout not in layout_names:
+                    layout_names[layout] = layout_name(zf, layout)
+                slide['layout'] = layout_names.get(layout)
+                slide['image_placeholders'] = image_placeholder_names(zf, partname)
+            slides.append(slide)
+    return {'slide_count': len(slides), 'slides': slides}
+
+if __name__ == "__main__":
+    for path in sys.argv[1:]:
+        print(json.dumps({'file': path, **read_metadata(path)}, ensure_ascii=False, indent=2))
@@ -0,0 +1,178 @@
+import os
+import sys
+import time
+import argparse
+import logging
+import zipfile
+import posixpath
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from lxml import etree
+from pptMetadata import NS, R_ID, RT_SLIDE_LAYOUT, rels_partname, read_rels, main_document_partname, slide_partnames, layout_name
+from pptInputs import collect_ppt_files
+
+# 直接在 PPTX 压缩包层面删除未被任何幻灯片使用的布局, 不需要 PowerPoint, 可在 Linux 上运行
+
+logger = logging.getLogger(__name__)
+
+LOG_FORMAT = '%(asctime)s - %(processName)s - %(levelname)s - %(message)s'
+RT_SLIDE_MASTER = 'http://schemas.openxmlformats.org/officeDocument/2006/relationships/slideMaster'
+CONTENT_TYPES = '[Content_Types].xml'
+CT_NS = {'ct': 'http://schemas.openxmlformats.org/package/2006/content-types'}
+
+def find_unused_layouts(zf):
+    # 返回 {母版部件名: [(rId, 布局部件名), ...]}, 只包含没有幻灯片引用的布局;
+    # 母版的布局都未被使用时保留第一个, 母版至少需要一个布局
+    used = set()
+    for slide in slide_partnames(zf):
+        used.update(target for reltype, target in read_rels(zf, slide).values() if reltype == RT_SLIDE_LAYOUT)
+    unused = {}
+    for reltype, master in read_rels(zf, main_document_partname(zf)).values():
+        if reltype != RT_SLIDE_MASTER:
+            continue
+        master_rels = read_rels(zf, master)
+        root = etree.fromstring(zf.read(master))
+        layouts = [(sld_layout_id.get(R_ID), master_rels[sld_layout_id.get(R_ID)][1])
+                   for sld_layout_id in root.iterfind('p:sldLayoutIdLst/p:sldLayoutId', NS)]
+        removable = [(r_id, layout) for r_id, layout in layouts if layout not in used]
+        if removable and len(removable) == len(layouts):
+            removable = removable[1:]
+        if removable:
+            unused[master] = removable
+    return unused
+
+def referenced_parts(zf, skip):
+    # 除 skip 中的部件外, 所有关系文件引用的内部部件
+    targets = set()
+    for name in zf.namelist():
+        if not name.endswith('.rels'):
+            continue
+        directory, filename = posixpath.split(name)
+        source = posixpath.join(posixpath.dirname(directory), filename[:-len('.rels')])
+        if source in skip:
+            continue
+        targets.update(target for _, target in read_rels(zf, source).values())
+    return targets
+
+def remove_relationships(data, r_ids):
+    root = etree.fromstring(data)
+    for rel in root.findall('rel:Relationship', NS):
+        if rel.get('Id') in r_ids:
+            root.remove(rel)
+    return etree.tostring(root, xml_declaration=True, encoding='UTF-8', standalone=True)
+
+def remove_layout_ids(data, r_ids):
+    root = etree.fromstring(data)
+    for sld_layout_id in root.findall('p:sldLayoutIdLst/p:sldLayoutId', NS):
+        if sld_layout_id.get(R_ID) in r_ids:
+            sld_layout_id.getparent().remove(sld_layout_id)
+    return etree.tostring(root, xml_declaration=True, encoding='UTF-8', standalone=True)
+
+def remove_overrides(data, partnames):
+    root = etree.fromstring(data)
+    for override in root.findall('ct:Override', CT_NS):
+        if override.get('PartName', '').lstrip('/') in partnames:
+            root.remove(override)
+    return etree.tostring(root, xml_declaration=True, encoding='UTF-8', standalone=True)
+
+def write_package(pptx_file, output_file, dropped=(), replaced=None):
+    # 复制 pptx_file 中的部件到 output_file, 跳过 dropped 中的部件, replaced 中的部件使用新内容;
+    # 先写入临时文件, 关闭原文件后再替换, 输出文件与输入文件相同时也不会损坏原文件
+    replaced = replaced or {}
+    temp_file = f"{output_file}.tmp{os.getpid()}"
+    try:
+        with zipfile.ZipFile(pptx_file) as zf, zipfile.ZipFile(temp_file, 'w', zipfile.ZIP_DEFLATED) as out:
+            for info in zf.infolist():
+                if info.filename in dropped:
+                    continue
+                out.writestr(info, replaced.get(info.filename) or zf.read(info.filename))
+    except BaseException:
+        if os.path.exists(temp_file):
+            os.remove(temp_file)
+        raise
+    os.replace(temp_file, output_file)
+
+def prune_unused_layouts(pptx_file, output_file=None):
+    # 删除未使用的布局部件及其关系文件、母版中的 sldLayoutId 与关系, 以及只被这些布局引用的图片等部件;
+    # output_file 为空时覆盖原文件. 返回 {'input', 'output', 'removed', 'bytes_before', 'bytes_after', 'seconds'}
+    start = time.perf_counter()
+    output_file = output_file or pptx_file
+    bytes_before = os.path.getsize(pptx_file)
+    with zipfile.ZipFile(pptx_file) as zf:
+        unused = find_unused_layouts(zf)
+        layouts = {layout for removable in unused.values() for _, layout in removable}
+        removed_names = [layout_name(zf, layout) for removable in unused.values() for _, layout in removable]
+        dropped = set(layouts) | {rels_partname(layout) for layout in layouts}
+        if layouts:
+            # 布局引用的图片等部件, 如果没有其他部件引用也一并删除
+            still_used = referenced_parts(zf, layouts)
+            for layout in layouts:
+                for reltype, target in read_rels(zf, layout).values():
+                    if reltype != RT_SLIDE_MASTER and target in zf.NameToInfo and target not in still_used:
+                        dropped.update((target, rels_partname(target)))
+        replaced = {}
+        for master, removable in unused.items():
+            r_ids = {r_id for r_id, _ in removable}
+            replaced[master] = remove_layout_ids(zf.read(master), r_ids)
+            replaced[rels_partname(master)] = remove_relationships(zf.read(rels_partname(master)), r_ids)
+        replaced[CONTENT_TYPES] = remove_overrides(zf.read(CONTENT_TYPES), dropped)
+    write_package(pptx_file, output_file, dropped, replaced)
+    result = {
+        'input': pptx_file,
+        'output': output_file,
+        'removed': removed_names,
+        'bytes_before': bytes_before,
+        'bytes_after': os.path.getsize(output_file),
+        'seconds': time.perf_counter() - start,
+    }
+    logger.info(f"Removed {len(removed_names)} unused layouts from {pptx_file}: {', '.join(removed_names) or 'none'}")
+    return result
+
+def output_path(pptx_file, output_dir):
+    return os.path.join(output_dir, "output_" + os.path.basename(pptx_file))
+
+def prune_file(pptx_file, output_dir):
+    # 在工作进程中处理单个文件, 返回 (状态, 结果, 错误信息)
+    try:
+        return 'OK', prune_unused_layouts(pptx_file, output_path(pptx_file, output_dir)), None
+    except Exception as e:
+        return 'FAILED', None, f"{type(e).__name__}: {e}"
+
+def run_batch(ppt_files, output_dir, workers=None):
+    os.makedirs(output_dir, exist_ok=True)
+    results = []
+    start = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = {executor.submit(prune_file, ppt_file, output_dir): ppt_file for ppt_file in ppt_files}
+        for future in as_completed(futures):
+            ppt_file = futures[future]
+            status, result, error = future.result()
+            if status == 'OK':
+                saved = result['bytes_before'] - result['bytes_after']
+                print(f"[OK] {ppt_file} -> {result['output']} ({len(result['removed'])} layouts removed, "
+                      f"{saved / 1024:.0f} KB saved, {result['seconds']:.2f}s)")
+            else:
+                print(f"[FAILED] {ppt_file}: {error}")
+            results.append((ppt_file, status, result, error))
+    succeeded = sum(1 for result in results if result[1] == 'OK')
+    print(f"\nPruned {succeeded}/{len(results)} decks in {time.perf_counter() - start:.2f}s")
+    return results
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="删除PPTX中未被任何幻灯片使用的布局 (无需PowerPoint)")
+    parser.add_argument('inputs', nargs='+', help="PPTX文件、目录或通配符")
+    parser.add_argument('-o', '--output-dir', default='Outfile', help="文件保存路径, 输出文件名为 output_原文件名")
+    parser.add_argument('-j', '--workers', type=int, default=None, help="并行进程数, 默认为CPU核心数")
+    parser.add_argument('--log-level', choices=['DEBUG', 'INFO', 'WARNING', 'ERROR'], help="日志级别, 默认不输出日志")
+    args = parser.parse_args(argv)
+
+    ppt_files = collect_ppt_files(args.inputs)
+    if not ppt_files:
+        print("No PPTX files found")
+        return 2
+    if args.log_level:
+        logging.basicConfig(level=args.log_level, format=LOG_FORMAT)
+    results = run_batch(ppt_files, args.output_dir, args.workers)
+    return 0 if all(result[1] == 'OK' for result in results) else 1
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,262 @@
+import os
+import sys
+import time
+import argparse
+import logging
+from io import BytesIO
+from copy import deepcopy
+from pptx import Presentation
+from pptx.opc.constants import RELATIONSHIP_TYPE as RT
+from pptx.oxml.ns import qn
+from pptx.text.text import _Paragraph
+from pptInputs import parse_pages
+
+# 不经过 PowerPoint, 将参考幻灯片的布局与形状套用到目标幻灯片上:
+# 结果为参考幻灯片的样式, 同名形状(占位符)中填入目标幻灯片原有的文字, 参考幻灯片中没有的形状原样保留
+
+logger = logging.getLogger(__name__)
+
+LOG_FORMAT = '%(asctime)s - %(levelname)s - %(message)s'
+R_NAMESPACE = '{http://schemas.openxmlformats.org/officeDocument/2006/relationships}'
+# 目标幻灯片中不再被引用时可以删除的关系
+DISPOSABLE_RELTYPES = (RT.IMAGE, RT.HYPERLINK, RT.MEDIA, RT.VIDEO, RT.AUDIO)
+# p:sld 中 cSld 之后的子元素顺序
+SLIDE_TAIL = ('p:clrMapOvr', 'p:transition', 'p:timing', 'p:extLst')
+
+def parse_mapping(specs):
+    # ["1-3,5=2", "7=4"] -> {1: 2, 2: 2, 3: 2, 5: 2, 7: 4}, 键为目标页码, 值为参考页码
+    mapping = {}
+    for spec in specs:
+        targets, _, reference = spec.partition('=')
+        if not reference:
+            raise ValueError(f"Invalid mapping '{spec}', expected TARGET_PAGES=REFERENCE_PAGE")
+        for page in parse_pages(targets):
+            mapping[page] = int(reference)
+    return mapping
+
+def find_layout(prs, name):
+    for master in prs.slide_masters:
+        for layout in master.slide_layouts:
+            if layout.name == name:
+                return layout
+    return None
+
+def auto_mapping(target_prs, reference_prs):
+    # 整个文件重新排版: 每页目标幻灯片套用第一张与其布局同名的参考幻灯片
+    by_layout = {}
+    for number, slide in enumerate(reference_prs.slides, 1):
+        by_layout.setdefault(slide.slide_layout.name, number)
+    mapping = {}
+    for number, slide in enumerate(target_prs.slides, 1):
+        reference = by_layout.get(slide.slide_layout.name)
+        if reference is not None:
+            mapping[number] = reference
+    return mapping
+
+def set_layout(slide, layout):
+    part = slide.part
+    for r_id, rel in list(part.rels.items()):
+        if rel.reltype == RT.SLIDE_LAYOUT:
+            part.rels.pop(r_id)
+    part.relate_to(layout.part, RT.SLIDE_LAYOUT)
+
+def copy_text(source_shape, target_element):
+    # 与 COM 中 TextRange.Text 赋值相同: 只复制文字, 每段沿用参考形状对应段落(多出的段落沿用最后一段)的格式
+    tx_body = target_element.find('.//' + qn('p:txBody'))
+    if tx_body is None:
+        return False
+    templates = tx_body.findall(qn('a:p'))
+    if not templates:
+        return False
+    for p in templates:
+        tx_body.remove(p)
+    for i, paragraph in enumerate(source_shape.text_frame.paragraphs):
+        p = deepcopy(templates[min(i, len(templates) - 1)])
+        first_run = p.find(qn('a:r'))
+        r_pr = first_run.find(qn('a:rPr')) if first_run is not None else None
+        _Paragraph(p, None).text = paragraph.text
+        if r_pr is not None:
+            for run in p.iterfind(qn('a:r')):
+                run.insert(0, deepcopy(r_pr))
+        tx_body.append(p)
+    return True
+
+def import_relationships(elements, reference_part, target_part):
+    # 将复制过来的元素中的 r:embed / r:link / r:id 等指向目标幻灯片的新关系;
+    # 图片按内容去重导入, 外部链接直接添加, 其他内部部件(图表、OLE对象等)无法跨文件复制, 返回含有这些引用的元素
+    mapping = {}
+    unsupported = []
+    for element in elements:
+        supported = True
+        for node in element.iter():
+            for attribute, r_id in node.attrib.items():
+                if not attribute.startswith(R_NAMESPACE) or r_id not in reference_part.rels:
+                    continue
+                if r_id not in mapping:
+                    rel = reference_part.rels[r_id]
+                    if rel.is_external:
+                        mapping[r_id] = target_part.relate_to(rel.target_ref, rel.reltype, is_external=True)
+                    elif rel.reltype == RT.IMAGE:
+                        _, mapping[r_id] = target_part.get_or_add_image_part(BytesIO(rel.target_part.blob))
+                    else:
+                        mapping[r_id] = None
+                if mapping[r_id] is None:
+                    supported = False
+                else:
+                    node.set(attribute, mapping[r_id])
+        if not supported:
+            unsupported.append(element)
+    return unsupported
+
+def drop_unused_relationships(part):
+    referenced = {value for node in part._element.iter() for attribute, value in node.attrib.items()
+                  if attribute.startswith(R_NAMESPACE)}
+    for r_id, rel in list(part.rels.items()):
+        if rel.reltype in DISPOSABLE_RELTYPES and r_id not in referenced:
+            part.rels.pop(r_id)
+
+def replace_slide_child(sld, tag, replacement):
+    # 用参考幻灯片的 clrMapOvr/transition/timing 替换目标幻灯片的对应元素, 保持 p:sld 中的元素顺序
+    existing = sld.find(qn(tag))
+    if existing is not None:
+        sld.remove(existing)
+    if replacement is None:
+        return
+    for later in SLIDE_TAIL[SLIDE_TAIL.index(tag) + 1:]:
+        found = sld.find(qn(later))
+        if found is not None:
+            position = list(sld).index(found)
+            break
+    else:
+        position = len(sld)
+    sld.insert(position, deepcopy(replacement))
+
+def relayout_slide(target_slide, reference_slide):
+    # 返回 (填入文字的形状数, 保留的目标形状数)
+    target_part = target_slide.part
+    sld = target_slide._element
+    reference_sld = reference_slide._element
+    sources = {}
+    for shape in target_slide.shapes:
+        sources.setdefault(shape.name, shape)
+
+    layout = find_layout(target_part.package.presentation_part.presentation, reference_slide.slide_layout.name)
+    if layout is not None:
+        set_layout(target_slide, layout)
+    else:
+        logger.warning(f"Layout '{reference_slide.slide_layout.name}' not found in target deck, keeping '{target_slide.slide_layout.name}'")
+
+    c_sld = sld.find(qn('p:cSld'))
+    reference_c_sld = reference_sld.find(qn('p:cSld'))
+    sp_tree = c_sld.find(qn('p:spTree'))
+    new_sp_tree = deepcopy(reference_c_sld.find(qn('p:spTree')))
+    background = reference_c_sld.find(qn('p:bg'))
+    background = deepcopy(background) if background is not None else None
+
+    shapes = [element for element in new_sp_tree if element.find('*/' + qn('p:cNvPr')) is not None]
+    for element in import_relationships(shapes + ([background] if background is not None else []),
+                                        reference_slide.part, target_part):
+        if element is background:
+            logger.warning("Skipping reference background with unsupported relationship")
+            background = None
+        else:
+            logger.warning(f"Skipping reference shape with unsupported relationship: {element.find('*/' + qn('p:cNvPr')).get('name')}")
+            new_sp_tree.remove(element)
+
+    # 同名形状只复制文字, 参考幻灯片中没有的目标形状(连同其关系)原样保留
+    filled = 0
+    reference_names = set()
+    for element in new_sp_tree:
+        c_nv_pr = element.find('*/' + qn('p:cNvPr'))
+        if c_nv_pr is None:
+            continue
+        name = c_nv_pr.get('name')
+        reference_names.add(name)
+        source = sources.get(name)
+        if source is not None and source.has_text_frame and copy_text(source, element):
+            filled += 1
+    used_ids = {int(c_nv_pr.get('id')) for c_nv_pr in new_sp_tree.iter(qn('p:cNvPr'))}
+    kept = 0
+    for shape in list(target_slide.shapes):
+        if shape.name in reference_names:
+            continue
+        element = shape._element
+        for c_nv_pr in element.iter(qn('p:cNvPr')):
+            if int(c_nv_pr.get('id')) in used_ids:
+                c_nv_pr.set('id', str(max(used_ids) + 1))
+            used_ids.add(int(c_nv_pr.get('id')))
+        new_sp_tree.append(element)
+        kept += 1
+
+    c_sld.replace(sp_tree, new_sp_tree)
+    existing_background = c_sld.find(qn('p:bg'))
+    if existing_background is not None:
+        c_sld.remove(existing_background)
+    if background is not None:
+        c_sld.insert(0, background)
+    # 动画引用的是原有形状的 id, 与形状一起换成参考幻灯片的
+    for tag in SLIDE_TAIL[:-1]:
+        replace_slide_child(sld, tag, reference_sld.find(qn(tag)))
+    drop_unused_relationships(target_part)
+    return filled, kept
+
+def relayout_presentation(target_prs, reference_prs, mapping):
+    # mapping 为 {目标页码: 参考页码}, 页码从1开始; 返回处理的幻灯片数
+    target_slides = list(target_prs.slides)
+    reference_slides = list(reference_prs.slides)
+    for target_number, reference_number in sorted(mapping.items()):
+        if not 1 <= target_number <= len(target_slides):
+            raise ValueError(f"Target slide {target_number} out of range (1-{len(target_slides)})")
+        if not 1 <= reference_number <= len(reference_slides):
+            raise ValueError(f"Reference slide {reference_number} out of range (1-{len(reference_slides)})")
+    for target_number, reference_number in sorted(mapping.items()):
+        filled, kept = relayout_slide(target_slides[target_number - 1], reference_slides[reference_number - 1])
+        logger.info(f"Slide {target_number} relayouted from reference slide {reference_number}: "
+                    f"{filled} shapes filled, {kept} shapes kept")
+    return len(mapping)
+
+def relayout_file(target_file, reference_file, mapping=None, output_file=None):
+    # mapping 为空时按布局名称自动匹配整个文件; output_file 为空时覆盖目标文件
+    start = time.perf_counter()
+    # 参考文件与目标文件相同时也分别打开, 参考幻灯片始终从未修改的副本读取
+    target_prs = Presentation(target_file)
+    reference_prs = Presentation(reference_file)
+    if mapping is None:
+        mapping = auto_mapping(target_prs, reference_prs)
+    count = relayout_presentation(target_prs, reference_prs, mapping)
+    output_file = output_file or target_file
+    target_prs.save(output_file)
+    return {'input': target_file, 'output': output_file, 'slides': count, 'seconds': time.perf_counter() - start}
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="将参考PPT中幻灯片的布局套用到目标PPT (无需PowerPoint)")
+    parser.add_argument('target', help="目标PPTX文件")
+    parser.add_argument('-r', '--reference', required=True, help="参考PPTX文件")
+    parser.add_argument('-m', '--map', action='append', default=[],
+                        help="目标页码=参考页码, 目标页码可为范围, 例如 -m 1-3,5=2 -m 7=4; 不指定时按布局名称匹配整个文件")
+    parser.add_argument('-o', '--output', help="输出文件, 默认为 Outfile/relayout_目标文件名")
+    parser.add_argument('--log-level', choices=['DEBUG', 'INFO', 'WARNING', 'ERROR'], default='WARNING', help="日志级别")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=args.log_level, format=LOG_FORMAT)
+    for path in (args.target, args.reference):
+        if not os.path.exists(path):
+            print(f"File not found: {path}")
+            return 2
+    try:
+        mapping = parse_mapping(args.map) if args.map else None
+    except ValueError as e:
+        print(e)
+        return 2
+    output_file = args.output or os.path.join('Outfile', "relayout_" + os.path.basename(args.target))
+    os.makedirs(os.path.dirname(os.path.abspath(output_file)), exist_ok=True)
+    try:
+        result = relayout_file(args.target, args.reference, mapping, output_file)
+    except ValueError as e:
+        print(e)
+        return 2
+    print(f"{result['slides']} slides relayouted -> {result['output']} ({result['seconds']:.2f}s)")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,316 @@
+import os
+import sys
+import time
+import hashlib
+import argparse
+import logging
+import zipfile
+import threading
+from io import BytesIO
+from functools import lru_cache
+from concurrent.futures import ThreadPoolExecutor
+from PIL import Image, ImageDraw, ImageFont
+from pptx import Presentation
+from pptx.dml.color import RGBColor
+from pptx.enum.dml import MSO_COLOR_TYPE, MSO_FILL
+from pptx.enum.shapes import MSO_SHAPE_TYPE
+from pptx.oxml.ns import qn
+from pptx.util import Pt, Inches, Centipoints
+from pptMetadata import rels_partname, read_rels, slide_partnames
+
+# 不经过 PowerPoint 的幻灯片缩略图: 用 Pillow 绘制背景、形状与占位符的位置、文字和图片,
+# 只用于预览, 不追求与 PowerPoint 完全一致
+
+logger = logging.getLogger(__name__)
+
+LOG_FORMAT = '%(asctime)s - %(levelname)s - %(message)s'
+# 绘制方式变化时修改版本号, 使磁盘缓存中的旧缩略图失效
+RENDER_VERSION = 1
+DEFAULT_SIZE = (300, 200)
+DEFAULT_FONT_SIZE = Pt(18)
+TEXT_INSET_X = Inches(0.1)
+TEXT_INSET_Y = Inches(0.05)
+PLACEHOLDER_OUTLINE = (200, 200, 200)
+FRAME_FILL = (235, 235, 235)
+# 依次尝试的字体(需支持中文), 都不存在时使用 Pillow 自带字体
+FONT_CANDIDATES = ('msyh.ttc', 'msyh.ttf', 'simhei.ttf', 'NotoSansCJK-Regular.ttc', 'NotoSansSC-Regular.otf',
+                   'wqy-microhei.ttc', 'PingFang.ttc', 'Arial Unicode.ttf', 'DejaVuSans.ttf')
+
+@lru_cache(maxsize=64)
+def load_font(size):
+    for name in FONT_CANDIDATES:
+        try:
+            return ImageFont.truetype(name, size)
+        except OSError:
+            continue
+    return ImageFont.load_default(size)
+
+def part_digest(zf, partname, memo):
+    # 部件本身及其关系文件的哈希
+    if partname not in memo:
+        digest = hashlib.sha256()
+        for name in (partname, rels_partname(partname)):
+            try:
+                digest.update(zf.read(name))
+            except KeyError:
+                pass
+            digest.update(b'\0')
+        memo[partname] = digest.hexdigest()
+    return memo[partname]
+
+def graph_digest(zf, partname, memo, rels_memo):
+    # 从 partname 出发能到达的全部部件(布局、母版、主题、图片等, 关系中的环只计算一次)的哈希
+    reachable = {partname}
+    pending = [partname]
+    while pending:
+        source = pending.pop()
+        if source not in rels_memo:
+            rels_memo[source] = [target for _, target in read_rels(zf, source).values() if target in zf.NameToInfo]
+        for target in rels_memo[source]:
+            if target not in reachable:
+                reachable.add(target)
+                pending.append(target)
+    digest = hashlib.sha256()
+    for name in sorted(reachable):
+        digest.update(f"{name}:{part_digest(zf, name, memo)}\n".encode('utf-8'))
+    return digest.hexdigest()
+
+def slide_keys(pptx_file, size=DEFAULT_SIZE):
+    # 每页幻灯片的缓存键: 幻灯片及其能到达的全部部件(图片、布局、母版与母版引用的图片、主题)的哈希, 加上缩略图尺寸
+    memo = {}
+    rels_memo = {}
+    with zipfile.ZipFile(pptx_file) as zf:
+        return [hashlib.sha256(f"{RENDER_VERSION}:{size[0]}x{size[1]}:{graph_digest(zf, partname, memo, rels_memo)}".encode('ascii')).hexdigest()
+                for partname in slide_partnames(zf)]
+
+def solid_color(fill):
+    # 纯色填充返回 (r, g, b), 主题色等无法直接解析的颜色返回 None
+    try:
+        if fill.type == MSO_FILL.SOLID and fill.fore_color.type == MSO_COLOR_TYPE.RGB:
+            return tuple(fill.fore_color.rgb)
+    except (AttributeError, TypeError, NotImplementedError):
+        pass
+    return None
+
+def background_color(slide):
+    # 依次查找幻灯片、布局、母版的纯色背景
+    for source in (slide, slide.slide_layout, slide.slide_layout.slide_master):
+        bg_pr = source._element.find(f"{qn('p:cSld')}/{qn('p:bg')}/{qn('p:bgPr')}")
+        if bg_pr is None:
+            continue
+        srgb = bg_pr.find(f"{qn('a:solidFill')}/{qn('a:srgbClr')}")
+        if srgb is not None:
+            return tuple(RGBColor.from_string(srgb.get('val')))
+    return (255, 255, 255)
+
+def paragraph_format(paragraph):
+    # 段落第一个文字块的字号与颜色以及段落对齐方式, 返回 (字号或None, (r, g, b), algn属性或None);
+    # 只读取 XML: paragraph.font、paragraph.alignment 与 run.font 会调用 get_or_add_pPr / get_or_add_rPr
+    # 修改XML, 而母版与布局的形状在多个渲染线程之间共享
+    p = paragraph._p
+    p_pr = p.find(qn('a:pPr'))
+    run = p.find(qn('a:r'))
+    r_pr = run.find(qn('a:rPr')) if run is not None else None
+    def_r_pr = p_pr.find(qn('a:defRPr')) if p_pr is not None else None
+    size = None
+    for properties in (r_pr, def_r_pr):
+        if properties is not None and properties.get('sz') is not None:
+            size = Centipoints(int(properties.get('sz')))
+            break
+    color = (0, 0, 0)
+    srgb = r_pr.find(f"{qn('a:solidFill')}/{qn('a:srgbClr')}") if r_pr is not None else None
+    if srgb is not None:
+        color = tuple(RGBColor.from_string(srgb.get('val')))
+    return size, color, p_pr.get('algn') if p_pr is not None else None
+
+def wrap_text(draw, text, font, width):
+    # 按字符换行(中文没有空格), 保留原有的换行
+    lines = []
+    for paragraph in text.split('\n'):
+        line = ''
+        for char in paragraph:
+            if line and draw.textlength(line + char, font=font) > width:
+                lines.append(line)
+                line = char.lstrip()
+            else:
+                line += char
+        lines.append(line)
+    return lines
+
+class SlideRenderer:
+    def __init__(self, slide_width, slide_height, size=DEFAULT_SIZE):
+        self.scale = min(size[0] / slide_width, size[1] / slide_height)
+        self.size = (max(1, round(slide_width * self.scale)), max(1, round(slide_height * self.scale)))
+
+    def render(self, slide):
+        image = Image.new('RGB', self.size, background_color(slide))
+        draw = ImageDraw.Draw(image)
+        transform = (0.0, 0.0, self.scale, self.scale)
+        # 母版与布局中的装饰形状在下, 幻灯片形状在上; 母版与布局中的占位符只是位置模板, 不绘制
+        for source in (slide.slide_layout.slide_master, slide.slide_layout):
+            for shape in source.shapes:
+                if not shape.is_placeholder:
+                    self.draw_shape(image, draw, shape, transform)
+        for shape in slide.shapes:
+            self.draw_shape(image, draw, shape, transform)
+        return image
+
+    def box(self, shape, transform):
+        if None in (shape.left, shape.top, shape.width, shape.height):
+            return None
+        ox, oy, sx, sy = transform
+        left, top = ox + shape.left * sx, oy + shape.top * sy
+        return (round(left), round(top), round(left + shape.width * sx), round(top + shape.height * sy))
+
+    def draw_shape(self, image, draw, shape, transform):
+        try:
+            if shape.shape_type == MSO_SHAPE_TYPE.GROUP:
+                self.draw_group(image, draw, shape, transform)
+                return
+            box = self.box(shape, transform)
+            if box is None or box[2] <= box[0] or box[3] <= box[1]:
+                return
+            if hasattr(shape, 'image'):
+                self.draw_picture(image, shape, box)
+                return
+            if shape.has_chart or shape.has_table or shape.shape_type == MSO_SHAPE_TYPE.EMBEDDED_OLE_OBJECT:
+                draw.rectangle(box, fill=FRAME_FILL, outline=PLACEHOLDER_OUTLINE)
+                return
+            fill = solid_color(shape.fill) if hasattr(shape, 'fill') else None
+            if fill is not None:
+                draw.rectangle(box, fill=fill)
+            text = shape.text_frame.text if shape.has_text_frame else ''
+            if text.strip():
+                self.draw_text(draw, shape.text_frame, box)
+            elif shape.is_placeholder and fill is None:
+                draw.rectangle(box, outline=PLACEHOLDER_OUTLINE)
+        except Exception as e:
+            logger.debug(f"Skipping shape '{shape.name}' in thumbnail: {e}")
+
+    def draw_group(self, image, draw, group, transform):
+        # 组合内形状的坐标在 chOff/chExt 定义的子坐标系中
+        xfrm = group._element.find(f"{qn('p:grpSpPr')}/{qn('a:xfrm')}")
+        ch_off = xfrm.find(qn('a:chOff')) if xfrm is not None else None
+        ch_ext = xfrm.find(qn('a:chExt')) if xfrm is not None else None
+        ox, oy, sx, sy = transform
+        if ch_off is not None and ch_ext is not None and int(ch_ext.get('cx')) and int(ch_ext.get('cy')):
+            gx = group.width / int(ch_ext.get('cx'))
+            gy = group.height / int(ch_ext.get('cy'))
+            transform = (ox + (group.left - int(ch_off.get('x')) * gx) * sx,
+                         oy + (group.top - int(ch_off.get('y')) * gy) * sy,
+                         sx * gx, sy * gy)
+        for shape in group.shapes:
+            self.draw_shape(image, draw, shape, transform)
+
+    def draw_picture(self, image, shape, box):
+        with Image.open(BytesIO(shape.image.blob)) as picture:
+            picture = picture.convert('RGBA').resize((box[2] - box[0], box[3] - box[1]), Image.BILINEAR)
+        image.paste(picture, box[:2], picture)
+
+    def draw_text(self, draw, text_frame, box):
+        inset_x = TEXT_INSET_X * self.scale
+        inset_y = TEXT_INSET_Y * self.scale
+        left, right = box[0] + inset_x, box[2] - inset_x
+        y = box[1] + inset_y
+        for paragraph in text_frame.paragraphs:
+            font_size, color, alignment = paragraph_format(paragraph)
+            font = load_font(max(6, round((font_size or DEFAULT_FONT_SIZE) * self.scale)))
+            line_height = font.size * 1.2
+            for line in wrap_text(draw, paragraph.text.replace('\v', '\n'), font, right - left):
+                if y + line_height > box[3] + line_height:
+                    return
+                x = left
+                if alignment in ('ctr', 'r'):
+                    slack = right - left - draw.textlength(line, font=font)
+                    x += slack / 2 if alignment == 'ctr' else slack
+                draw.text((x, y), line, fill=color, font=font)
+                y += line_height
+
+def render_slide(slide, slide_width, slide_height, size=DEFAULT_SIZE):
+    return SlideRenderer(slide_width, slide_height, size).render(slide)
+
+class SlideThumbnails:
+    # 一个文件的全部缩略图: prerender() 在后台线程池中按顺序渲染整个文件, get() 优先返回已渲染的结果,
+    # 尚未渲染时在调用线程中直接渲染, 不必排在后台任务之后; 结果按缓存键保存在内存中,
+    # cache 为 GimageCache.ImageCache 时同时保存到磁盘, 再次打开同一文件时无需重新渲染
+    def __init__(self, pptx_file, size=DEFAULT_SIZE, cache=None, max_workers=2):
+        self.pptx_file = pptx_file
+        self.size = size
+        self.cache = cache
+        self.keys = slide_keys(pptx_file, size)
+        prs = Presentation(pptx_file)
+        self.slides = list(prs.slides)
+        self.renderer = SlideRenderer(prs.slide_width, prs.slide_height, size)
+        self.rendered = 0
+        self._memory = {}  # 缓存键 -> PNG 数据
+        self._futures = {}
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='thumbnail')
+
+    def __len__(self):
+        return len(self.slides)
+
+    def _png(self, index):
+        key = self.keys[index]
+        with self._lock:
+            data = self._memory.get(key)
+        if data is None and self.cache is not None:
+            data = self.cache.get(key)
+        if data is None:
+            buffer = BytesIO()
+            self.renderer.render(self.slides[index]).save(buffer, 'PNG')
+            data = buffer.getvalue()
+            if self.cache is not None:
+                self.cache.put(key, data)
+            with self._lock:
+                self.rendered += 1
+        with self._lock:
+            self._memory[key] = data
+        return data
+
+    def get(self, index):
+        # 返回第 index 页(从0开始)的缩略图(PIL Image)
+        with self._lock:
+            future = self._futures.get(index)
+        if future is not None and future.done() and future.exception() is None:
+            data = future.result()
+        else:
+            data = self._png(index)
+        return Image.open(BytesIO(data))
+
+    def prerender(self):
+        with self._lock:
+            for index in range(len(self.slides)):
+                if index not in self._futures:
+                    self._futures[index] = self._executor.submit(self._png, index)
+            return [self._futures[index] for index in range(len(self.slides))]
+
+    def close(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="生成PPTX每页幻灯片的缩略图 (无需PowerPoint)")
+    parser.add_argument('pptx', help="PPTX文件")
+    parser.add_argument('-o', '--output-dir', default=os.path.join('Outfile', 'thumbnails'), help="缩略图保存路径")
+    parser.add_argument('-s', '--size', default='300x200', help="缩略图最大尺寸, 例如 300x200")
+    parser.add_argument('-w', '--workers', type=int, default=4, help="渲染线程数")
+    parser.add_argument('--log-level', choices=['DEBUG', 'INFO', 'WARNING', 'ERROR'], default='WARNING', help="日志级别")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=args.log_level, format=LOG_FORMAT)
+    if not os.path.exists(args.pptx):
+        print(f"File not found: {args.pptx}")
+        return 2
+    width, _, height = args.size.partition('x')
+    start = time.perf_counter()
+    thumbnails = SlideThumbnails(args.pptx, (int(width), int(height)), max_workers=args.workers)
+    os.makedirs(args.output_dir, exist_ok=True)
+    for number, future in enumerate(thumbnails.prerender(), 1):
+        with open(os.path.join(args.output_dir, f"slide_{number:03d}.png"), 'wb') as f:
+            f.write(future.result())
+    thumbnails.close()
+    print(f"{len(thumbnails)} thumbnails -> {args.output_dir} ({time.perf_counter() - start:.2f}s)")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,32 @@
+import os
+import sys
+from io import BytesIO
+import pytest
+from PIL import Image
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+def png(color, size=(16, 12)):
+    # 测试用的单色 PNG 图片, 返回可直接传给 add_picture 的 BytesIO
+    buffer = BytesIO()
+    Image.new('RGB', size, color).save(buffer, format='PNG')
+    buffer.seek(0)
+    return buffer
+
+@pytest.fixture
+def template_file():
+    return os.path.join(ROOT, 'Model_PPT', 'Model.pptx')
+
+@pytest.fixture
+def write_markdown(tmp_path):
+    # 按页写入Markdown: 每页为 (标题, [内容行]), 生成 "### 标题" 内容页
+    def write(slides, name='deck.md'):
+        path = tmp_path / name
+        lines = []
+        for title, contents in slides:
+            lines.append(f"### {title}")
+            lines.extend(contents)
+        path.write_text('\n'.join(lines) + '\n', encoding='utf-8')
+        return str(path)
+    return write
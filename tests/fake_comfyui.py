@@ -0,0 +1,197 @@
+import json
+import time
+import uuid
+import base64
+import socket
+import struct
+import hashlib
+import threading
+from io import BytesIO
+from urllib.parse import urlsplit, parse_qs
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from PIL import Image
+
+# 本地的假 ComfyUI 服务: POST /prompt、GET /history/<id>、GET /view 与 /ws (websocket 只推送文本消息)
+# 提交的任务按顺序在后台线程中"执行", 每个任务耗时 delay 秒, 完成后推送 executing(node=None) 与 execution_success
+
+WEBSOCKET_GUID = '258EAFA5-E914-47DA-95CA-C5AB0DC85B11'
+
+def png_bytes(size=(64, 48), color='blue'):
+    buffer = BytesIO()
+    Image.new('RGB', size, color).save(buffer, format='PNG')
+    return buffer.getvalue()
+
+def websocket_frame(text):
+    # 服务端发送的帧不需要掩码
+    payload = text.encode('utf-8')
+    if len(payload) < 126:
+        header = struct.pack('!BB', 0x81, len(payload))
+    elif len(payload) < 65536:
+        header = struct.pack('!BBH', 0x81, 126, len(payload))
+    else:
+        header = struct.pack('!BBQ', 0x81, 127, len(payload))
+    return header + payload
+
+class FakeComfyui:
+    def __init__(self, delay=0.05, websocket=True, fail_prompts=(), hold=False, hold_prompts=(), image=None):
+        self.delay = delay
+        self.websocket = websocket
+        self.fail_prompts = set(fail_prompts)  # 第几个提交的任务(从1开始)以错误结束
+        self.hold = hold  # 为 True 时任务永远不会完成
+        self.hold_prompts = set(hold_prompts)  # 第几个提交的任务暂不执行(其后的任务照常执行), 直到 release()
+        self._held = []
+        self.image = image or png_bytes()
+        self.history = {}
+        self.workflows = {}
+        self.requests = {'prompt': 0, 'history': 0, 'view': 0, 'ws': 0}
+        self._queue = []
+        self._sockets = {}  # clientId -> (连接, 写入锁)
+        self._lock = threading.Condition()
+        self._stopped = False
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), self._handler())
+        self.server.daemon_threads = True
+        self.base_url = f"http://127.0.0.1:{self.server.server_address[1]}"
+        self._threads = [threading.Thread(target=self.server.serve_forever, daemon=True),
+                         threading.Thread(target=self._execute, daemon=True)]
+
+    def __enter__(self):
+        for thread in self._threads:
+            thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        with self._lock:
+            self._stopped = True
+            self._lock.notify_all()
+        self.drop_websockets()
+        self.server.shutdown()
+        self.server.server_close()
+
+    def drop_websockets(self):
+        # 断开所有 websocket 连接(模拟服务重启或网络中断), HTTP 接口继续可用
+        with self._lock:
+            sockets = [connection for connection, _ in self._sockets.values()]
+            self._sockets.clear()
+        for connection in sockets:
+            try:
+                connection.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+
+    def _execute(self):
+        while True:
+            with self._lock:
+                self._lock.wait_for(lambda: self._stopped or (self._queue and not self.hold))
+                if self._stopped:
+                    return
+                prompt_id, client_id, number = self._queue.pop(0)
+                if number in self.hold_prompts:
+                    self._held.append((prompt_id, client_id, number))
+                    continue
+            time.sleep(self.delay)
+            if number in self.fail_prompts:
+                entry = {'outputs': {}, 'status': {'status_str': 'error', 'messages': ['node failed']}}
+                message_type = 'execution_error'
+            else:
+                entry = {'outputs': {'9': {'images': [{'filename': f"{prompt_id}.png", 'subfolder': '', 'type': 'output'}]}},
+                         'status': {'status_str': 'success'}}
+                message_type = 'execution_success'
+            with self._lock:
+                self.history[prompt_id] = entry
+            self._push(client_id, {'type': 'executing', 'data': {'node': None, 'prompt_id': prompt_id}})
+            self._push(client_id, {'type': message_type, 'data': {'prompt_id': prompt_id}})
+
+    def release(self):
+        # 执行所有被 hold_prompts 暂停的任务
+        with self._lock:
+            self.hold_prompts.clear()
+            self._queue.extend(self._held)
+            self._held = []
+            self._lock.notify_all()
+
+    def _push(self, client_id, message):
+        with self._lock:
+            target = self._sockets.get(client_id)
+        if target is None:
+            return
+        connection, write_lock = target
+        try:
+            with write_lock:
+                connection.sendall(websocket_frame(json.dumps(message)))
+        except OSError:
+            pass
+
+    def _handler(self):
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def log_message(self, *args):
+                pass
+
+            def send_json(self, data, status=200):
+                body = json.dumps(data).encode('utf-8')
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def do_POST(self):
+                if self.path != '/prompt':
+                    return self.send_json({'error': 'not found'}, 404)
+                payload = json.loads(self.rfile.read(int(self.headers['Content-Length'])))
+                prompt_id = uuid.uuid4().hex
+                with fake._lock:
+                    fake.requests['prompt'] += 1
+                    fake.workflows[prompt_id] = payload['prompt']
+                    fake._queue.append((prompt_id, payload.get('client_id'), fake.requests['prompt']))
+                    fake._lock.notify_all()
+                self.send_json({'prompt_id': prompt_id, 'number': fake.requests['prompt']})
+
+            def do_GET(self):
+                url = urlsplit(self.path)
+                if url.path.startswith('/history/'):
+                    prompt_id = url.path[len('/history/'):]
+                    with fake._lock:
+                        fake.requests['history'] += 1
+                        entry = fake.history.get(prompt_id)
+                    return self.send_json({prompt_id: entry} if entry is not None else {})
+                if url.path == '/view':
+                    with fake._lock:
+                        fake.requests['view'] += 1
+                    self.send_response(200)
+                    self.send_header('Content-Type', 'image/png')
+                    self.send_header('Content-Length', str(len(fake.image)))
+                    self.end_headers()
+                    self.wfile.write(fake.image)
+                    return
+                if url.path == '/ws' and fake.websocket:
+                    return self.websocket(parse_qs(url.query).get('clientId', [''])[0])
+                self.send_json({'error': 'not found'}, 404)
+
+            def websocket(self, client_id):
+                accept = base64.b64encode(hashlib.sha1(
+                    (self.headers['Sec-WebSocket-Key'] + WEBSOCKET_GUID).encode('ascii')).digest()).decode('ascii')
+                self.send_response(101)
+                self.send_header('Upgrade', 'websocket')
+                self.send_header('Connection', 'Upgrade')
+                self.send_header('Sec-WebSocket-Accept', accept)
+                self.end_headers()
+                self.wfile.flush()
+                with fake._lock:
+                    fake.requests['ws'] += 1
+                    fake._sockets[client_id] = (self.connection, threading.Lock())
+                # 客户端发送的帧(关闭帧等)不需要处理, 读到连接关闭为止
+                try:
+                    while self.rfile.read1(4096):
+                        pass
+                except OSError:
+                    pass
+                with fake._lock:
+                    if fake._sockets.get(client_id, (None,))[0] is self.connection:
+                        del fake._sockets[client_id]
+                self.close_connection = True
+
+        return Handler
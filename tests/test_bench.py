@@ -0,0 +1,22 @@
+import GpptBench
+from GpptBench import generate_markdown, measure, run_benchmarks
+
+def test_failing_case_is_reported_instead_of_hanging(tmp_path, template_file, capsys):
+    broken = tmp_path / 'broken.pptx'
+    broken.write_bytes(b'not a pptx file')
+    markdown = tmp_path / 'bench.md'
+    markdown.write_text(generate_markdown(3), encoding='utf-8')
+    result = measure(str(markdown), str(broken), str(tmp_path / 'out.pptx'))
+    assert 'error' in result
+
+    # 失败的用例之后继续运行其余用例
+    results = run_benchmarks([3], {'broken': str(broken), 'model': template_file}, work_dir=str(tmp_path))
+    assert 'error' in results['broken-3']
+    assert results['model-3']['slides'] == 3
+    assert 'FAILED' in capsys.readouterr().out
+
+def test_main_fails_when_a_case_fails(tmp_path):
+    broken = tmp_path / 'broken.pptx'
+    broken.write_bytes(b'not a pptx file')
+    assert GpptBench.main(['--sizes', '2', '--template', str(broken), '--layouts-per-count', '0',
+                           '--work-dir', str(tmp_path)]) == 1
@@ -0,0 +1,129 @@
+import os
+from types import SimpleNamespace
+import GimageCache
+from GimageCache import KeywordCache, ImageCache
+
+class Clock:
+    def __init__(self, now=1000.0):
+        self.now = now
+
+    def time(self):
+        return self.now
+
+def fake_clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(GimageCache, 'time', SimpleNamespace(time=clock.time))
+    return clock
+
+def test_keyword_cache_hits_and_persists(tmp_path):
+    path = str(tmp_path / 'keywords.sqlite')
+    cache = KeywordCache(path)
+    assert cache.get('a red apple', 'ollama', 'llama3') is None
+    cache.put('a red apple', 'ollama', 'llama3', 'red apple')
+    assert cache.get('a red apple', 'ollama', 'llama3') == 'red apple'
+    # 后端与模型是键的一部分
+    assert cache.get('a red apple', 'chatgpt', 'llama3') is None
+    assert cache.get('a red apple', 'ollama', 'mistral') is None
+    assert (cache.hits, cache.misses) == (1, 3)
+    cache.close()
+
+    cache = KeywordCache(path)
+    assert cache.get('a red apple', 'ollama', 'llama3') == 'red apple'
+    cache.close()
+
+def test_keyword_cache_expires_entries(tmp_path, monkeypatch):
+    clock = fake_clock(monkeypatch)
+    cache = KeywordCache(str(tmp_path / 'keywords.sqlite'), ttl=60)
+    cache.put('prompt', 'ollama', 'llama3', 'keywords')
+    clock.now += 59
+    assert cache.get('prompt', 'ollama', 'llama3') == 'keywords'
+    # 过期以写入时间计算, 命中不会延长有效期
+    clock.now += 2
+    assert cache.get('prompt', 'ollama', 'llama3') is None
+    assert len(cache) == 0
+    cache.close()
+
+def test_keyword_cache_evicts_least_recently_used(tmp_path, monkeypatch):
+    clock = fake_clock(monkeypatch)
+    cache = KeywordCache(str(tmp_path / 'keywords.sqlite'), max_entries=2)
+    for prompt in ('first', 'second'):
+        clock.now += 1
+        cache.put(prompt, 'ollama', 'llama3', prompt.upper())
+    clock.now += 1
+    assert cache.get('first', 'ollama', 'llama3') == 'FIRST'
+    clock.now += 1
+    cache.put('third', 'ollama', 'llama3', 'THIRD')
+    assert len(cache) == 2
+    assert cache.get('second', 'ollama', 'llama3') is None
+    assert cache.get('first', 'ollama', 'llama3') == 'FIRST'
+    assert cache.get('third', 'ollama', 'llama3') == 'THIRD'
+    cache.close()
+
+def test_keyword_cache_from_config(tmp_path):
+    assert KeywordCache.from_config({'keyword_cache': {'enabled': False}}) is None
+    cache = KeywordCache.from_config({'keyword_cache': {'path': str(tmp_path / 'k.sqlite'), 'max_entries': 5,
+                                                        'ttl_days': 2}})
+    assert (cache.max_entries, cache.ttl) == (5, 2 * 86400)
+    cache.close()
+
+def blob_files(directory):
+    return sorted(os.listdir(os.path.join(directory, 'blobs')))
+
+def test_image_cache_stores_identical_images_once(tmp_path):
+    directory = str(tmp_path / 'images')
+    cache = ImageCache(directory)
+    first = cache.put('comfyui|apple|512x512', b'image-a')
+    second = cache.put('pixabay|apple|512x512', b'image-a')
+    assert first == second
+    assert blob_files(directory) == [first]
+    assert cache.total_bytes() == len(b'image-a')
+    assert cache.get('comfyui|apple|512x512') == b'image-a'
+    assert cache.get('pixabay|apple|512x512') == b'image-a'
+    assert cache.get('unsplash|apple|512x512') is None
+    assert (cache.hits, cache.misses) == (2, 1)
+    cache.close()
+
+def test_image_cache_evicts_least_recently_used(tmp_path, monkeypatch):
+    clock = fake_clock(monkeypatch)
+    directory = str(tmp_path / 'images')
+    cache = ImageCache(directory, max_bytes=25)
+    for key in ('a', 'b'):
+        clock.now += 1
+        cache.put(key, key.encode() * 10)
+    clock.now += 1
+    assert cache.get('a') == b'a' * 10
+    clock.now += 1
+    cache.put('c', b'c' * 10)
+    assert cache.total_bytes() == 20
+    assert cache.get('b') is None
+    assert cache.get('a') == b'a' * 10
+    assert cache.get('c') == b'c' * 10
+    assert len(blob_files(directory)) == 2
+    # 超过上限的单张图片仍然保留
+    clock.now += 1
+    cache.put('d', b'd' * 30)
+    assert cache.get('d') == b'd' * 30
+    assert blob_files(directory) == [cache.put('d', b'd' * 30)]
+    cache.close()
+
+def test_image_cache_missing_blob_is_a_miss(tmp_path):
+    directory = str(tmp_path / 'images')
+    cache = ImageCache(directory)
+    blob_hash = cache.put('key', b'image')
+    os.remove(os.path.join(directory, 'blobs', blob_hash))
+    assert cache.get('key') is None
+    assert cache.total_bytes() == 0
+    cache.put('key', b'image')
+    assert cache.get('key') == b'image'
+    cache.close()
+
+def test_image_cache_persists_and_reads_config(tmp_path):
+    directory = str(tmp_path / 'images')
+    cache = ImageCache.from_config({'image_cache': {'path': directory, 'max_mb': 0.5}})
+    assert cache.max_bytes == 512 * 1024
+    cache.put('key', b'image')
+    cache.close()
+    cache = ImageCache(directory)
+    assert cache.get('key') == b'image'
+    cache.close()
+    assert ImageCache.from_config({'image_cache': {'enabled': False}}) is None
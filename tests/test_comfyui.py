@@ -0,0 +1,138 @@
+import json
+import time
+import threading
+from concurrent.futures import ThreadPoolExecutor
+import pytest
+from GimageComfyui import ComfyuiClient, ComfyuiError
+from GimagePipeline import ImagePipeline, ImageJob
+from fake_comfyui import FakeComfyui
+
+WORKFLOW = {'6': {'class_type': 'CLIPTextEncode', 'inputs': {'text': 'a photo of [KEYWORDS]'}}}
+
+def workflow():
+    return json.loads(json.dumps(WORKFLOW))
+
+def test_websocket_notification_wakes_waiter():
+    # 轮询间隔远大于任务耗时: 只有 websocket 通知才能让结果在间隔之前返回
+    with FakeComfyui(delay=0.2) as server:
+        client = ComfyuiClient(server.base_url, min_poll_interval=3.0, max_poll_interval=5.0)
+        start = time.monotonic()
+        data = client.generate(workflow(), timeout=10)
+        elapsed = time.monotonic() - start
+        client.close()
+    assert data == server.image
+    assert elapsed < 2.0
+    assert server.requests['ws'] == 1
+    assert server.requests['history'] <= 3
+
+def test_polling_fallback_without_websocket():
+    with FakeComfyui(delay=0.2, websocket=False) as server:
+        client = ComfyuiClient(server.base_url, min_poll_interval=0.05, max_poll_interval=0.2)
+        data = client.generate(workflow(), timeout=10)
+    assert data == server.image
+    assert not client.use_websocket
+    assert server.requests['ws'] == 0
+    assert server.requests['history'] >= 2
+
+def test_polling_takes_over_when_websocket_drops():
+    with FakeComfyui(delay=0.5) as server:
+        client = ComfyuiClient(server.base_url, min_poll_interval=0.05, max_poll_interval=0.2)
+        prompt_id = client.submit(workflow())
+        time.sleep(0.1)
+        server.drop_websockets()
+        entry = client.wait(prompt_id, timeout=10)
+    assert entry['status']['status_str'] == 'success'
+    assert server.requests['ws'] == 1
+
+def test_iter_completed_reports_errors_per_prompt():
+    with FakeComfyui(delay=0.05, fail_prompts={2}) as server:
+        client = ComfyuiClient(server.base_url, min_poll_interval=0.05, max_poll_interval=0.2)
+        prompt_ids = [client.submit(workflow()) for _ in range(3)]
+        results = dict(client.iter_completed(prompt_ids, timeout=10))
+        client.close()
+    assert list(results) == prompt_ids
+    assert isinstance(results[prompt_ids[1]], ComfyuiError)
+    assert all(isinstance(results[prompt_id], dict) for prompt_id in (prompt_ids[0], prompt_ids[2]))
+
+def test_wait_times_out():
+    with FakeComfyui(hold=True) as server:
+        client = ComfyuiClient(server.base_url, min_poll_interval=0.05, max_poll_interval=0.1)
+        prompt_id = client.submit(workflow())
+        with pytest.raises(TimeoutError):
+            client.wait(prompt_id, timeout=0.3)
+        client.close()
+
+def test_pipeline_queue_mode(tmp_path, monkeypatch):
+    # Comfyui 批量模式: 所有任务先提交到队列, 按占位符顺序得到各自的图片
+    workflow_path = tmp_path / 'workflow.json'
+    workflow_path.write_text(json.dumps(WORKFLOW), encoding='utf-8')
+    with FakeComfyui(delay=0.05) as server:
+        config = {'keyword_cache': {'enabled': False}, 'image_cache': {'enabled': False},
+                  'image_generation': {'comfyui': {'base_url': server.base_url, 'workflow_path': str(workflow_path),
+                                                   'min_poll_interval': 0.05, 'timeout': 10}}}
+        pipeline = ImagePipeline(config, generation_method='Comfyui生成', max_workers=2)
+        monkeypatch.setattr(pipeline, 'extractKeywords', lambda text, nlp_method=None: f"keywords for {text}")
+        jobs = [ImageJob(number, None, type('Shape', (), {'name': 'image01'})(), f"slide {number}") for number in (1, 2, 3)]
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            futures = pipeline.enqueueComfyui(jobs, 'Ollama', executor)
+            images = [future.result(timeout=10) for future in futures]
+        pipeline.comfyuiClient().close()
+    assert [image.size for image in images] == [(64, 48)] * 3
+    assert sorted(prompt['6']['inputs']['text'] for prompt in server.workflows.values()) == \
+        [f"a photo of keywords for slide {number}" for number in (1, 2, 3)]
+
+def test_slow_keyword_extraction_does_not_block_later_prompts(tmp_path, monkeypatch):
+    # 第一个占位符的关键词提取很慢时, 其余已得到关键词的占位符应先提交到队列
+    workflow_path = tmp_path / 'workflow.json'
+    workflow_path.write_text(json.dumps(WORKFLOW), encoding='utf-8')
+    release = threading.Event()
+    with FakeComfyui(delay=0.05) as server:
+        config = {'keyword_cache': {'enabled': False}, 'image_cache': {'enabled': False},
+                  'image_generation': {'comfyui': {'base_url': server.base_url, 'workflow_path': str(workflow_path),
+                                                   'min_poll_interval': 0.05, 'timeout': 10}}}
+        pipeline = ImagePipeline(config, generation_method='Comfyui生成', max_workers=3)
+
+        def extract(text, nlp_method=None):
+            if text == 'slide 1':
+                release.wait(10)
+            return f"keywords for {text}"
+        monkeypatch.setattr(pipeline, 'extractKeywords', extract)
+        jobs = [ImageJob(number, None, type('Shape', (), {'name': 'image01'})(), f"slide {number}") for number in (1, 2, 3)]
+        with ThreadPoolExecutor(max_workers=3) as executor:
+            futures = pipeline.enqueueComfyui(jobs, 'Ollama', executor)
+            deadline = time.monotonic() + 5
+            while server.requests['prompt'] < 2 and time.monotonic() < deadline:
+                time.sleep(0.02)
+            submitted_before_release = server.requests['prompt']
+            release.set()
+            images = [future.result(timeout=10) for future in futures]
+        pipeline.comfyuiClient().close()
+    assert submitted_before_release == 2
+    assert len(images) == 3
+
+def test_polling_returns_later_prompts_before_a_stuck_one():
+    # 轮询模式: 最早提交的任务迟迟不完成时, 之后已完成的任务不应等它
+    with FakeComfyui(delay=0.05, websocket=False, hold_prompts={1}) as server:
+        client = ComfyuiClient(server.base_url, min_poll_interval=0.05, max_poll_interval=0.1)
+        prompt_ids = [client.submit(workflow()) for _ in range(3)]
+        results = list(client.iter_completed(prompt_ids, timeout=1))
+    assert {prompt_id for prompt_id, _ in results[:2]} == set(prompt_ids[1:])
+    assert results[2][0] == prompt_ids[0]
+    assert all(isinstance(entry, dict) for _, entry in results[:2])
+    assert isinstance(results[2][1], TimeoutError)
+
+def test_timed_out_prompts_are_forgotten():
+    with FakeComfyui(delay=0.05, hold_prompts={1}) as server:
+        client = ComfyuiClient(server.base_url, min_poll_interval=0.05, max_poll_interval=0.1)
+        prompt_id = client.submit(workflow())
+        with pytest.raises(TimeoutError):
+            client.wait(prompt_id, timeout=0.3)
+        # 超时之后才完成的任务的通知不再记录
+        server.release()
+        deadline = time.monotonic() + 5
+        while prompt_id not in server.history and time.monotonic() < deadline:
+            time.sleep(0.02)
+        time.sleep(0.1)
+        client.close()
+    assert prompt_id in server.history
+    assert not client._waiting and not client._finished
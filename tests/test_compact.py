@@ -0,0 +1,87 @@
+import os
+import zipfile
+from pptx import Presentation
+from pptx.util import Inches
+from conftest import png
+import pptCompact
+from pptCompact import compact_package
+from pptMetadata import read_rels, slide_partnames
+
+def deck_with_pictures(template_file, path, colors):
+    # 每页一张图片, colors 中的 None 表示与上一页使用同一图片
+    prs = Presentation(template_file)
+    layout = prs.slide_layouts[0]
+    for color in colors:
+        slide = prs.slides.add_slide(layout)
+        picture = slide.shapes.add_picture(png(color or previous), Inches(1), Inches(1))
+        picture.name = 'picture'
+        previous = color or previous
+    prs.save(path)
+    return path
+
+def rewrite(source, target, members):
+    # members 为 {成员名: 新内容}, 不在原文件中的成员追加到末尾
+    with zipfile.ZipFile(source) as zin, zipfile.ZipFile(target, 'w', zipfile.ZIP_DEFLATED) as zout:
+        for name in zin.namelist():
+            if name not in members:
+                zout.writestr(name, zin.read(name))
+        for name, data in members.items():
+            zout.writestr(name, data)
+    return target
+
+def picture_blobs(pptx_file):
+    prs = Presentation(pptx_file)
+    return [shape.image.blob for slide in prs.slides for shape in slide.shapes if shape.name == 'picture']
+
+def test_replaced_picture_is_dropped(tmp_path, template_file):
+    # 与 Gimage 替换图片相同: 新图片加入后删除旧图片的形状, 旧图片的关系与部件仍留在文件中
+    deck = str(tmp_path / 'deck.pptx')
+    prs = Presentation(template_file)
+    slide = prs.slides.add_slide(prs.slide_layouts[0])
+    old = slide.shapes.add_picture(png('red'), Inches(1), Inches(1))
+    old_partname = old.part.related_part(old._element.blipFill.blip.rEmbed).partname.lstrip('/')
+    new = slide.shapes.add_picture(png('blue'), Inches(1), Inches(1))
+    new.name = 'picture'
+    old._element.getparent().remove(old._element)
+    prs.save(deck)
+
+    output = str(tmp_path / 'compact.pptx')
+    result = compact_package(deck, output)
+    assert result['relationships_removed'] == 1
+    assert result['dropped'] == [old_partname]
+    with zipfile.ZipFile(output) as zf:
+        assert zf.testzip() is None
+        assert old_partname not in zf.namelist()
+    assert picture_blobs(output) == [png('blue').getvalue()]
+    # 再次瘦身时没有可删除的内容
+    assert compact_package(output, str(tmp_path / 'again.pptx'))['dropped'] == []
+
+def test_duplicate_media_is_merged(tmp_path, template_file):
+    deck = deck_with_pictures(template_file, str(tmp_path / 'deck.pptx'), ['red', None])
+    with zipfile.ZipFile(deck) as zf:
+        second = slide_partnames(zf)[1]
+        media = next(target for _, target in read_rels(zf, second).values() if target.startswith('ppt/media/'))
+        rels_name = f"ppt/slides/_rels/{os.path.basename(second)}.rels"
+        rels = zf.read(rels_name).replace(os.path.basename(media).encode(), b'copy.png')
+        duplicated = rewrite(deck, str(tmp_path / 'duplicated.pptx'),
+                             {rels_name: rels, 'ppt/media/copy.png': zf.read(media)})
+
+    output = str(tmp_path / 'compact.pptx')
+    result = compact_package(duplicated, output)
+    assert result['deduplicated'] == 1
+    assert len(result['dropped']) == 1 and result['dropped'][0] in (media, 'ppt/media/copy.png')
+    with zipfile.ZipFile(output) as zf:
+        assert zf.testzip() is None
+        targets = {target for slide in slide_partnames(zf) for _, target in read_rels(zf, slide).values()
+                   if target.startswith('ppt/media/')}
+        assert len(targets) == 1 and targets <= set(zf.namelist())
+    assert picture_blobs(output) == [png('red').getvalue()] * 2
+
+def test_batch_writes_compact_copies(tmp_path, template_file, capsys):
+    deck = deck_with_pictures(template_file, str(tmp_path / 'deck.pptx'), ['red'])
+    output_dir = str(tmp_path / 'out')
+    assert pptCompact.main([deck, '-o', output_dir, '-j', '1']) == 0
+    assert '[OK]' in capsys.readouterr().out
+    assert picture_blobs(os.path.join(output_dir, 'compact_deck.pptx')) == [png('red').getvalue()]
+    assert pptCompact.main([str(tmp_path / 'missing')]) == 1
+    assert pptCompact.main([str(tmp_path / 'none' / '*.pptx')]) == 2
@@ -0,0 +1,98 @@
+import os
+import json
+import time
+import threading
+from types import SimpleNamespace
+import pytest
+from pptx import Presentation
+import GimagePipeline
+from GimagePipeline import ImagePipeline, ImageJob, InvalidPageError
+
+NO_CACHE = {'keyword_cache': {'enabled': False}, 'image_cache': {'enabled': False}}
+
+def make_jobs(count):
+    return [ImageJob(number, None, SimpleNamespace(name='image01'), f"content {number}") for number in range(1, count + 1)]
+
+def run_with_timeout(target, timeout=10):
+    thread = threading.Thread(target=target, daemon=True)
+    thread.start()
+    thread.join(timeout)
+    return not thread.is_alive()
+
+def test_comfyui_client_failure_fails_jobs_instead_of_hanging(monkeypatch):
+    pipeline = ImagePipeline(NO_CACHE, generation_method='Comfyui生成', max_workers=2)
+    monkeypatch.setattr(pipeline, 'extractKeywords', lambda text, nlp_method=None: 'keywords')
+
+    def broken_client():
+        raise RuntimeError("cannot connect")
+    monkeypatch.setattr(pipeline, 'comfyuiClient', broken_client)
+    jobs = make_jobs(3)
+    assert run_with_timeout(lambda: pipeline.runImageJobs(jobs))
+    assert [job.state for job in jobs] == ['failed'] * 3
+    assert all('cannot connect' in job.error for job in jobs)
+
+def test_invalid_pages_raise_dedicated_error(tmp_path, template_file):
+    deck = str(tmp_path / 'deck.pptx')
+    prs = Presentation(template_file)
+    prs.slides.add_slide(prs.slide_layouts[0])
+    prs.save(deck)
+    pipeline = ImagePipeline(NO_CACHE)
+    with pytest.raises(InvalidPageError):
+        pipeline.process(deck, [2], str(tmp_path))
+
+def test_workflow_digest_is_computed_once_per_file_version(tmp_path, monkeypatch):
+    workflow_file = tmp_path / 'workflow.json'
+    workflow = {'1': {'class_type': 'CLIPTextEncode', 'inputs': {'text': '[KEYWORDS]'}}}
+    workflow_file.write_text(json.dumps(workflow), encoding='utf-8')
+    config = dict(NO_CACHE, image_generation={'comfyui': {'workflow_path': str(workflow_file)}})
+    pipeline = ImagePipeline(config)
+    # cache_key 也使用 sha256, 只记录对工作流内容的哈希
+    digests = []
+    sha256 = GimagePipeline.hashlib.sha256
+    def counting_sha256(data=b''):
+        if bytes(data).startswith(b'{'):
+            digests.append(data)
+        return sha256(data)
+    monkeypatch.setattr(GimagePipeline.hashlib, 'sha256', counting_sha256)
+
+    keys = {pipeline.imageCacheKey(f"keywords {number}", 'Comfyui生成') for number in range(5)}
+    assert len(keys) == 5 and len(digests) == 1
+    first = pipeline.loadComfyuiWorkflow('red apple')
+    assert pipeline.loadComfyuiWorkflow('green apple') != first
+
+    # 工作流文件修改后缓存键随之变化
+    key = pipeline.imageCacheKey('keywords 0', 'Comfyui生成')
+    workflow['2'] = {'class_type': 'EmptyLatentImage', 'inputs': {'width': 512}}
+    workflow_file.write_text(json.dumps(workflow), encoding='utf-8')
+    os.utime(workflow_file, ns=(0, 0))
+    assert pipeline.imageCacheKey('keywords 0', 'Comfyui生成') != key
+    assert len(digests) == 2
+
+def test_jobs_run_concurrently_within_the_limit_and_insert_in_order(monkeypatch):
+    pipeline = ImagePipeline(NO_CACHE, generation_method='Pixabay', max_workers=3)
+    lock = threading.Lock()
+    running = [0]
+    peak = [0]
+    def slow_generate(keywords, method=None):
+        with lock:
+            running[0] += 1
+            peak[0] = max(peak[0], running[0])
+        time.sleep(0.05)
+        with lock:
+            running[0] -= 1
+        return keywords
+    inserted = []
+    monkeypatch.setattr(pipeline, 'extractKeywords', lambda text, nlp_method=None: text)
+    monkeypatch.setattr(pipeline, 'generateImage', slow_generate)
+    monkeypatch.setattr(pipeline, 'insertImage',
+                        lambda slide, shape, image: inserted.append((image, threading.current_thread())))
+    jobs = make_jobs(9)
+    start = time.perf_counter()
+    pipeline.runImageJobs(jobs)
+    # 9 个任务每次最多同时运行 3 个, 约 3 轮
+    assert peak[0] == 3
+    assert time.perf_counter() - start < 9 * 0.05
+    # 插入图片只在调用线程中按占位符顺序进行
+    assert [image for image, _ in inserted] == [job.content for job in jobs]
+    assert {thread for _, thread in inserted} == {threading.current_thread()}
+    assert [job.state for job in jobs] == ['succeeded'] * 9
@@ -0,0 +1,107 @@
+import time
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import pytest
+import requests
+from GimageHttp import HttpClient
+
+class FlakyServer:
+    # 本地 HTTP 服务: 前 failures 个请求返回 503, 之后返回 200; 每个请求先等待 delay 秒
+    def __init__(self, failures=0, delay=0):
+        self.failures = failures
+        self.delay = delay
+        self.requests = 0
+        self._lock = threading.Lock()
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), self._handler())
+        self.server.daemon_threads = True
+        self.base_url = f"http://127.0.0.1:{self.server.server_address[1]}"
+        self.host = f"127.0.0.1:{self.server.server_address[1]}"
+
+    def __enter__(self):
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def _handler(self):
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def log_message(self, *args):
+                pass
+
+            def respond(self):
+                with fake._lock:
+                    fake.requests += 1
+                    status = 503 if fake.requests <= fake.failures else 200
+                time.sleep(fake.delay)
+                body = b'busy' if status == 503 else b'ok'
+                try:
+                    self.send_response(status)
+                    self.send_header('Content-Length', str(len(body)))
+                    self.end_headers()
+                    self.wfile.write(body)
+                except OSError:
+                    # 客户端已超时断开
+                    self.close_connection = True
+
+            def do_GET(self):
+                self.respond()
+
+            def do_POST(self):
+                self.rfile.read(int(self.headers.get('Content-Length', 0)))
+                self.respond()
+
+        return Handler
+
+def test_retries_transient_errors_with_backoff():
+    with FlakyServer(failures=3) as server:
+        http = HttpClient(retries=3, backoff_factor=0.05)
+        start = time.perf_counter()
+        response = http.get(f"{server.base_url}/image")
+        elapsed = time.perf_counter() - start
+        assert response.status_code == 200 and response.text == 'ok'
+        assert server.requests == 4
+        # 指数退避: 第一次重试立即进行, 之后等待 0.1 与 0.2 秒
+        assert elapsed >= 0.3
+        stats = http.stats()[server.host]
+        assert stats['requests'] == 1 and stats['failed'] == 0
+
+def test_gives_up_after_retries():
+    with FlakyServer(failures=10) as server:
+        http = HttpClient(retries=2, backoff_factor=0)
+        response = http.get(f"{server.base_url}/image")
+        # 重试用尽后返回最后一次的响应, 由调用方检查状态码
+        assert response.status_code == 503
+        assert server.requests == 3
+
+def test_read_timeout_is_retried_then_raised():
+    with FlakyServer(delay=0.5) as server:
+        http = HttpClient(read_timeout=0.1, retries=1, backoff_factor=0)
+        with pytest.raises(requests.exceptions.RequestException):
+            http.get(f"{server.base_url}/slow")
+        assert server.requests == 2
+        assert http.stats()[server.host]['failed'] == 1
+
+def test_post_is_not_retried_after_it_was_sent():
+    with FlakyServer(delay=0.5) as server:
+        http = HttpClient(read_timeout=0.1, retries=3, backoff_factor=0)
+        with pytest.raises(requests.exceptions.RequestException):
+            http.post(f"{server.base_url}/prompt", json={'prompt': {}})
+        time.sleep(0.2)
+        assert server.requests == 1
+
+def test_connections_are_reused():
+    with FlakyServer() as server:
+        http = HttpClient()
+        for _ in range(5):
+            assert http.get(f"{server.base_url}/image").status_code == 200
+        stats = http.stats()[server.host]
+        assert stats['requests'] == 5
+        assert stats['connections'] == 1
+        assert stats['reuse_ratio'] == pytest.approx(0.8)
+        assert stats['max_latency'] >= stats['mean_latency'] > 0
@@ -0,0 +1,88 @@
+import os
+from io import BytesIO
+from PIL import Image
+from pptx import Presentation
+from pptx.enum.shapes import MSO_SHAPE_TYPE
+import GpptBatch
+from GpptCore import iter_markdown, create_pptx
+from GpptIncremental import build_incremental, manifest_path_for
+
+def slide_titles(pptx_file):
+    prs = Presentation(pptx_file)
+    return [next(shape.text_frame.text for shape in slide.shapes if shape.name.lower() == 'title')
+            for slide in prs.slides]
+
+def fill_image(pptx_file, output_file, slide_number):
+    # 与 Gimage 相同: 在第 slide_number 页插入同名图片并删除原有的 image01 占位符
+    prs = Presentation(pptx_file)
+    slide = prs.slides[slide_number - 1]
+    buffer = BytesIO()
+    Image.new('RGB', (32, 24), 'red').save(buffer, format='PNG')
+    buffer.seek(0)
+    placeholder = next((shape for shape in slide.shapes if shape.name == 'image01'), None)
+    picture = slide.shapes.add_picture(buffer, 0, 0, 914400, 685800)
+    picture.name = 'image01'
+    if placeholder is not None:
+        placeholder._element.getparent().remove(placeholder._element)
+    prs.save(output_file)
+
+def has_filled_image(slide):
+    return any(shape.shape_type == MSO_SHAPE_TYPE.PICTURE and shape.name == 'image01' for shape in slide.shapes)
+
+def test_reuses_unchanged_slides(tmp_path, template_file, write_markdown):
+    output_file = str(tmp_path / 'deck.pptx')
+    markdown = write_markdown([('A', ['a']), ('B', ['b'])])
+    assert build_incremental(iter_markdown(markdown), template_file, output_file) == (2, 2)
+    markdown = write_markdown([('A', ['a']), ('B', ['b changed']), ('C', ['c'])])
+    assert build_incremental(iter_markdown(markdown), template_file, output_file) == (3, 2)
+    assert slide_titles(output_file) == ['A', 'B', 'C']
+
+def test_reordered_slides_survive_next_build(tmp_path, template_file, write_markdown):
+    # 调整顺序后幻灯片部件名与顺序不一致, 下一次打开时会被重命名, 复用的幻灯片不能按旧成员名复制
+    output_file = str(tmp_path / 'deck.pptx')
+    build_incremental(iter_markdown(write_markdown([('A', ['a']), ('B', ['b'])])), template_file, output_file)
+    build_incremental(iter_markdown(write_markdown([('B', ['b']), ('A', ['a'])])), template_file, output_file)
+    markdown = write_markdown([('B', ['b']), ('A', ['a']), ('C', ['c'])])
+    assert build_incremental(iter_markdown(markdown), template_file, output_file) == (3, 1)
+    assert slide_titles(output_file) == ['B', 'A', 'C']
+
+def test_overwritten_output_is_rebuilt(tmp_path, template_file, write_markdown):
+    # 输出文件被非增量生成覆盖(清单仍在)后, 不能按旧清单复用同一 slide_id 的幻灯片
+    output_file = str(tmp_path / 'deck.pptx')
+    build_incremental(iter_markdown(write_markdown([('A', ['a']), ('B', ['b'])])), template_file, output_file)
+    create_pptx(iter_markdown(write_markdown([('B', ['b']), ('A', ['a'])])), template_file, output_file)
+    markdown = write_markdown([('B', ['b']), ('A', ['a']), ('C', ['c'])])
+    assert build_incremental(iter_markdown(markdown), template_file, output_file) == (3, 3)
+    assert slide_titles(output_file) == ['B', 'A', 'C']
+
+def test_batch_without_incremental_discards_manifest(tmp_path, template_file, write_markdown):
+    output_dir = str(tmp_path / 'out')
+    output_file = os.path.join(output_dir, 'deck.pptx')
+    markdown = write_markdown([('A', ['a']), ('B', ['b'])])
+    assert GpptBatch.main([markdown, '-t', template_file, '-o', output_dir, '-j', '1', '-i']) == 0
+    assert os.path.exists(manifest_path_for(output_file))
+    write_markdown([('B', ['b']), ('A', ['a'])])
+    assert GpptBatch.main([markdown, '-t', template_file, '-o', output_dir, '-j', '1']) == 0
+    assert not os.path.exists(manifest_path_for(output_file))
+    write_markdown([('B', ['b']), ('A', ['a']), ('C', ['c'])])
+    assert GpptBatch.main([markdown, '-t', template_file, '-o', output_dir, '-j', '1', '-i']) == 0
+    assert slide_titles(output_file) == ['B', 'A', 'C']
+
+def test_batch_base_keeps_gimage_filled_slides(tmp_path, template_file, write_markdown):
+    output_dir = str(tmp_path / 'out')
+    output_file = os.path.join(output_dir, 'deck.pptx')
+    markdown = write_markdown([('A', ['a']), ('B', ['b'])])
+    assert GpptBatch.main([markdown, '-t', template_file, '-o', output_dir, '-j', '1', '-i']) == 0
+    fill_image(output_file, os.path.join(output_dir, 'updated_deck_20260101000000_1234.pptx'), 1)
+
+    write_markdown([('A', ['a']), ('B', ['b changed'])])
+    assert GpptBatch.main([markdown, '-t', template_file, '-o', output_dir, '-j', '1', '-i',
+                           '--base', output_dir]) == 0
+    prs = Presentation(output_file)
+    assert slide_titles(output_file) == ['A', 'B']
+    assert has_filled_image(prs.slides[0])
+    assert 'b changed' in [shape.text_frame.text for shape in prs.slides[1].shapes if shape.has_text_frame]
+
+def test_batch_base_requires_incremental(tmp_path, template_file, write_markdown):
+    markdown = write_markdown([('A', ['a'])])
+    assert GpptBatch.main([markdown, '-t', template_file, '-o', str(tmp_path), '--base', str(tmp_path)]) == 2
@@ -0,0 +1,40 @@
+from types import SimpleNamespace
+from pptx import Presentation
+from GpptCore import SLIDE_TYPES, LayoutIndex, build_layout_index
+
+def substring_candidates(layouts, slide_type, subtitle_count=0):
+    # 索引之前 create_pptx 逐页扫描全部布局的子串匹配
+    if slide_type.lower() == 'substance':
+        pattern = f"substance_{subtitle_count:02d}"
+        return [layout for layout in layouts if pattern.lower() in layout.name.lower()]
+    return [layout for layout in layouts if slide_type.lower() in layout.name.lower()]
+
+def layouts(*names):
+    return [SimpleNamespace(name=name) for name in names]
+
+SLIDE_TYPE_QUERIES = SLIDE_TYPES + ('Cover', 'SUBSTANCE', 'custom', 'sub', '')
+SUBTITLE_COUNTS = (0, 1, 2, 3, 9, 10, 12, 100, 123)
+
+def assert_matches_substring_search(slide_layouts):
+    index = LayoutIndex(slide_layouts)
+    for slide_type in SLIDE_TYPE_QUERIES:
+        for count in SUBTITLE_COUNTS:
+            assert index.candidates(slide_type, count) == substring_candidates(slide_layouts, slide_type, count), \
+                (slide_type, count)
+
+def test_model_template_matches_substring_search(template_file):
+    assert_matches_substring_search(list(Presentation(template_file).slide_layouts))
+
+def test_unusual_names_match_substring_search():
+    assert_matches_substring_search(layouts(
+        'substance_02_001', '1_substance_02_002', 'SUBSTANCE_03', 'substance_1', 'substance_123_x',
+        'substance_10_001', 'substance_02_substance_03', 'my_cover_page', 'Chapter', 'toc+translate',
+        'custom_layout', 'blank'))
+
+def test_supported_lists_types_and_subtitle_counts(template_file):
+    supported = build_layout_index(Presentation(template_file)).supported()
+    assert set(supported) == set(SLIDE_TYPES)
+    assert supported['cover'] is None
+    assert supported['substance'] == [0, 2, 3, 4, 5, 6, 7, 8]
+    assert LayoutIndex(layouts('substance_123_x', 'substance_02', 'cover')).supported() == \
+        {'cover': None, 'substance': [2, 12, 123]}
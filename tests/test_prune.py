@@ -0,0 +1,65 @@
+import os
+import zipfile
+from lxml import etree
+from pptx import Presentation
+import pptPrune
+from pptPrune import CT_NS, prune_unused_layouts
+from pptMetadata import read_rels
+
+def make_deck(template_file, path, layout_names):
+    prs = Presentation(template_file)
+    layouts = {layout.name: layout for layout in prs.slide_layouts}
+    for layout_name in layout_names:
+        prs.slides.add_slide(layouts[layout_name])
+    prs.save(path)
+    return path
+
+def assert_package_consistent(pptx_file):
+    # 所有关系指向的内部部件都存在, 内容类型中没有已删除部件的 Override
+    with zipfile.ZipFile(pptx_file) as zf:
+        assert zf.testzip() is None
+        names = set(zf.namelist())
+        for name in names:
+            if name.endswith('.rels') and name != '_rels/.rels':
+                directory, filename = os.path.split(name)
+                source = f"{os.path.dirname(directory)}/{filename[:-len('.rels')]}"
+                for _, target in read_rels(zf, source).values():
+                    assert target in names or '://' in target, (name, target)
+        overrides = etree.fromstring(zf.read('[Content_Types].xml')).findall('ct:Override', CT_NS)
+        assert {override.get('PartName').lstrip('/') for override in overrides} <= names
+
+def layout_names(pptx_file):
+    return [layout.name for layout in Presentation(pptx_file).slide_layouts]
+
+def test_unused_layouts_are_removed(tmp_path, template_file):
+    used = ['cover_001', 'substance_02_002', 'substance_02_002', 'translate_001']
+    deck = make_deck(template_file, str(tmp_path / 'deck.pptx'), used)
+    output = str(tmp_path / 'pruned.pptx')
+    result = prune_unused_layouts(deck, output)
+    assert layout_names(output) == ['cover_001', 'substance_02_002', 'translate_001']
+    assert len(result['removed']) == len(layout_names(deck)) - 3
+    assert 'toc_001' in result['removed'] and 'cover_001' not in result['removed']
+    assert result['bytes_after'] < result['bytes_before']
+    assert_package_consistent(output)
+    assert [slide.slide_layout.name for slide in Presentation(output).slides] == used
+    # 再次处理时没有可删除的布局
+    assert prune_unused_layouts(output)['removed'] == []
+
+def test_master_keeps_one_layout(tmp_path, template_file):
+    deck = make_deck(template_file, str(tmp_path / 'deck.pptx'), [])
+    output = str(tmp_path / 'pruned.pptx')
+    prune_unused_layouts(deck, output)
+    assert layout_names(output) == ['cover_001']
+    assert_package_consistent(output)
+
+def test_batch_writes_pruned_copies(tmp_path, template_file, capsys):
+    deck = make_deck(template_file, str(tmp_path / 'deck.pptx'), ['chapter_001'])
+    output_dir = str(tmp_path / 'out')
+    assert pptPrune.main([deck, '-o', output_dir, '-j', '1']) == 0
+    assert '[OK]' in capsys.readouterr().out
+    assert layout_names(os.path.join(output_dir, 'output_deck.pptx')) == ['chapter_001']
+    broken = tmp_path / 'broken.pptx'
+    broken.write_bytes(b'not a pptx file')
+    assert pptPrune.main([str(broken), '-o', output_dir, '-j', '1']) == 1
+    assert '[FAILED]' in capsys.readouterr().out
+    assert pptPrune.main([str(tmp_path / 'none' / '*.pptx')]) == 2
@@ -0,0 +1,76 @@
+import os
+from pptx import Presentation
+from pptx.enum.shapes import MSO_SHAPE_TYPE
+from pptx.util import Inches
+from conftest import png
+import pptRelayout
+from GpptCore import rename_placeholders
+from pptRelayout import auto_mapping, parse_mapping, relayout_file
+
+def make_deck(template_file, path, slides):
+    # slides 为 [(布局名称, {占位符名称: 文字}, 附加形状的函数或None)]
+    prs = Presentation(template_file)
+    layouts = {layout.name: layout for layout in prs.slide_layouts}
+    for layout_name, texts, extra in slides:
+        slide = prs.slides.add_slide(layouts[layout_name])
+        rename_placeholders(slide, layouts[layout_name])
+        for shape in slide.placeholders:
+            if shape.name in texts:
+                shape.text_frame.text = texts[shape.name]
+        if extra is not None:
+            extra(slide)
+    prs.save(path)
+    return path
+
+def add_note(slide):
+    textbox = slide.shapes.add_textbox(Inches(1), Inches(1), Inches(2), Inches(1))
+    textbox.name = 'note'
+    textbox.text_frame.text = 'keep me'
+
+def add_logo(slide):
+    picture = slide.shapes.add_picture(png('green'), Inches(1), Inches(1))
+    picture.name = 'logo'
+
+def shapes_by_name(slide):
+    return {shape.name: shape for shape in slide.shapes}
+
+def test_parse_mapping():
+    assert parse_mapping(['1-3,5=2', '7=4']) == {1: 2, 2: 2, 3: 2, 5: 2, 7: 4}
+
+def test_relayout_keeps_target_text(tmp_path, template_file):
+    target = make_deck(template_file, str(tmp_path / 'target.pptx'), [
+        ('substance_00_000', {'title': 'Target title', 'content01': 'target body'}, add_note),
+        ('substance_00_000', {'title': 'Second'}, None),
+    ])
+    reference = make_deck(template_file, str(tmp_path / 'reference.pptx'), [
+        ('substance_00_004', {'title': 'Reference title', 'content01': 'reference body'}, add_logo),
+    ])
+    output = str(tmp_path / 'out.pptx')
+    result = relayout_file(target, reference, {1: 1}, output)
+    assert result['slides'] == 1
+
+    prs = Presentation(output)
+    first, second = prs.slides
+    assert first.slide_layout.name == 'substance_00_004'
+    shapes = shapes_by_name(first)
+    assert shapes['title'].text_frame.text == 'Target title'
+    assert shapes['content01'].text_frame.text == 'target body'
+    assert shapes['note'].text_frame.text == 'keep me'
+    assert shapes['logo'].shape_type == MSO_SHAPE_TYPE.PICTURE
+    assert shapes['logo'].image.blob == png('green').getvalue()
+    assert second.slide_layout.name == 'substance_00_000'
+    assert shapes_by_name(second)['title'].text_frame.text == 'Second'
+
+def test_auto_mapping_matches_layout_names(tmp_path, template_file):
+    target = Presentation(make_deck(template_file, str(tmp_path / 'target.pptx'), [
+        ('substance_00_000', {}, None), ('toc_001', {}, None), ('substance_00_000', {}, None)]))
+    reference = Presentation(make_deck(template_file, str(tmp_path / 'reference.pptx'), [
+        ('toc_001', {}, None), ('substance_00_000', {}, None), ('substance_00_000', {}, None)]))
+    assert auto_mapping(target, reference) == {1: 2, 2: 1, 3: 2}
+
+def test_out_of_range_pages_are_rejected(tmp_path, template_file):
+    target = make_deck(template_file, str(tmp_path / 'target.pptx'), [('substance_00_000', {}, None)])
+    output = str(tmp_path / 'out.pptx')
+    assert pptRelayout.main([target, '-r', target, '-m', '2=1', '-o', output]) == 2
+    assert pptRelayout.main([target, '-r', target, '-m', '1', '-o', output]) == 2
+    assert not os.path.exists(output)
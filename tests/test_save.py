@@ -0,0 +1,81 @@
+import zipfile
+from io import BytesIO
+from lxml import etree
+from pptx import Presentation
+from GpptCore import iter_markdown, open_template, build_layout_index, select_layout, add_slide
+from GpptSave import PackageBaseline, save_presentation
+from GpptTemplate import TemplateCache
+
+def build_deck(template_file, markdown, template_cache=None):
+    prs, baseline = open_template(template_file, template_cache)
+    layout_index = build_layout_index(prs)
+    for slide_index, slide in enumerate(iter_markdown(markdown), 1):
+        add_slide(prs, slide, select_layout(prs, layout_index, slide, slide_index), slide_index)
+    return prs, baseline
+
+def members(data):
+    # 直接复制的成员保留模板原有的XML声明、格式与关系顺序(python-pptx 按 rId 排序), 按规范化后的内容比较
+    with zipfile.ZipFile(BytesIO(data)) as zf:
+        assert zf.testzip() is None
+        result = {}
+        for name in zf.namelist():
+            content = zf.read(name)
+            if name.endswith('.rels'):
+                content = sorted(tuple(sorted(rel.attrib.items())) for rel in etree.fromstring(content))
+            elif name.endswith('.xml'):
+                content = etree.tostring(etree.fromstring(content), method='c14n')
+            result[name] = content
+        return result
+
+def saved(prs, *args, **kwargs):
+    buffer = BytesIO()
+    stats = save_presentation(prs, buffer, *args, **kwargs)
+    return buffer.getvalue(), stats
+
+def python_pptx_saved(prs):
+    buffer = BytesIO()
+    prs.save(buffer)
+    return buffer.getvalue()
+
+def test_matches_python_pptx_save(template_file, write_markdown):
+    markdown = write_markdown([('A', ['a']), ('B', ['b']), ('C', ['c'])])
+    for template_cache in (None, TemplateCache()):
+        prs, baseline = build_deck(template_file, markdown, template_cache)
+        data, stats = saved(prs, baseline, dirty={prs.part})
+        # 模板中未修改的部件直接复制, 只有新幻灯片、presentation 部件与内容类型被序列化
+        assert stats['copied'] > stats['compressed']
+        assert members(data) == members(python_pptx_saved(prs))
+        assert len(Presentation(BytesIO(data)).slides) == 3
+
+def test_without_dirty_serializes_xml_parts(template_file, write_markdown):
+    prs, baseline = build_deck(template_file, write_markdown([('A', ['a'])]))
+    data, stats = saved(prs, baseline)
+    assert members(data) == members(python_pptx_saved(prs))
+    reference, _ = saved(prs, baseline, dirty={prs.part})
+    assert stats['copied'] < len(members(reference))
+
+def test_renamed_slides_are_serialized(tmp_path, template_file, write_markdown):
+    # 幻灯片顺序与部件名不一致的文件, 打开后 prs.slides 会将其重命名为 slide1..N, 同名的旧成员不能再复制
+    deck = str(tmp_path / 'deck.pptx')
+    prs, baseline = build_deck(template_file, write_markdown([('A', ['a']), ('B', ['b']), ('C', ['c'])]))
+    sld_id_lst = prs.slides._sldIdLst
+    first = sld_id_lst[0]
+    sld_id_lst.remove(first)
+    sld_id_lst.append(first)
+    save_presentation(prs, deck, baseline, dirty={prs.part})
+    with open(deck, 'rb') as f:
+        data = f.read()
+    prs = Presentation(BytesIO(data))
+    baseline = PackageBaseline(data, prs.part.package)
+    assert str(prs.slides[0].part.partname) == '/ppt/slides/slide1.xml'
+    output, stats = saved(prs, baseline, dirty={prs.part})
+    assert stats['copied'] > 0
+    assert members(output) == members(python_pptx_saved(prs))
+    titles = [next(shape.text_frame.text for shape in slide.shapes if shape.name.lower() == 'title')
+              for slide in Presentation(BytesIO(output)).slides]
+    assert titles == ['B', 'C', 'A']
+
+def test_uncompressed_output(template_file, write_markdown):
+    prs, baseline = build_deck(template_file, write_markdown([('A', ['a'])]))
+    data, _ = saved(prs, baseline, compress_level=0, dirty={prs.part})
+    assert members(data) == members(python_pptx_saved(prs))
@@ -0,0 +1,50 @@
+import zipfile
+from copy import deepcopy
+from pptx import Presentation
+from pptx.opc.oxml import serialize_part_xml
+from pptx.util import Inches
+from pptMetadata import read_rels, slide_partnames
+from pptThumbnail import SlideThumbnails, slide_keys
+
+def deck_with_layout_text(template_file, path, slides=4):
+    # 布局中加入一个没有 rPr 的文本框: 用 run.font 读取字号时会被 get_or_add_rPr 修改
+    prs = Presentation(template_file)
+    layout = prs.slide_layouts[0]
+    scratch = prs.slides.add_slide(layout)
+    textbox = scratch.shapes.add_textbox(Inches(1), Inches(1), Inches(3), Inches(1))
+    textbox.text_frame.text = 'layout text'
+    layout.shapes._spTree.append(deepcopy(textbox._element))
+    for _ in range(slides - 1):
+        prs.slides.add_slide(layout)
+    prs.save(path)
+    return path
+
+def test_rendering_does_not_modify_shared_parts(tmp_path, template_file):
+    pptx_file = deck_with_layout_text(template_file, str(tmp_path / 'deck.pptx'))
+    thumbnails = SlideThumbnails(pptx_file, max_workers=4)
+    layout = thumbnails.slides[0].slide_layout
+    shared = [layout, layout.slide_master]
+    before = [serialize_part_xml(source.part._element) for source in shared]
+    for future in thumbnails.prerender():
+        future.result()
+    thumbnails.close()
+    assert [serialize_part_xml(source.part._element) for source in shared] == before
+
+def replace_member(source, target, name, transform):
+    with zipfile.ZipFile(source) as zin, zipfile.ZipFile(target, 'w', zipfile.ZIP_DEFLATED) as zout:
+        for member in zin.namelist():
+            data = zin.read(member)
+            zout.writestr(member, transform(data) if member == name else data)
+
+def test_keys_follow_master_dependencies(tmp_path, template_file):
+    # 母版引用的主题(幻灯片 -> 布局 -> 母版 -> 主题)变化时缓存键也要变化
+    pptx_file = deck_with_layout_text(template_file, str(tmp_path / 'deck.pptx'))
+    with zipfile.ZipFile(pptx_file) as zf:
+        layout = next(target for _, target in read_rels(zf, slide_partnames(zf)[0]).values() if 'slideLayout' in target)
+        master = next(target for _, target in read_rels(zf, layout).values() if 'slideMaster' in target)
+        theme = next(target for _, target in read_rels(zf, master).values() if 'theme' in target)
+    changed_file = str(tmp_path / 'changed.pptx')
+    replace_member(pptx_file, changed_file, theme, lambda data: data.replace(b'<a:clrScheme', b'<a:clrScheme ', 1))
+    keys = slide_keys(pptx_file)
+    assert all(key not in keys for key in slide_keys(changed_file))
+    assert slide_keys(pptx_file, (200, 100)) != keys
@@ -0,0 +1,76 @@
+import os
+import json
+from pptx import Presentation
+import GpptBatch
+import GpptValidate
+from GpptCore import build_layout_index, rename_placeholders
+from GpptIncremental import file_hash
+from GpptValidate import analyze_template, load_capabilities, validate_markdown
+
+def subtitles(count):
+    lines = []
+    for number in range(1, count + 1):
+        lines.extend([f"#### Point {number}", f"detail {number}"])
+    return lines
+
+def test_manifest_matches_python_pptx(template_file):
+    capabilities = analyze_template(template_file)
+    prs = Presentation(template_file)
+    assert capabilities['supported'] == build_layout_index(prs).supported()
+    assert [entry['name'] for entry in capabilities['layouts']] == [layout.name for layout in prs.slide_layouts]
+    # 清单中的占位符名称与 create_pptx 新建幻灯片并重命名后的占位符相同
+    for entry, layout in zip(capabilities['layouts'], prs.slide_layouts):
+        slide = prs.slides.add_slide(layout)
+        rename_placeholders(slide, layout)
+        assert entry['placeholders'] == [shape.name for shape in slide.placeholders], entry['name']
+    substance = next(entry for entry in capabilities['layouts'] if entry['name'] == 'substance_02_002')
+    assert substance['slide_types'] == ['substance'] and substance['subtitle_counts'] == [2]
+
+def test_unsupported_subtitle_count_is_an_error(tmp_path, template_file, write_markdown):
+    cache_dir = str(tmp_path / 'cache')
+    markdown = write_markdown([('Two', subtitles(2)), ('Nine', subtitles(9))])
+    report = validate_markdown(markdown, template_file, cache_dir)
+    assert report['slides'] == 2 and report['errors'] >= 1
+    errors = [issue for issue in report['issues'] if issue['level'] == 'error']
+    assert {issue['slide'] for issue in errors} == {2}
+    assert 'No layout for substance slide with 9 subtitles' in errors[0]['message']
+    assert '2, 3, 4, 5, 6, 7, 8 subtitles' in errors[0]['message']
+
+    report = validate_markdown(write_markdown([('Two', subtitles(2))], 'ok.md'), template_file, cache_dir)
+    assert report['errors'] == 0
+
+def test_capabilities_are_cached_by_template_hash(tmp_path, template_file, monkeypatch):
+    cache_dir = str(tmp_path / 'cache')
+    monkeypatch.setattr(GpptValidate, '_loaded', {})
+    capabilities = load_capabilities(template_file, cache_dir)
+    cache_file = os.path.join(cache_dir, f"{file_hash(template_file)}.json")
+    with open(cache_file, 'r', encoding='utf-8') as f:
+        assert json.load(f) == capabilities
+
+    # 之后从进程内缓存或磁盘缓存读取, 不再分析模板
+    def fail(*args):
+        raise AssertionError("template analyzed again")
+    monkeypatch.setattr(GpptValidate, 'analyze_template', fail)
+    assert load_capabilities(template_file, cache_dir) is capabilities
+    monkeypatch.setattr(GpptValidate, '_loaded', {})
+    assert load_capabilities(template_file, cache_dir) == capabilities
+
+def test_cli_exit_codes(tmp_path, template_file, write_markdown, capsys, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    good = write_markdown([('Two', subtitles(2))], 'good.md')
+    bad = write_markdown([('Nine', subtitles(9))], 'bad.md')
+    cache_dir = str(tmp_path / 'cache')
+    assert GpptValidate.main([good, '-t', template_file, '--cache-dir', cache_dir]) == 0
+    assert '[OK]' in capsys.readouterr().out
+    report_file = str(tmp_path / 'report.json')
+    assert GpptValidate.main([good, bad, '-t', template_file, '--cache-dir', cache_dir, '--json', report_file]) == 1
+    assert '[FAILED]' in capsys.readouterr().out
+    with open(report_file, 'r', encoding='utf-8') as f:
+        assert [report['errors'] > 0 for report in json.load(f)] == [False, True]
+    assert GpptValidate.main([str(tmp_path / 'missing.md'), '-t', template_file]) == 2
+
+    # GpptBatch --check 只检查, 不生成PPT
+    output_dir = str(tmp_path / 'out')
+    assert GpptBatch.main([bad, '-t', template_file, '-o', output_dir, '--check']) == 1
+    assert GpptBatch.main([good, '-t', template_file, '-o', output_dir, '--check']) == 0
+    assert not os.path.exists(output_dir)